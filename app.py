@@ -1,29 +1,45 @@
+import importlib
 import streamlit as st
-from components.home import home_page
-from components.dashboard import dashboard_page
-from components.auth import auth_page # Import auth_page
+from components.auth import auth_page, logout, restore_session # Import auth_page
+from backend.instrumentation import span
+
+# Page modules are imported on first navigation, not at startup: the login page never pays for
+# the Groq SDK or the plan database modules. Python caches them afterwards, so reruns import nothing.
+PAGES = {
+    "Generate Plan": ("components.home", "home_page"),
+    "Monitor Goal": ("components.dashboard", "dashboard_page"),
+}
+
+
+def load_page(page):
+    """Returns the render function of a page, importing its module on first use."""
+    module_name, function_name = PAGES[page]
+    with span("page.import", page=page): # Only the first call in a process does real work
+        return getattr(importlib.import_module(module_name), function_name)
+
 
 def main():
     st.sidebar.title("Navigation")
 
-    if 'authentication_status' not in st.session_state or not st.session_state['authentication_status']: # Check authentication status
+    if not restore_session(): # Check authentication status (a valid session cookie counts)
         page = "Authentication" # Default to auth page if not logged in
     else:
-        page_options = ["Generate Plan", "Monitor Goal", "Logout"] # Add Logout to options
+        page_options = list(PAGES) + ["Logout"] # Add Logout to options
         page = st.sidebar.radio("Go to", page_options) # Radio buttons for navigation
 
         if page == "Logout": # Handle Logout
-            st.session_state['authentication_status'] = False # Clear auth status
-            st.session_state['name'] = None # Clear username
+            from backend.progress_writer import get_progress_writer
+            get_progress_writer().flush() # Persist any buffered checkbox toggles before the session ends
+            logout() # Revoke the session token and clear auth status
             st.rerun() # Rerun to update UI and redirect to auth page
             return # Exit main function after logout
 
-    if page == "Generate Plan":
-        home_page()
-    elif page == "Monitor Goal":
-        dashboard_page()
-    elif page == "Authentication": # Authentication Page
-        auth_page()
+    with span("page.render", page=page): # Per-page render time (excludes the session check above)
+        if page == "Authentication": # Authentication Page
+            auth_page()
+        else:
+            load_page(page)()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with span("app.rerun"): # Whole script run: per-rerun overhead on top of page rendering
+        main()
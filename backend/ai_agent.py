@@ -1,9 +1,149 @@
 import os
 import json
-from groq import Groq  # Make sure you have 'groq' library installed
+import random
+import time
+import asyncio
+import queue
+import threading
+import weakref
+import groq
+from groq import Groq, AsyncGroq  # Make sure you have 'groq' library installed
 from config import GROQ_API_KEY # Import your API key from config.py
+from backend.roadmap_cache import get_roadmap_cache, make_cache_key
+from backend.single_flight import SingleFlight
+from backend.stream_parser import JsonMemberStreamParser
+from backend.rate_limiter import AsyncTokenBucket
+from backend.instrumentation import increment, log_error, observe, span
+from backend.json_repair import loads_with_repair, normalize_duration, normalize_roadmap
+from backend.roadmap_format import (build_outline_prompt, build_segment_prompt, fallback_outline, parse_outline, parse_segment,
+                                    roadmap_covers_timeline, roadmap_outline)
 
-def generate_career_roadmap(education_status, career_goal, resources_available, timeline):
+ROADMAP_MODEL = "mixtral-8x7b-32768" # Or another suitable Groq model
+
+# Batch generation defaults, sized for the provider's published rate limits
+BATCH_MAX_CONCURRENCY = 8
+BATCH_REQUESTS_PER_MINUTE = 30
+BATCH_TOKENS_PER_MINUTE = 5000
+BATCH_MAX_RETRIES = 5
+BATCH_BACKOFF_BASE_SECONDS = 1.0
+BATCH_BACKOFF_MAX_SECONDS = 60.0
+EXPECTED_COMPLETION_TOKENS = 2000 # Reserved from the tokens/minute bucket until real usage is known
+
+# Segmented generation: long timelines are outlined first, then each segment is generated concurrently
+SEGMENTED_MIN_TIMELINE_MONTHS = 18
+SEGMENT_MAX_CONCURRENCY = 6
+SEGMENT_MAX_RETRIES = 3 # Per segment (and for the outline), covering API errors and invalid JSON alike
+
+# Concurrent cache misses for the same normalized inputs share one generation (see backend/single_flight.py)
+_generation_flights = SingleFlight("generate")
+_stream_flights = SingleFlight("stream")
+
+_groq_client = None
+_groq_client_lock = threading.Lock()
+_async_groq_clients = weakref.WeakKeyDictionary() # event loop -> AsyncGroq (httpx async pools are bound to their loop)
+
+
+def get_groq_client():
+    """Returns the process-wide Groq client so its HTTP connection pool is reused across calls."""
+    global _groq_client
+    if _groq_client is None:
+        with _groq_client_lock:
+            if _groq_client is None:
+                _groq_client = Groq(api_key=GROQ_API_KEY)
+    return _groq_client
+
+
+def get_async_groq_client():
+    """Returns the shared AsyncGroq client for the running event loop. Retries are handled by the caller."""
+    loop = asyncio.get_running_loop()
+    client = _async_groq_clients.get(loop)
+    if client is None:
+        client = AsyncGroq(api_key=GROQ_API_KEY, max_retries=0)
+        _async_groq_clients[loop] = client
+    return client
+
+
+async def close_async_groq_client():
+    """Closes the running event loop's AsyncGroq client (and its connection pool), if it has one."""
+    client = _async_groq_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+def run_with_async_groq_client(coroutine):
+    """
+    asyncio.run(coroutine) for sync callers, closing the loop's AsyncGroq client before the loop ends.
+
+    Each asyncio.run creates a fresh loop, so its client can never be reused afterwards; without
+    this its sockets would stay open until garbage collection.
+    """
+    async def run():
+        try:
+            return await coroutine
+        finally:
+            await close_async_groq_client()
+    return asyncio.run(run())
+
+
+def build_roadmap_prompt(education_status, career_goal, resources_available, timeline):
+    """Builds the roadmap generation prompt shared by the blocking, streaming and batch paths."""
+    return f"""
+    Generate a structured career roadmap in JSON format for someone who wants to become a {career_goal} in {timeline} months.
+    Consider their current education status: {education_status} and available resources: {resources_available}.
+
+    The roadmap should be detailed and broken down into months or shorter durations within the given timeline.
+    Each duration should have 'topics' and within each topic, there should be a list of 'sub-topics'.
+    Also, for each duration, suggest 'resources' like courses, books, or online platforms.
+
+    Reply with minified JSON only (no indentation or line breaks), in this structure:
+    {{"timeline":{{"Month 1-2":{{"Topic 1":["Sub-topic 1.1","Sub-topic 1.2"],"Topic 2":["Sub-topic 2.1","Sub-topic 2.2"],"Resources":["Resource 1","Resource 2"]}},"Month 3-4":{{"Topic 3":["Sub-topic 3.1","Sub-topic 3.2"],"Resources":["Resource 3","Resource 4"]}}}}}}
+    Add more months/durations as needed to fill the timeline.
+
+    Ensure the roadmap is comprehensive and actionable.  Focus on practical steps and learning objectives.
+    """
+
+
+def parse_roadmap_completion(completion_text, timeline, mode):
+    """
+    Parses a completion into the {"timeline": ...} roadmap structure; mode labels the metrics.
+
+    Comments, trailing commas and truncation are repaired, and the roadmap is validated and
+    normalized (see backend.json_repair), before a completion is given up on. If a truncated
+    completion was cut inside its last duration, that duration may have lost topics or resources
+    and is dropped; the completion is only accepted if its complete durations reach month ``timeline``.
+
+    Raises:
+        ValueError: If the completion is not usable even after repair (json.JSONDecodeError is a ValueError).
+    """
+    with span("json.parse", source="completion"):
+        completion_json, repairs, truncated_depth = loads_with_repair(completion_text)
+    if "truncation" in repairs:
+        completion_json = _drop_partial_duration(completion_json, truncated_depth)
+    roadmap_json = normalize_roadmap(completion_json)
+    if "truncation" in repairs and not roadmap_covers_timeline(roadmap_json, timeline):
+        raise ValueError(f"Completion was cut off after {len(roadmap_json['timeline'])} complete duration(s), short of {timeline} months")
+    if repairs or roadmap_json is not completion_json:
+        increment("llm.json_repair.repaired_completions", mode=mode) # Usable only thanks to the repair
+    return roadmap_json
+
+
+def _drop_partial_duration(completion_json, truncated_depth):
+    """
+    Removes the last duration of a truncated completion if the cut fell inside it, i.e. deeper than
+    the timeline object (depth 2 inside {"timeline": {...}}, 1 for durations at the top level).
+    """
+    if not isinstance(completion_json, dict):
+        return completion_json
+    wrapped = isinstance(completion_json.get("timeline"), dict)
+    if truncated_depth <= (2 if wrapped else 1):
+        return completion_json
+    timeline_data = dict(completion_json["timeline"] if wrapped else completion_json)
+    if timeline_data:
+        timeline_data.popitem()
+    return {**completion_json, "timeline": timeline_data} if wrapped else timeline_data
+
+
+def generate_career_roadmap(education_status, career_goal, resources_available, timeline, use_cache=True, segmented=None):
     """
     Generates a structured career roadmap in JSON format using Groq LLM.
 
@@ -12,73 +152,498 @@ def generate_career_roadmap(education_status, career_goal, resources_available,
         career_goal (str): User's desired career goal.
         resources_available (str): User-provided resources information.
         timeline (int):  Desired timeline in months.
+        use_cache (bool): Serve identical (normalized) requests from the roadmap cache instead of calling Groq.
+        segmented (bool): Outline first and generate segments in parallel. Defaults to True for timelines
+                          of SEGMENTED_MIN_TIMELINE_MONTHS or more.
+
+    With use_cache, callers whose (normalized) inputs match a generation already in progress wait
+    for it and share its result instead of paying for an identical completion.
 
     Returns:
         dict: A JSON-like dictionary representing the career roadmap, or None if there was an error.
     """
+    cache_key = make_cache_key(education_status, career_goal, resources_available, timeline)
+    if segmented is None:
+        segmented = int(timeline) >= SEGMENTED_MIN_TIMELINE_MONTHS
+    if not use_cache:
+        return _generate_career_roadmap(education_status, career_goal, resources_available, timeline, None, segmented)
+
+    cached_roadmap = get_roadmap_cache().get(cache_key)
+    if cached_roadmap is not None:
+        return cached_roadmap
+    return _generation_flights.do((cache_key, segmented), lambda: _generate_career_roadmap(
+        education_status, career_goal, resources_available, timeline, cache_key, segmented))
+
+
+def _generate_career_roadmap(education_status, career_goal, resources_available, timeline, cache_key, segmented):
+    """One blocking generation; the result is cached under cache_key unless it is None."""
+    if segmented:
+        try:
+            roadmap_json = {"timeline": dict(run_with_async_groq_client(generate_roadmap_segments(education_status, career_goal, resources_available, timeline)))}
+        except Exception as e:
+            log_error("Error generating segmented career roadmap: %s", e)
+            return None
+        if cache_key is not None:
+            get_roadmap_cache().put(cache_key, career_goal, roadmap_json)
+        return roadmap_json
+
     try:
-        client = Groq(api_key=GROQ_API_KEY) # Initialize Groq client
-
-        prompt = f"""
-        Generate a structured career roadmap in JSON format for someone who wants to become a {career_goal} in {timeline} months.
-        Consider their current education status: {education_status} and available resources: {resources_available}.
-
-        The roadmap should be detailed and broken down into months or shorter durations within the given timeline.
-        Each duration should have 'topics' and within each topic, there should be a list of 'sub-topics'.
-        Also, for each duration, suggest 'resources' like courses, books, or online platforms.
-
-        Example JSON structure:
-        {{
-          "timeline": {{
-            "Month 1-2": {{
-              "Topic 1": [
-                "Sub-topic 1.1",
-                "Sub-topic 1.2"
-              ],
-              "Topic 2": [
-                "Sub-topic 2.1",
-                "Sub-topic 2.2"
-              ],
-              "Resources": [
-                "Resource 1",
-                "Resource 2"
-              ]
-            }},
-            "Month 3-4": {{
-              "Topic 3": [
-                "Sub-topic 3.1",
-                "Sub-topic 3.2"
-              ],
-              "Resources": [
-                "Resource 3",
-                "Resource 4"
-              ]
-            }}
-            // ... more months/durations as needed to fill the timeline
-          }}
-        }}
-
-        Ensure the roadmap is comprehensive and actionable.  Focus on practical steps and learning objectives.
-        """
-
-        response = client.chat.completions.create(
-            model="mixtral-8x7b-32768", # Or another suitable Groq model
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            response_format={ "type": "json_object" } # Ask for JSON response
-        )
+        client = get_groq_client() # Shared Groq client
+
+        prompt = build_roadmap_prompt(education_status, career_goal, resources_available, timeline)
+
+        with span("llm.request", mode="blocking") as current:
+            response = client.chat.completions.create(
+                model=ROADMAP_MODEL,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={ "type": "json_object" } # Ask for JSON response
+            )
+            _record_usage(current, response.usage)
 
         # Parse JSON response
         roadmap_json_str = response.choices[0].message.content
-        roadmap_json = json.loads(roadmap_json_str)
+        roadmap_json = parse_roadmap_completion(roadmap_json_str, timeline, "blocking")
+        if cache_key is not None:
+            get_roadmap_cache().put(cache_key, career_goal, roadmap_json)
         return roadmap_json
 
     except Exception as e:
-        print(f"Error generating career roadmap: {e}")
+        log_error("Error generating career roadmap: %s", e)
         return None # Indicate an error occurred
 
 
+def stream_career_roadmap(education_status, career_goal, resources_available, timeline, use_cache=True, segmented=None):
+    """
+    Streams a career roadmap, yielding each timeline duration as soon as it is complete.
+
+    Consumes the Groq chat completion as a token stream and incrementally parses the
+    partial JSON, so callers can render "Month 1-2" while later durations are still
+    being generated. Groq's JSON mode cannot be combined with streaming, so the
+    prompt alone asks for a bare JSON object. On a cache hit every duration is
+    yielded immediately.
+
+    Args:
+        education_status (str): User's education status.
+        career_goal (str): User's desired career goal.
+        resources_available (str): User-provided resources information.
+        timeline (int):  Desired timeline in months.
+        use_cache (bool): Serve identical (normalized) requests from the roadmap cache instead of calling Groq.
+        segmented (bool): As in generate_career_roadmap; segments are yielded in timeline order as they complete.
+
+    With use_cache, concurrent identical requests share one streamed completion: later callers are
+    replayed the durations streamed so far and then follow it live. Only complete roadmaps are cached.
+
+    Yields:
+        tuple: (duration, duration_content) pairs in timeline order.
+
+    Raises:
+        RuntimeError: After the durations streamed so far, if generation failed or the completion was
+                      cut off before its durations reached month ``timeline``.
+    """
+    cache_key = make_cache_key(education_status, career_goal, resources_available, timeline)
+    if segmented is None:
+        segmented = int(timeline) >= SEGMENTED_MIN_TIMELINE_MONTHS
+    if not use_cache:
+        yield from _stream_career_roadmap(education_status, career_goal, resources_available, timeline, None, segmented)
+        return
+
+    cached_roadmap = get_roadmap_cache().get(cache_key)
+    if cached_roadmap is not None:
+        yield from cached_roadmap.get("timeline", {}).items()
+        return
+    yield from _stream_flights.stream((cache_key, segmented), lambda: _stream_career_roadmap(
+        education_status, career_goal, resources_available, timeline, cache_key, segmented))
+
+
+def _stream_career_roadmap(education_status, career_goal, resources_available, timeline, cache_key, segmented):
+    """One streamed generation; a complete result is cached under cache_key when it is set, anything else raises."""
+    if segmented:
+        yield from _stream_segmented_roadmap(education_status, career_goal, resources_available, timeline, cache_key)
+        return
+
+    timeline_data = {}
+    incomplete = "no JSON object in the completion"
+    try:
+        client = get_groq_client() # Shared Groq client
+        prompt = build_roadmap_prompt(education_status, career_goal, resources_available, timeline)
+        prompt += "\n        Respond with the JSON object only, without any surrounding text.\n"
+
+        with span("llm.request", mode="stream") as current:
+            started_at = time.perf_counter()
+            stream = client.chat.completions.create(
+                model=ROADMAP_MODEL,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                stream=True
+            )
+
+            parser = JsonMemberStreamParser("timeline")
+            for chunk in stream:
+                x_groq = getattr(chunk, "x_groq", None) # Groq reports usage on the final chunk
+                if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+                    _record_usage(current, x_groq.usage)
+                if not chunk.choices:
+                    continue
+                for duration, duration_content in parser.feed(chunk.choices[0].delta.content or ""):
+                    duration_content = normalize_duration(duration_content)
+                    if duration_content is None:
+                        continue # Left to the full parse below, or dropped
+                    if duration not in timeline_data:
+                        if not timeline_data:
+                            observe("llm.time_to_first_duration", time.perf_counter() - started_at, mode="stream")
+                        timeline_data[duration] = duration_content
+                        yield duration, duration_content
+
+        # Pick up anything the incremental scan could not split out (e.g. an unusual layout,
+        # comments, or the durations before a truncation, which the repair stage recovers)
+        full_text = parser.text
+        json_start = full_text.find("{")
+        if json_start != -1:
+            try:
+                # Raises if the completion was cut off short of month ``timeline``, as for blocking generation
+                roadmap_json = parse_roadmap_completion(full_text[json_start:], timeline, "stream")
+                incomplete = None
+            except ValueError as e:
+                roadmap_json, incomplete = {}, str(e)
+            for duration, duration_content in (roadmap_json.get("timeline") or {}).items():
+                if duration not in timeline_data:
+                    timeline_data[duration] = duration_content
+                    yield duration, duration_content
+            # Late durations were yielded out of order; cache them in the completion's order
+            timeline_data = {**{duration: timeline_data[duration] for duration in roadmap_json.get("timeline") or {}
+                                if duration in timeline_data}, **timeline_data}
+
+    except Exception as e:
+        log_error("Error streaming career roadmap: %s", e)
+        incomplete = f"{type(e).__name__}: {e}"
+
+    if incomplete is not None: # A partial roadmap is never cached, and the caller must not take it for a finished one
+        raise RuntimeError(f"Streamed roadmap is incomplete after {len(timeline_data)} duration(s): {incomplete}")
+    if cache_key is not None:
+        get_roadmap_cache().put(cache_key, career_goal, {"timeline": timeline_data})
+
+
+def get_generation_coalescing_stats():
+    """Single-flight statistics for blocking and streamed generation (calls, coalesced callers, coalescing ratio)."""
+    return {"generate": _generation_flights.stats(), "stream": _stream_flights.stats()}
+
+
+def _record_usage(current_span, usage):
+    """Attaches token counts from a completion's usage block to an llm.request span."""
+    if usage is not None:
+        current_span.set(prompt_tokens=usage.prompt_tokens or 0, completion_tokens=usage.completion_tokens or 0)
+
+
+def _is_retryable_error(error):
+    """True for rate limiting (429), server errors (5xx) and transport failures."""
+    if isinstance(error, (groq.APIConnectionError, groq.RateLimitError, groq.InternalServerError)):
+        return True
+    return isinstance(error, groq.APIStatusError) and (error.status_code == 429 or error.status_code >= 500)
+
+
+def _retry_delay(error, attempt):
+    """Full-jitter exponential backoff, honouring a Retry-After header when the provider sends one."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after) + random.uniform(0, BATCH_BACKOFF_BASE_SECONDS)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BATCH_BACKOFF_MAX_SECONDS, BATCH_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+async def generate_career_roadmaps_batch(batch_inputs, max_concurrency=BATCH_MAX_CONCURRENCY,
+                                         requests_per_minute=BATCH_REQUESTS_PER_MINUTE,
+                                         tokens_per_minute=BATCH_TOKENS_PER_MINUTE,
+                                         max_retries=BATCH_MAX_RETRIES, use_cache=True):
+    """
+    Generates many career roadmaps concurrently through one shared AsyncGroq client.
+
+    Concurrency is bounded by ``max_concurrency`` and two token buckets (requests/minute
+    and tokens/minute). 429 and 5xx responses are retried with jittered exponential
+    backoff; one item failing never aborts the rest of the batch. The client stays open for later
+    batches on the same loop; a one-off batch should be run with run_with_async_groq_client.
+
+    Args:
+        batch_inputs (list): Dicts with education_status, career_goal, resources_available and timeline keys.
+        max_concurrency (int): Maximum number of in-flight Groq requests.
+        requests_per_minute (int): Request budget per minute.
+        tokens_per_minute (int): Prompt + completion token budget per minute.
+        max_retries (int): Retries per item for retryable errors.
+        use_cache (bool): Serve and populate the roadmap cache.
+
+    Returns:
+        list: One dict per input, in input order, with keys index, inputs, roadmap (dict or None),
+              error (str or None), attempts and from_cache.
+    """
+    client = get_async_groq_client()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    request_bucket = AsyncTokenBucket(requests_per_minute)
+    token_bucket = AsyncTokenBucket(tokens_per_minute)
+    cache = get_roadmap_cache()
+
+    async def generate_one(index, inputs):
+        result = {"index": index, "inputs": inputs, "roadmap": None, "error": None, "attempts": 0, "from_cache": False}
+        try:
+            education_status = inputs["education_status"]
+            career_goal = inputs["career_goal"]
+            resources_available = inputs.get("resources_available", "")
+            timeline = inputs["timeline"]
+            cache_key = make_cache_key(education_status, career_goal, resources_available, timeline)
+        except (KeyError, TypeError, ValueError) as e:
+            result["error"] = f"Invalid batch input: {e!r}"
+            return result
+
+        if use_cache:
+            cached_roadmap = cache.get(cache_key)
+            if cached_roadmap is not None:
+                result["roadmap"] = cached_roadmap
+                result["from_cache"] = True
+                return result
+
+        prompt = build_roadmap_prompt(education_status, career_goal, resources_available, timeline)
+        estimated_tokens = len(prompt) // 4 + EXPECTED_COMPLETION_TOKENS
+
+        queued_at = time.perf_counter()
+        for attempt in range(max_retries + 1):
+            result["attempts"] = attempt + 1
+            async with semaphore:
+                await request_bucket.acquire(1)
+                await token_bucket.acquire(estimated_tokens)
+                if attempt == 0: # Concurrency slot + rate-limit wait of the item, not of its retries
+                    observe("llm.queue_wait", time.perf_counter() - queued_at, mode="batch")
+                try:
+                    with span("llm.request", mode="batch") as current:
+                        response = await client.chat.completions.create(
+                            model=ROADMAP_MODEL,
+                            messages=[
+                                {"role": "user", "content": prompt}
+                            ],
+                            response_format={ "type": "json_object" }
+                        )
+                        _record_usage(current, response.usage)
+                except Exception as e:
+                    if not (_is_retryable_error(e) and attempt < max_retries):
+                        result["error"] = f"{type(e).__name__}: {e}"
+                        return result
+                    retry_delay = _retry_delay(e, attempt)
+                    response = None
+            if response is None:
+                await asyncio.sleep(retry_delay) # Backs off without holding a concurrency slot
+                continue
+
+            if response.usage is not None: # Settle the token estimate against real usage
+                token_bucket.adjust(response.usage.total_tokens - estimated_tokens)
+            try:
+                roadmap_json = parse_roadmap_completion(response.choices[0].message.content, timeline, "batch")
+            except (ValueError, TypeError) as e: # Only once the repair stage has failed too
+                result["error"] = f"Invalid JSON in completion: {e}"
+                return result
+            if use_cache:
+                cache.put(cache_key, career_goal, roadmap_json)
+            result["roadmap"] = roadmap_json
+            return result
+        return result
+
+    return await asyncio.gather(*(generate_one(index, inputs) for index, inputs in enumerate(batch_inputs)))
+
+
+async def _complete_json(client, prompt, parse, max_retries, mode):
+    """
+    Requests one JSON completion and validates it with ``parse(completion_json)``.
+
+    Retryable API errors back off as in batch generation; JSON that is still invalid after
+    repair, or a completion rejected by ``parse`` (ValueError), is retried straight away. Only
+    this request is repeated.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            with span("llm.request", mode=mode) as current:
+                response = await client.chat.completions.create(
+                    model=ROADMAP_MODEL,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ],
+                    response_format={ "type": "json_object" }
+                )
+                _record_usage(current, response.usage)
+            with span("json.parse", source="completion"):
+                completion_json, repairs, _ = loads_with_repair(response.choices[0].message.content)
+            if "truncation" in repairs: # Cut off: topics or resources may be missing, so ask again
+                raise ValueError("Completion was cut off")
+            parsed = parse(completion_json)
+            if repairs:
+                increment("llm.json_repair.repaired_completions", mode=mode)
+            return parsed
+        except (ValueError, TypeError): # JSONDecodeError is a ValueError
+            if attempt >= max_retries:
+                raise
+            increment("llm.retries", mode=mode, reason="invalid_completion")
+        except Exception as e:
+            if not _is_retryable_error(e) or attempt >= max_retries:
+                raise
+            increment("llm.retries", mode=mode, reason="api_error")
+            await asyncio.sleep(_retry_delay(e, attempt))
+
+
+def _parse_normalized_segment(segment_json, start_month, end_month):
+    """parse_segment, with the duration's content normalized like a full roadmap's."""
+    label, duration_content = parse_segment(segment_json, start_month, end_month)
+    normalized = normalize_duration(duration_content)
+    if normalized is None:
+        raise ValueError(f"Segment {label} has no renderable topics")
+    return label, normalized
+
+
+async def generate_roadmap_segments(education_status, career_goal, resources_available, timeline, on_segment=None,
+                                    max_concurrency=SEGMENT_MAX_CONCURRENCY, max_retries=SEGMENT_MAX_RETRIES):
+    """
+    Generates a roadmap as an outline plus concurrently generated segments.
+
+    A short outline request fixes the durations (falling back to even two-month segments if
+    the outline stays unusable), then every duration's topics, sub-topics and resources are
+    requested in parallel, so latency approaches outline + slowest segment rather than one
+    long completion. Each segment is validated on its own and retried alone if it fails.
+
+    Args:
+        on_segment (callable): Called as on_segment(index, duration, duration_content) as each segment completes.
+
+    Returns:
+        list: (duration, duration_content) pairs in timeline order.
+
+    Raises:
+        RuntimeError: If a segment still fails after max_retries retries.
+    """
+    timeline = int(timeline)
+    client = get_async_groq_client()
+    try:
+        outline = await _complete_json(client, build_outline_prompt(education_status, career_goal, resources_available, timeline),
+                                               lambda outline_json: parse_outline(outline_json, timeline), max_retries, "outline")
+    except Exception as e:
+        log_error("Roadmap outline failed, using even segments: %s", e)
+        outline = fallback_outline(timeline)
+    return await generate_outline_segments(education_status, career_goal, resources_available, timeline, outline, range(len(outline)),
+                                           on_segment=on_segment, max_concurrency=max_concurrency, max_retries=max_retries)
+
+
+async def generate_outline_segments(education_status, career_goal, resources_available, timeline, outline, segment_indexes,
+                                    on_segment=None, max_concurrency=SEGMENT_MAX_CONCURRENCY, max_retries=SEGMENT_MAX_RETRIES):
+    """
+    Generates the given segments of an outline concurrently; each prompt carries only the outline as context.
+
+    Returns:
+        list: (duration, duration_content) for each of segment_indexes, in that order.
+
+    Raises:
+        RuntimeError: If a segment still fails after max_retries retries.
+    """
+    client = get_async_groq_client()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def generate_segment(index):
+        start_month, end_month, _ = outline[index]
+        prompt = build_segment_prompt(education_status, career_goal, resources_available, timeline, outline, index)
+        async with semaphore:
+            segment = await _complete_json(client, prompt, lambda segment_json: _parse_normalized_segment(segment_json, start_month, end_month),
+                                                   max_retries, "segment")
+        if on_segment is not None:
+            on_segment(index, *segment)
+        return segment
+
+    segment_indexes = list(segment_indexes)
+    segments = await asyncio.gather(*(generate_segment(index) for index in segment_indexes), return_exceptions=True)
+    failed = [index for index, segment in enumerate(segments) if isinstance(segment, BaseException)]
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(segment_indexes)} roadmap segments failed: {segments[failed[0]]!r}")
+    return segments
+
+
+def regenerate_roadmap_duration(education_status, career_goal, resources_available, roadmap_json, duration):
+    """
+    Generates a replacement for one duration of an existing roadmap.
+
+    The model only sees the plan's outline (durations and their topic names), not the full roadmap.
+
+    Returns:
+        tuple: (duration, duration_content) to splice into the roadmap.
+
+    Raises:
+        ValueError: If the duration is not in the roadmap or the roadmap is not labelled by month.
+        RuntimeError: If generation keeps failing.
+    """
+    outline = roadmap_outline(roadmap_json)
+    durations = list(roadmap_json["timeline"])
+    if duration not in durations:
+        raise ValueError(f"Duration {duration!r} is not in the roadmap")
+    timeline = outline[-1][1]
+    return run_with_async_groq_client(generate_outline_segments(education_status, career_goal, resources_available, timeline,
+                                                 outline, [durations.index(duration)]))[0]
+
+
+def extend_roadmap_timeline(education_status, career_goal, resources_available, roadmap_json, new_timeline):
+    """
+    Generates the durations that extend an existing roadmap to ``new_timeline`` months.
+
+    New months are split into two-month segments and generated concurrently, with the existing
+    outline as context so they continue where the plan leaves off.
+
+    Returns:
+        list: (duration, duration_content) pairs for the added months, in timeline order.
+
+    Raises:
+        ValueError: If new_timeline does not extend the roadmap or the roadmap is not labelled by month.
+        RuntimeError: If generation keeps failing.
+    """
+    outline = roadmap_outline(roadmap_json)
+    current_timeline = outline[-1][1] if outline else 0
+    new_timeline = int(new_timeline)
+    if new_timeline <= current_timeline:
+        raise ValueError(f"The roadmap already covers {current_timeline} months")
+    first_new_segment = len(outline)
+    outline += [[start + current_timeline, end + current_timeline, focus] for start, end, focus in fallback_outline(new_timeline - current_timeline)]
+    return run_with_async_groq_client(generate_outline_segments(education_status, career_goal, resources_available, new_timeline,
+                                                 outline, range(first_new_segment, len(outline))))
+
+
+def _stream_segmented_roadmap(education_status, career_goal, resources_available, timeline, cache_key):
+    """Runs segmented generation on a helper thread and yields its segments in timeline order."""
+    completed = queue.Queue()
+    done = object()
+
+    def run():
+        try:
+            run_with_async_groq_client(generate_roadmap_segments(education_status, career_goal, resources_available, timeline,
+                                                  on_segment=lambda index, duration, content: completed.put((index, duration, content))))
+        except Exception as e:
+            completed.put(e)
+        completed.put(done)
+
+    threading.Thread(target=run, name="segmented-roadmap", daemon=True).start()
+    pending = {} # Segments that finished before an earlier one
+    next_index = 0
+    timeline_data = {}
+    while True:
+        item = completed.get()
+        if item is done:
+            break
+        if isinstance(item, Exception):
+            log_error("Error generating segmented career roadmap: %s", item)
+            raise RuntimeError(f"Segmented roadmap is incomplete after {len(timeline_data)} duration(s): {item}") # Partial roadmaps are never cached
+        pending[item[0]] = item[1:]
+        while next_index in pending:
+            duration, duration_content = pending.pop(next_index)
+            timeline_data[duration] = duration_content
+            yield duration, duration_content
+            next_index += 1
+
+    if cache_key is not None and timeline_data:
+        get_roadmap_cache().put(cache_key, career_goal, {"timeline": timeline_data})
+
+
     if __name__ == "__main__":
         # Example usage (for testing ai_agent.py directly)
         test_roadmap = generate_career_roadmap(
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import zlib
+
+BLOB_COMPRESSION_LEVEL = 9 # Roadmaps are written once and read many times, so compress hard
+
+
+def create_roadmap_blobs_table(conn):
+    """
+    Content-addressed roadmap bodies: one zlib-compressed row per distinct roadmap, shared by every
+    plan that references it. refcount is maintained by triggers on career_plans_sqlite.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS roadmap_blobs (
+            blob_hash TEXT PRIMARY KEY,
+            body BLOB NOT NULL,
+            raw_size INTEGER NOT NULL,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def canonical_roadmap(roadmap_json):
+    """
+    Serializes a roadmap canonically: key order is kept (it is the timeline order), whitespace is
+    not, so the same roadmap always hashes the same no matter how it was formatted when generated.
+
+    Returns:
+        tuple: (blob_hash, raw_utf8_bytes)
+    """
+    raw = json.dumps(roadmap_json, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest(), raw
+
+
+def encode_roadmap(roadmap_json):
+    """
+    Serializes a roadmap canonically and compresses it.
+
+    Returns:
+        tuple: (blob_hash, compressed_body, raw_size)
+    """
+    blob_hash, raw = canonical_roadmap(roadmap_json)
+    return blob_hash, compress_roadmap(raw), len(raw)
+
+
+def compress_roadmap(raw):
+    """Compresses canonical roadmap bytes into a blob body."""
+    return zlib.compress(raw, BLOB_COMPRESSION_LEVEL)
+
+
+def decode_roadmap(body):
+    """Decompresses and parses a blob body back into the roadmap dict."""
+    return json.loads(zlib.decompress(body))
+
+
+def decode_roadmap_text(body):
+    """Decompresses a blob body to its canonical JSON text, without parsing it."""
+    return zlib.decompress(body).decode("utf-8")
+
+
+def put_roadmap_blob(conn, roadmap_json):
+    """Stores a roadmap body unless an identical one is already stored. Returns its hash. Does not commit."""
+    blob_hash, body, raw_size = encode_roadmap(roadmap_json)
+    conn.execute("INSERT OR IGNORE INTO roadmap_blobs (blob_hash, body, raw_size) VALUES (?, ?, ?)", (blob_hash, body, raw_size))
+    return blob_hash
+
+
+def get_roadmap_blob(conn, blob_hash):
+    """Returns the roadmap stored under a hash, or None."""
+    row = conn.execute("SELECT body FROM roadmap_blobs WHERE blob_hash = ?", (blob_hash,)).fetchone()
+    return decode_roadmap(row[0]) if row else None
+
+
+def collect_roadmap_blobs(conn):
+    """Garbage-collects blobs no plan references any more. Returns the number of blobs deleted."""
+    with conn:
+        return conn.execute("DELETE FROM roadmap_blobs WHERE refcount <= 0").rowcount
+
+
+def roadmap_blob_stats(conn):
+    """Blob count, stored vs uncompressed bytes, and how many plan references share them."""
+    blobs, stored_bytes, raw_bytes, references, unreferenced = conn.execute("""
+        SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0), COALESCE(SUM(raw_size), 0), COALESCE(SUM(refcount), 0),
+               COALESCE(SUM(refcount <= 0), 0)
+        FROM roadmap_blobs
+    """).fetchone()
+    return {
+        "blobs": blobs,
+        "references": references,
+        "unreferenced_blobs": unreferenced,
+        "stored_bytes": stored_bytes,
+        "raw_bytes": raw_bytes,
+        "compression_ratio": round(raw_bytes / stored_bytes, 2) if stored_bytes else None,
+    }
@@ -0,0 +1,216 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+
+POOL_MAX_CONNECTIONS = 16 # Per database file; WAL lets readers run alongside the single writer
+POOL_ACQUIRE_TIMEOUT_SECONDS = 30.0
+BUSY_TIMEOUT_SECONDS = 10.0 # How long a writer waits on the database lock before "database is locked"
+STATEMENT_CACHE_SIZE = 256 # Prepared statements kept per connection, keyed by SQL text
+
+# Applied once per physical connection
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL", # Durable across application crashes; WAL makes the fsync per commit unnecessary
+    "PRAGMA mmap_size=268435456", # 256 MB memory-mapped reads
+    "PRAGMA cache_size=-16000", # 16 MB page cache per connection
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+)
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to its pool instead of closing it."""
+
+    def close(self):
+        pool = getattr(self, "_pool", None)
+        if pool is None:
+            super().close()
+        else:
+            pool.release(self)
+
+    def close_permanently(self):
+        super().close()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of long-lived SQLite connections to one database file.
+
+    Connections are created lazily up to ``max_connections`` and tuned once with
+    CONNECTION_PRAGMAS. Because connections outlive individual calls, the sqlite3
+    statement cache keeps parameterized queries prepared across Streamlit reruns.
+    A connection is used by one thread at a time; ``close()`` on it returns it here.
+
+    Connections are opened (and the initializer run) outside the pool's lock, so a slow
+    first-connection setup such as migrations never blocks threads reusing idle connections.
+    """
+
+    def __init__(self, database_name, max_connections=POOL_MAX_CONNECTIONS, initializer=None):
+        self.database_name = database_name
+        self.max_connections = max_connections
+        self._initializer = initializer
+        self._initialized = False
+        self._initialize_lock = threading.Lock() # Held while the initializer runs; later connections wait for it
+        self._idle = [] # LIFO keeps the warmest connections (and their statement caches) in use
+        self._all = set()
+        self._opening = 0 # Connections being opened outside the lock; they count towards max_connections
+        self._condition = threading.Condition()
+        self._stats = {
+            "created": 0,
+            "acquired": 0,
+            "reused": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "rollbacks_on_release": 0,
+        }
+
+    def _create_connection(self):
+        conn = sqlite3.connect(
+            self.database_name,
+            timeout=BUSY_TIMEOUT_SECONDS,
+            check_same_thread=False, # Handed between Streamlit script threads, but never shared concurrently
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=PooledConnection,
+        )
+        try:
+            for pragma in CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            if not self._initialized:
+                with self._initialize_lock:
+                    if not self._initialized and self._initializer is not None:
+                        self._initializer(conn) # One-time setup for this database file, e.g. schema creation
+                    self._initialized = True
+        except BaseException:
+            conn.close() # Not pooled yet, so this really closes it
+            raise
+        conn._pool = self
+        conn._checked_out = False
+        return conn
+
+    def acquire(self, timeout=POOL_ACQUIRE_TIMEOUT_SECONDS):
+        """Checks a connection out of the pool, creating one if the pool is not yet full."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            waited_since = None
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    self._stats["reused"] += 1
+                    break
+                if len(self._all) + self._opening < self.max_connections:
+                    self._opening += 1 # Reserve the slot, then open the connection without holding the lock
+                    conn = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError(f"Timed out waiting for a connection to {self.database_name}")
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                    self._stats["waits"] += 1
+                self._condition.wait(remaining)
+            if waited_since is not None:
+                self._stats["wait_seconds"] += time.monotonic() - waited_since
+        if conn is None:
+            try:
+                conn = self._create_connection()
+            finally:
+                with self._condition:
+                    self._opening -= 1
+                    if conn is None:
+                        self._condition.notify() # The reserved slot is free again
+                    else:
+                        self._all.add(conn)
+                        self._stats["created"] += 1
+        with self._condition:
+            self._stats["acquired"] += 1
+            conn._checked_out = True
+        return conn
+
+    def release(self, conn):
+        """Returns a connection to the pool, rolling back anything the caller left uncommitted."""
+        if not getattr(conn, "_checked_out", False):
+            return # Already returned; closing twice must not hand one connection to two threads
+        if conn.in_transaction:
+            conn.rollback()
+            self._stats["rollbacks_on_release"] += 1
+        with self._condition:
+            conn._checked_out = False
+            if conn not in self._all: # Checked out when close_all() ran
+                conn.close_permanently()
+                return
+            self._idle.append(conn)
+            self._condition.notify()
+
+    def connection(self):
+        """Context manager form: ``with pool.connection() as conn: ...``"""
+        return _PooledConnectionContext(self)
+
+    def close_all(self):
+        """Closes every idle connection; checked-out ones are closed as they are returned."""
+        with self._condition:
+            for conn in self._idle:
+                conn.close_permanently()
+            self._idle.clear()
+            self._all.clear()
+
+    def stats(self):
+        with self._condition:
+            stats = dict(self._stats)
+            stats["open"] = len(self._all)
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = len(self._all) - len(self._idle)
+            stats["max_connections"] = self.max_connections
+        return stats
+
+
+class _PooledConnectionContext:
+    def __init__(self, pool):
+        self._pool = pool
+        self._conn = None
+
+    def __enter__(self):
+        self._conn = self._pool.acquire()
+        return self._conn
+
+    def __exit__(self, *exc_info):
+        self._pool.release(self._conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database_name, initializer=None):
+    """
+    Returns the process-wide pool for a database file, creating it on first use.
+
+    ``initializer(conn)`` runs once, on the first connection the pool opens.
+    """
+    key = os.path.abspath(database_name)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(key, initializer=initializer) # Absolute, so a later chdir cannot split the database
+                _pools[key] = pool
+    return pool
+
+
+def get_pool_stats():
+    """Returns pool statistics for every open database, keyed by file path."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {path: pool.stats() for path, pool in pools.items()}
+
+
+def close_all_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+        _pools.clear()
+
+
+atexit.register(close_all_pools)
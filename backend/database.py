@@ -1,102 +1,784 @@
 import sqlite3
 import json
+from backend.connection_manager import get_pool
+from backend.migrations import apply_migrations, unique_index_columns
+from backend.blob_store import canonical_roadmap, compress_roadmap, create_roadmap_blobs_table, decode_roadmap, decode_roadmap_text, get_roadmap_blob, put_roadmap_blob
+from backend.plan_search import PLAN_SEARCH_INSERT_SQL, SEARCH_RESULT_LIMIT, build_match_query, create_plan_search_table, index_plan_search, plan_search_rows
+from backend.sharding import SHARD_COUNT, shard_database_name, shard_for_user
+from backend.roadmap_model import compile_roadmap, remap_progress
+from backend.instrumentation import log_debug, log_error, log_info, span, timed
 
-DATABASE_NAME = "career_plans.db" # SQLite database file for career plans
+IMPORT_CONFLICT_MODES = ("skip", "replace", "fail") # What import_plans_sqlite does with a plan the user already has
+EXPORT_FETCH_SIZE = 1000 # Rows pulled from the cursor at a time while exporting
 
+DATABASE_NAME = shard_database_name(0) # SQLite database file for career plans (shard 0; see backend/sharding.py)
 
-def connect_to_sqlite():
-    """Connects to the SQLite database."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    print("Successfully connected to SQLite database!")
+# Per-duration completed counters are maintained by triggers on plan_item_progress (migration 6)
+PROGRESS_UPSERT_SQL = """
+    INSERT INTO plan_item_progress (user_id, career_goal, item_id, duration_index, checked, updated_at)
+    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT (user_id, career_goal, item_id) DO UPDATE SET
+        checked = excluded.checked, duration_index = excluded.duration_index, updated_at = excluded.updated_at
+"""
+# Same upsert, skipped when the toggle was made on another version of the plan than the stored one:
+# item ids are per version, so after an edit a stale toggle would land on a different item
+VERSIONED_PROGRESS_UPSERT_SQL = """
+    INSERT INTO plan_item_progress (user_id, career_goal, item_id, duration_index, checked, updated_at)
+    SELECT :user_id, :career_goal, :item_id, :duration_index, :checked, CURRENT_TIMESTAMP
+    WHERE :version IS NULL OR EXISTS (
+        SELECT 1 FROM career_plans_sqlite WHERE user_id = :user_id AND career_goal = :career_goal AND version = :version
+    )
+    ON CONFLICT (user_id, career_goal, item_id) DO UPDATE SET
+        checked = excluded.checked, duration_index = excluded.duration_index, updated_at = excluded.updated_at
+"""
+
+
+def connect_to_sqlite(user_id=None):
+    """
+    Checks out a pooled connection to the SQLite database holding a user's plans. Calling close() on it
+    returns it to the pool.
+
+    With CAREER_PLANS_SHARDS > 1 every user lives on one shard file, so calls reading or writing a
+    user's plans must pass user_id. Without it this is shard 0 (the only shard by default).
+    """
+    return connect_to_shard(0 if user_id is None else shard_for_user(user_id))
+
+
+def connect_to_shard(shard_index):
+    """Checks out a pooled connection to one shard; each shard file has its own pool and runs its own migrations."""
+    conn = get_pool(shard_database_name(shard_index), initializer=initialize_career_plans_db).acquire()
+    log_debug("Checked out a career_plans connection (shard %d)", shard_index)
     return conn
 
+
+def for_each_shard(query, shard_count=SHARD_COUNT):
+    """
+    Fans an admin query out over every shard: returns [query(conn)] in shard order.
+
+    Shards are queried one after another; for per-user data connect to the user's shard instead.
+    """
+    results = []
+    for shard_index in range(shard_count):
+        conn = connect_to_shard(shard_index)
+        try:
+            results.append(query(conn))
+        finally:
+            conn.close()
+    return results
+
 def create_career_plans_table(conn):
-    """Creates the career_plans table if it doesn't exist, with checkbox_states column."""
-    cursor = conn.cursor()
-    cursor.execute("""
+    """Ensures the career plans schema is current. Kept for callers of the old API; the pool already does this once per process."""
+    apply_migrations(conn, CAREER_PLANS_MIGRATIONS)
+
+
+def _create_career_plans_table(conn):
+    conn.execute("""
         CREATE TABLE IF NOT EXISTS career_plans_sqlite (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id TEXT NOT NULL,
-            career_goal TEXT NOT NULL UNIQUE, 
+            career_goal TEXT NOT NULL,
             roadmap_json TEXT NOT NULL,
-            checkbox_states TEXT,          
+            checkbox_states TEXT,
             created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(user_id, career_goal)  
+            UNIQUE(user_id, career_goal)
+        )
+    """)
+
+
+def _drop_global_career_goal_unique(conn):
+    """Rebuilds tables created with `career_goal TEXT NOT NULL UNIQUE`, which stopped two users sharing a goal."""
+    if ["career_goal"] not in unique_index_columns(conn, "career_plans_sqlite"):
+        return # Already per-user unique only
+    conn.execute("ALTER TABLE career_plans_sqlite RENAME TO career_plans_sqlite_legacy")
+    _create_career_plans_table(conn)
+    conn.execute("""
+        INSERT INTO career_plans_sqlite (id, user_id, career_goal, roadmap_json, checkbox_states, created_at)
+        SELECT id, user_id, career_goal, roadmap_json, checkbox_states, created_at FROM career_plans_sqlite_legacy
+    """)
+    conn.execute("DROP TABLE career_plans_sqlite_legacy")
+
+
+def _create_plan_progress_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS plan_progress (
+            user_id TEXT NOT NULL,
+            career_goal TEXT NOT NULL,
+            item_key TEXT NOT NULL,
+            checked INTEGER NOT NULL DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, career_goal, item_key)
+        ) WITHOUT ROWID
+    """)
+
+
+def migrate_checkbox_states_to_progress(conn):
+    """
+    Moves progress stored in the legacy checkbox_states JSON column into plan_progress.
+
+    Migrated plans get checkbox_states set to NULL. Runs inside the caller's transaction.
+    Returns the number of plans migrated.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT user_id, career_goal, checkbox_states FROM career_plans_sqlite WHERE checkbox_states IS NOT NULL AND checkbox_states NOT IN ('', '{}')")
+    migrated_plans = 0
+    for user_id, career_goal, checkbox_states_str in cursor.fetchall():
+        try:
+            checkbox_states = json.loads(checkbox_states_str)
+        except json.JSONDecodeError:
+            log_error("Skipping unreadable checkbox_states for user: %s, career goal: %s", user_id, career_goal)
+            continue
+        conn.executemany("INSERT OR IGNORE INTO plan_progress (user_id, career_goal, item_key, checked) VALUES (?, ?, ?, ?)",
+                         [(user_id, career_goal, item_key, int(bool(checked))) for item_key, checked in checkbox_states.items()])
+        conn.execute("UPDATE career_plans_sqlite SET checkbox_states = NULL WHERE user_id = ? AND career_goal = ?", (user_id, career_goal))
+        migrated_plans += 1
+    if migrated_plans:
+        log_info("Migrated checkbox states of %d plan(s) into plan_progress.", migrated_plans)
+    return migrated_plans
+
+
+def _create_plan_progress_and_migrate(conn):
+    _create_plan_progress_table(conn)
+    migrate_checkbox_states_to_progress(conn)
+
+
+def _create_plan_indexes(conn):
+    # (user_id, career_goal) lookups are served by the UNIQUE(user_id, career_goal) index
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_career_plans_user_created ON career_plans_sqlite (user_id, created_at)")
+
+
+def _key_progress_by_item_id(conn):
+    """
+    Adds plan versions and replaces plan_progress (long string keys) with plan_item_progress
+    (compact integer item ids from backend.roadmap_model). Keys that no longer match any item are dropped.
+    """
+    conn.execute("ALTER TABLE career_plans_sqlite ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS plan_item_progress (
+            user_id TEXT NOT NULL,
+            career_goal TEXT NOT NULL,
+            item_id INTEGER NOT NULL,
+            checked INTEGER NOT NULL DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, career_goal, item_id)
+        ) WITHOUT ROWID
+    """)
+    plans = conn.execute("""
+        SELECT p.user_id, p.career_goal, p.roadmap_json FROM career_plans_sqlite p
+        WHERE EXISTS (SELECT 1 FROM plan_progress pp WHERE pp.user_id = p.user_id AND pp.career_goal = p.career_goal)
+    """).fetchall()
+    for user_id, career_goal, roadmap_json_str in plans:
+        try:
+            compiled = compile_roadmap(json.loads(roadmap_json_str))
+        except (json.JSONDecodeError, AttributeError):
+            continue
+        item_ids = {legacy_key: item_id for item_id, legacy_key in compiled.legacy_checkbox_keys()}
+        legacy_progress = conn.execute("SELECT item_key, checked, updated_at FROM plan_progress WHERE user_id = ? AND career_goal = ?",
+                                       (user_id, career_goal)).fetchall()
+        conn.executemany("INSERT OR REPLACE INTO plan_item_progress (user_id, career_goal, item_id, checked, updated_at) VALUES (?, ?, ?, ?, ?)",
+                         [(user_id, career_goal, item_ids[item_key], checked, updated_at)
+                          for item_key, checked, updated_at in legacy_progress if item_key in item_ids])
+    conn.execute("DROP TABLE plan_progress")
+
+
+def _create_duration_progress_counters(conn):
+    """
+    Adds persisted per-(user, goal, duration) progress counters, kept current by triggers on every
+    insert/update/delete of an item's state, and backfills them from the existing plans.
+    """
+    conn.execute("ALTER TABLE plan_item_progress ADD COLUMN duration_index INTEGER")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS plan_duration_progress (
+            user_id TEXT NOT NULL,
+            career_goal TEXT NOT NULL,
+            duration_index INTEGER NOT NULL,
+            duration TEXT NOT NULL,
+            completed INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL,
+            PRIMARY KEY (user_id, career_goal, duration_index)
+        ) WITHOUT ROWID
+    """)
+    for user_id, career_goal, roadmap_json_str in conn.execute("SELECT user_id, career_goal, roadmap_json FROM career_plans_sqlite").fetchall():
+        try:
+            compiled = compile_roadmap(json.loads(roadmap_json_str))
+        except (json.JSONDecodeError, AttributeError):
+            continue
+        conn.executemany("UPDATE plan_item_progress SET duration_index = ? WHERE user_id = ? AND career_goal = ? AND item_id = ?",
+                         [(compiled.item_durations[item_id], user_id, career_goal, item_id)
+                          for (item_id,) in conn.execute("SELECT item_id FROM plan_item_progress WHERE user_id = ? AND career_goal = ?", (user_id, career_goal)).fetchall()
+                          if 0 <= item_id < compiled.total_items])
+        _seed_duration_progress(conn, user_id, career_goal, compiled)
+        conn.execute("""
+            UPDATE plan_duration_progress SET completed = (
+                SELECT COUNT(*) FROM plan_item_progress i
+                WHERE i.user_id = plan_duration_progress.user_id AND i.career_goal = plan_duration_progress.career_goal
+                  AND i.duration_index = plan_duration_progress.duration_index AND i.checked = 1)
+            WHERE user_id = ? AND career_goal = ?
+        """, (user_id, career_goal))
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_item_progress_insert AFTER INSERT ON plan_item_progress WHEN NEW.checked = 1
+        BEGIN
+            UPDATE plan_duration_progress SET completed = completed + 1
+            WHERE user_id = NEW.user_id AND career_goal = NEW.career_goal AND duration_index = NEW.duration_index;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_item_progress_update AFTER UPDATE OF checked ON plan_item_progress WHEN NEW.checked != OLD.checked
+        BEGIN
+            UPDATE plan_duration_progress SET completed = completed + (NEW.checked - OLD.checked)
+            WHERE user_id = NEW.user_id AND career_goal = NEW.career_goal AND duration_index = NEW.duration_index;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_item_progress_delete AFTER DELETE ON plan_item_progress WHEN OLD.checked = 1
+        BEGIN
+            UPDATE plan_duration_progress SET completed = completed - 1
+            WHERE user_id = OLD.user_id AND career_goal = OLD.career_goal AND duration_index = OLD.duration_index;
+        END
+    """)
+
+
+def _seed_duration_progress(conn, user_id, career_goal, compiled):
+    """(Re)creates the per-duration counter rows of a plan with their totals and zero completed."""
+    conn.execute("DELETE FROM plan_duration_progress WHERE user_id = ? AND career_goal = ?", (user_id, career_goal))
+    conn.executemany("INSERT INTO plan_duration_progress (user_id, career_goal, duration_index, duration, completed, total) VALUES (?, ?, ?, ?, 0, ?)",
+                     [(user_id, career_goal, duration_index, duration, compiled.duration_totals[duration_index])
+                      for duration_index, duration in enumerate(compiled.durations)])
+
+
+def _add_generation_inputs(conn):
+    # JSON {education_status, resources_available, timeline}; NULL for plans stored before this migration
+    conn.execute("ALTER TABLE career_plans_sqlite ADD COLUMN generation_inputs TEXT")
+
+
+def _move_roadmaps_to_blobs(conn):
+    """
+    Moves roadmap bodies out of career_plans_sqlite into the content-addressed roadmap_blobs table.
+
+    Plans reference their body by roadmap_hash; identical roadmaps are stored once. Triggers keep
+    roadmap_blobs.refcount in step with plan inserts, updates and deletes, and
+    backend.blob_store.collect_roadmap_blobs() removes blobs that drop to zero.
+    Dropping the old column needs SQLite 3.35+.
+    """
+    create_roadmap_blobs_table(conn)
+    conn.execute("ALTER TABLE career_plans_sqlite ADD COLUMN roadmap_hash TEXT REFERENCES roadmap_blobs (blob_hash)")
+    for plan_id, roadmap_json_str in conn.execute("SELECT id, roadmap_json FROM career_plans_sqlite").fetchall():
+        try:
+            roadmap_json = json.loads(roadmap_json_str)
+        except json.JSONDecodeError:
+            roadmap_json = {} # Unreadable bodies were never displayable; keep the plan row valid
+        conn.execute("UPDATE career_plans_sqlite SET roadmap_hash = ? WHERE id = ?", (put_roadmap_blob(conn, roadmap_json), plan_id))
+    conn.execute("""
+        UPDATE roadmap_blobs SET refcount = (SELECT COUNT(*) FROM career_plans_sqlite p WHERE p.roadmap_hash = roadmap_blobs.blob_hash)
+    """)
+    conn.execute("ALTER TABLE career_plans_sqlite DROP COLUMN roadmap_json")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_plan_blob_insert AFTER INSERT ON career_plans_sqlite
+        BEGIN
+            UPDATE roadmap_blobs SET refcount = refcount + 1 WHERE blob_hash = NEW.roadmap_hash;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_plan_blob_update AFTER UPDATE OF roadmap_hash ON career_plans_sqlite
+        WHEN NEW.roadmap_hash IS NOT OLD.roadmap_hash
+        BEGIN
+            UPDATE roadmap_blobs SET refcount = refcount + 1 WHERE blob_hash = NEW.roadmap_hash;
+            UPDATE roadmap_blobs SET refcount = refcount - 1 WHERE blob_hash = OLD.roadmap_hash;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_plan_blob_delete AFTER DELETE ON career_plans_sqlite
+        BEGIN
+            UPDATE roadmap_blobs SET refcount = refcount - 1 WHERE blob_hash = OLD.roadmap_hash;
+        END
+    """)
+
+
+def _create_plan_search(conn):
+    """
+    Adds the plan_search FTS5 index over every plan's topics, sub-topics and resources and backfills it.
+    store/update_roadmap_sqlite reindex a plan as it is written; a trigger drops the entries of deleted plans.
+    """
+    # The table as first released, with user_id UNINDEXED; migration 10 rebuilds it in its current shape
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS plan_search USING fts5(
+            user_id UNINDEXED,
+            career_goal UNINDEXED,
+            duration UNINDEXED,
+            topic,
+            sub_topic_group,
+            item,
+            tokenize = 'porter unicode61'
         )
     """)
-    conn.commit()
-    print("Career plans table created (or already exists), with checkbox_states column.")
+    _backfill_plan_search(conn)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_plan_search_delete AFTER DELETE ON career_plans_sqlite
+        BEGIN
+            DELETE FROM plan_search WHERE rowid BETWEEN OLD.id * 1048576 AND OLD.id * 1048576 + 1048575;
+        END
+    """) # 1048576 = 1 << plan_search.SEARCH_ROWID_ITEM_BITS
+
+
+def _backfill_plan_search(conn):
+    plans = conn.execute("""
+        SELECT p.id, p.user_id, p.career_goal, b.body FROM career_plans_sqlite p JOIN roadmap_blobs b ON b.blob_hash = p.roadmap_hash
+    """).fetchall()
+    for plan_id, user_id, career_goal, body in plans:
+        index_plan_search(conn, plan_id, user_id, career_goal, compile_roadmap(decode_roadmap(body)))
+
+
+def _index_plan_search_user_id(conn):
+    """
+    Rebuilds plan_search with user_id as an indexed column (it was UNINDEXED), so searches can
+    MATCH on the user instead of ranking every user's rows on the shard. The delete trigger is kept.
+    """
+    conn.execute("DROP TABLE IF EXISTS plan_search")
+    create_plan_search_table(conn)
+    _backfill_plan_search(conn)
+
+
+# Append-only: never edit or reorder a released migration, add a new version instead
+CAREER_PLANS_MIGRATIONS = [
+    (1, "create career_plans_sqlite", _create_career_plans_table),
+    (2, "drop global UNIQUE on career_goal", _drop_global_career_goal_unique),
+    (3, "create plan_progress and migrate checkbox_states", _create_plan_progress_and_migrate),
+    (4, "index career plans by (user_id, created_at)", _create_plan_indexes),
+    (5, "add plan versions and key progress by compact item id", _key_progress_by_item_id),
+    (6, "add per-duration progress counters", _create_duration_progress_counters),
+    (7, "store plan generation inputs", _add_generation_inputs),
+    (8, "move roadmap bodies to content-addressed compressed blobs", _move_roadmaps_to_blobs),
+    (9, "add plan_search full-text index", _create_plan_search),
+    (10, "index plan_search by user", _index_plan_search_user_id),
+]
+
+
+def initialize_career_plans_db(conn):
+    """One-time setup run on the first pooled connection of the process: applies pending migrations."""
+    apply_migrations(conn, CAREER_PLANS_MIGRATIONS)
+
 
+@timed("db.query", op="store_roadmap")
+def store_roadmap_sqlite(conn, user_id, career_goal, roadmap_json, generation_inputs=None):
+    """
+    Stores the generated career roadmap in SQLite database and initializes its progress counters
+    and search index entries.
 
-def store_roadmap_sqlite(conn, user_id, career_goal, roadmap_json):
-    """Stores the generated career roadmap in SQLite database and initializes checkbox_states."""
-    create_career_plans_table(conn) # Ensure table exists
+    generation_inputs ({education_status, resources_available, timeline}) is kept so that parts of
+    the plan can be regenerated or extended later with the same context.
+    """
     cursor = conn.cursor()
     try:
-        roadmap_json_str = json.dumps(roadmap_json) # Convert JSON object to string before storing
         checkbox_states_json_str = json.dumps({}) # Initialize checkbox_states as empty JSON object
-        cursor.execute("INSERT INTO career_plans_sqlite (user_id, career_goal, roadmap_json, checkbox_states) VALUES (?, ?, ?, ?)",
-                       (user_id, career_goal, roadmap_json_str, checkbox_states_json_str)) # Store empty checkbox_states
-        conn.commit()
-        print(f"Roadmap for '{career_goal}' stored successfully in SQLite for user: {user_id} with initial checkbox states.")
+        generation_inputs_str = json.dumps(generation_inputs) if generation_inputs is not None else None
+        compiled = compile_roadmap(roadmap_json)
+        with conn: # Blob, plan row, counters and search entries commit together
+            with span("json.serialize", source="roadmap"):
+                roadmap_hash = put_roadmap_blob(conn, roadmap_json) # Shared with every identical roadmap already stored
+            cursor.execute("INSERT INTO career_plans_sqlite (user_id, career_goal, roadmap_hash, checkbox_states, generation_inputs) VALUES (?, ?, ?, ?, ?)",
+                           (user_id, career_goal, roadmap_hash, checkbox_states_json_str, generation_inputs_str)) # Store empty checkbox_states
+            _seed_duration_progress(conn, user_id, career_goal, compiled)
+            index_plan_search(conn, cursor.lastrowid, user_id, career_goal, compiled)
+        log_debug("Roadmap for '%s' stored in SQLite for user: %s", career_goal, user_id)
         return True
     except sqlite3.Error as e:
-        print(f"Error storing roadmap in SQLite database: {e}")
+        log_error("Error storing roadmap in SQLite database: %s", e)
         return False
 
 
+@timed("db.query", op="update_roadmap")
+def update_roadmap_sqlite(conn, user_id, career_goal, roadmap_json, expected_version, generation_inputs=None):
+    """
+    Replaces a plan's roadmap with an edited version, carrying progress over to unchanged items.
+
+    The plan version is bumped and progress is remapped by item identity (duration, topic, group,
+    text), all in one transaction; the per-duration counters and search entries are rebuilt for the new timeline.
+    Progress must be flushed from the write-behind writer first, since pending toggles refer to
+    the old item ids.
+
+    Args:
+        expected_version (int): Version the edit was based on; the update is refused if the plan changed since.
+        generation_inputs (dict): Updated generation inputs (e.g. a longer timeline), or None to keep the stored ones.
+
+    Returns:
+        int: The new version, or None if the plan does not exist, was changed concurrently, or on a database error.
+    """
+    try:
+        new_compiled = compile_roadmap(roadmap_json)
+        conn.execute("BEGIN IMMEDIATE") # Read-modify-write of one plan; no other writer may interleave
+        try:
+            row = conn.execute("SELECT roadmap_hash, version, id FROM career_plans_sqlite WHERE user_id = ? AND career_goal = ?",
+                               (user_id, career_goal)).fetchone()
+            if row is None or row[1] != expected_version:
+                conn.rollback()
+                return None
+            old_compiled = compile_roadmap(get_roadmap_blob(conn, row[0]))
+            with span("json.serialize", source="roadmap"):
+                roadmap_hash = put_roadmap_blob(conn, roadmap_json)
+            progress = {item_id: bool(checked) for item_id, checked in conn.execute(
+                "SELECT item_id, checked FROM plan_item_progress WHERE user_id = ? AND career_goal = ?", (user_id, career_goal))}
+            carried = remap_progress(old_compiled, new_compiled, progress)
+            conn.execute("""
+                UPDATE career_plans_sqlite SET roadmap_hash = ?, version = version + 1,
+                    generation_inputs = COALESCE(?, generation_inputs)
+                WHERE user_id = ? AND career_goal = ?
+            """, (roadmap_hash, json.dumps(generation_inputs) if generation_inputs is not None else None, user_id, career_goal))
+            conn.execute("DELETE FROM roadmap_blobs WHERE blob_hash = ? AND refcount <= 0", (row[0],)) # Old body, unless other plans share it
+            conn.execute("DELETE FROM plan_item_progress WHERE user_id = ? AND career_goal = ?", (user_id, career_goal))
+            _seed_duration_progress(conn, user_id, career_goal, new_compiled)
+            index_plan_search(conn, row[2], user_id, career_goal, new_compiled)
+            conn.executemany(PROGRESS_UPSERT_SQL, [(user_id, career_goal, item_id, new_compiled.item_durations[item_id], int(checked))
+                                                   for item_id, checked in carried.items()]) # Triggers recount completed items
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        log_debug("Roadmap for '%s' updated to version %d for user: %s (%d of %d progress rows carried over)",
+                  career_goal, expected_version + 1, user_id, len(carried), len(progress))
+        return expected_version + 1
+    except sqlite3.Error as e:
+        log_error("Error updating roadmap in SQLite database: %s", e)
+        return None
+
+
+@timed("db.query", op="fetch_roadmap")
 def fetch_roadmap_sqlite(conn, user_id, career_goal):
-    """Fetches a specific career roadmap and checkbox states from SQLite database."""
-    cursor = conn.cursor()
-    cursor.execute("SELECT roadmap_json, checkbox_states FROM career_plans_sqlite WHERE user_id = ? AND career_goal = ?", (user_id, career_goal))
-    result = cursor.fetchone()
-    if result:
-        roadmap_json_str, checkbox_states_str = result # Unpack both roadmap_json and checkbox_states
-        roadmap_json = json.loads(roadmap_json_str) # Parse roadmap_json string back to object
-        checkbox_states = json.loads(checkbox_states_str) if checkbox_states_str else {} # Parse checkbox_states, default to empty dict if None
-        print(f"Roadmap and checkbox states for '{career_goal}' fetched successfully from SQLite for user: {user_id}")
+    """Fetches a specific career roadmap and its checkbox states ({item_id: checked}) from SQLite database."""
+    roadmap_json = fetch_roadmap_json_sqlite(conn, user_id, career_goal)
+    if roadmap_json is not None:
+        checkbox_states = fetch_progress_sqlite(conn, user_id, career_goal) # Primary-key range scan on plan_item_progress
+        log_debug("Roadmap and checkbox states for '%s' fetched from SQLite for user: %s", career_goal, user_id)
         return roadmap_json, checkbox_states # Return both roadmap_json and checkbox_states
     else:
-        print(f"No roadmap found in SQLite for user: {user_id} and career goal: {career_goal}")
+        log_debug("No roadmap found in SQLite for user: %s and career goal: %s", user_id, career_goal)
         return None, {} # Return None roadmap and empty dict for checkbox_states
 
+@timed("db.query", op="fetch_roadmap_json")
+def fetch_roadmap_json_sqlite(conn, user_id, career_goal):
+    """Fetches and decodes only the roadmap JSON of a plan (from its shared compressed blob), or None if it does not exist."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT b.body FROM career_plans_sqlite p JOIN roadmap_blobs b ON b.blob_hash = p.roadmap_hash
+        WHERE p.user_id = ? AND p.career_goal = ?
+    """, (user_id, career_goal))
+    result = cursor.fetchone()
+    if not result:
+        return None
+    with span("json.parse", source="roadmap"):
+        return decode_roadmap(result[0]) # Decompress and parse the roadmap body
+
+@timed("db.query", op="fetch_progress")
+def fetch_progress_sqlite(conn, user_id, career_goal):
+    """Fetches {item_id: checked} for one plan from plan_item_progress."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT item_id, checked FROM plan_item_progress WHERE user_id = ? AND career_goal = ?", (user_id, career_goal))
+    return {item_id: bool(checked) for item_id, checked in cursor.fetchall()}
+
+@timed("db.query", op="fetch_roadmap_version")
+def fetch_roadmap_version_sqlite(conn, user_id, career_goal):
+    """Returns the stored version of a plan, or None if it does not exist. Cheap: no roadmap JSON is read."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT version FROM career_plans_sqlite WHERE user_id = ? AND career_goal = ?", (user_id, career_goal))
+    result = cursor.fetchone()
+    return result[0] if result else None
+
+@timed("db.query", op="fetch_generation_inputs")
+def fetch_generation_inputs_sqlite(conn, user_id, career_goal):
+    """Returns the stored {education_status, resources_available, timeline} of a plan, or None if unknown."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT generation_inputs FROM career_plans_sqlite WHERE user_id = ? AND career_goal = ?", (user_id, career_goal))
+    result = cursor.fetchone()
+    return json.loads(result[0]) if result and result[0] else None
+
+@timed("db.query", op="fetch_duration_progress")
+def fetch_duration_progress_sqlite(conn, user_id, career_goal):
+    """Returns [(duration, completed, total)] in timeline order from the persisted counters."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT duration, completed, total FROM plan_duration_progress WHERE user_id = ? AND career_goal = ? ORDER BY duration_index",
+                   (user_id, career_goal))
+    return cursor.fetchall()
+
+@timed("db.query", op="fetch_progress_summary")
+def fetch_progress_summary_sqlite(conn, user_id):
+    """
+    Returns [(career_goal, completed, total)] for every plan of a user from the persisted counters.
+
+    One primary-key range scan over plan_duration_progress; no roadmap JSON is read.
+    Counters reflect flushed toggles, so they can trail the write-behind writer by one flush interval.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT career_goal, SUM(completed), SUM(total) FROM plan_duration_progress WHERE user_id = ? GROUP BY career_goal ORDER BY career_goal",
+                   (user_id,))
+    return cursor.fetchall()
+
+@timed("db.query", op="search_plans")
+def search_plans_sqlite(conn, user_id, query, limit=SEARCH_RESULT_LIMIT):
+    """
+    Full-text search over the topics, sub-topics and resources of a user's plans.
+
+    Served from the plan_search FTS5 index; no roadmap JSON is read. Every word of the query must
+    match (as a prefix), best matches first. The user is part of the MATCH expression, so the cost
+    follows the user's own plans rather than everything on the shard.
+
+    Returns:
+        list: (career_goal, duration, topic, item) hits, or [] if the query has no searchable words.
+    """
+    match_query = build_match_query(query, user_id)
+    if match_query is None:
+        return []
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT career_goal, duration, topic, CASE WHEN sub_topic_group != '' THEN sub_topic_group || ': ' || item ELSE item END
+            FROM plan_search WHERE plan_search MATCH ? AND user_id = ?
+            ORDER BY bm25(plan_search, 0, 0, 0, 2.0, 1.0, 1.0), rowid LIMIT ?
+        """, (match_query, user_id, limit))
+    except sqlite3.OperationalError as e:
+        log_error("Plan search for %r failed: %s", query, e)
+        return []
+    return cursor.fetchall()
+
+@timed("db.query", op="fetch_career_goals")
 def fetch_career_goals_for_user_sqlite(conn, user_id):
     """Fetches a list of career goals for a given user from SQLite database."""
-    create_career_plans_table(conn) # Ensure table exists
     cursor = conn.cursor()
     cursor.execute("SELECT DISTINCT career_goal FROM career_plans_sqlite WHERE user_id = ?", (user_id,))
     results = cursor.fetchall()
     career_goals = [row[0] for row in results] # Extract career goals from tuples
-    print(f"Career goals fetched from SQLite for user: {user_id}: {career_goals}")
+    log_debug("Career goals fetched from SQLite for user: %s: %s", user_id, career_goals)
     return career_goals
 
-def update_checkbox_states_sqlite(conn, user_id, career_goal, checkbox_states):
-    """Updates the checkbox states in SQLite database for a specific roadmap."""
-    cursor = conn.cursor()
+@timed("db.query", op="set_progress_item")
+def set_progress_item_sqlite(conn, user_id, career_goal, item_id, duration_index, checked):
+    """Upserts the state of a single checklist item (one checkbox toggle)."""
     try:
-        checkbox_states_json_str = json.dumps(checkbox_states) # Serialize checkbox_states to JSON string
-        cursor.execute("UPDATE career_plans_sqlite SET checkbox_states = ? WHERE user_id = ? AND career_goal = ?",
-                       (checkbox_states_json_str, user_id, career_goal))
+        conn.execute(PROGRESS_UPSERT_SQL, (user_id, career_goal, item_id, duration_index, int(bool(checked))))
         conn.commit()
-        print(f"Checkbox states updated successfully in SQLite for user: {user_id}, career goal: {career_goal}")
         return True
     except sqlite3.Error as e:
-        print(f"Error updating checkbox states in SQLite database: {e}")
+        log_error("Error updating progress item in SQLite database: %s", e)
         return False
-def update_progress_db(user_id, career_goal, checkbox_id): # Removed sqlite_conn from function args, no longer passed as arg
-    """Callback function to update checkbox state in SQLite database. Establishes its own DB connection."""
-    checkbox_state = st.session_state.get(checkbox_id, False)
-    print(f"--- update_progress_db: Checkbox '{checkbox_id}' state changed to: {checkbox_state} ---")
-
-    sqlite_conn = connect_to_sqlite() # Establish NEW SQLite connection WITHIN the callback function
-    if sqlite_conn:
-        current_checkbox_states = fetch_checkbox_states_from_session_state()
-        update_checkbox_states_sqlite(sqlite_conn, user_id, career_goal, current_checkbox_states)
-        print(f"--- update_progress_db: Checkbox state updated in database for: {checkbox_id} ---")
-        sqlite_conn.close() # Close DB connection AFTER update operation WITHIN the callback
-    else:
-        print("--- update_progress_db: Warning - Database connection failed. Checkbox state not saved. ---")
 
+def set_progress_items_sqlite(conn, user_id, career_goal, item_states, item_durations):
+    """
+    Upserts many checklist items of one plan in one transaction, e.g. marking a whole month as done.
+
+    Args:
+        item_states (dict): {item_id: checked}.
+        item_durations (sequence): Item id -> duration index, e.g. CompiledRoadmap.item_durations.
+    """
+    return set_progress_rows_sqlite(conn, [(user_id, career_goal, item_id, item_durations[item_id], checked) for item_id, checked in item_states.items()])
+
+@timed("db.query", op="set_progress_rows")
+def set_progress_rows_sqlite(conn, rows):
+    """Upserts (user_id, career_goal, item_id, duration_index, checked) rows, across any number of plans, in one transaction."""
+    try:
+        with conn:
+            conn.executemany(PROGRESS_UPSERT_SQL, [(user_id, career_goal, item_id, duration_index, int(bool(checked)))
+                                                   for user_id, career_goal, item_id, duration_index, checked in rows])
+        return True
+    except sqlite3.Error as e:
+        log_error("Error updating progress items in SQLite database: %s", e)
+        return False
+
+@timed("db.query", op="set_versioned_progress_rows")
+def set_versioned_progress_rows_sqlite(conn, rows):
+    """
+    Upserts (user_id, career_goal, version, item_id, duration_index, checked) rows in one transaction,
+    dropping those whose plan is no longer at that version (a version of None is always written).
+
+    Returns:
+        int: The number of rows written (stale ones are not counted), or None on a database error.
+    """
+    try:
+        with conn:
+            cursor = conn.executemany(VERSIONED_PROGRESS_UPSERT_SQL, [
+                {"user_id": user_id, "career_goal": career_goal, "version": version, "item_id": item_id,
+                 "duration_index": duration_index, "checked": int(bool(checked))}
+                for user_id, career_goal, version, item_id, duration_index, checked in rows])
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        log_error("Error updating progress items in SQLite database: %s", e)
+        return None
+
+@timed("db.query", op="move_user_plans")
+def move_user_plans_sqlite(source_conn, target_conn, user_id):
+    """
+    Moves all plans of a user, with their progress, counters and search entries, between shards.
+
+    The target is committed before anything is deleted from the source, and any rows the user
+    already has on the target (from an interrupted earlier move) are replaced. Returns the number
+    of plans moved.
+    """
+    plans = source_conn.execute("""
+        SELECT p.career_goal, p.checkbox_states, p.created_at, p.version, p.generation_inputs, b.body
+        FROM career_plans_sqlite p JOIN roadmap_blobs b ON b.blob_hash = p.roadmap_hash
+        WHERE p.user_id = ?
+    """, (user_id,)).fetchall()
+    item_progress = source_conn.execute("SELECT career_goal, item_id, duration_index, checked, updated_at FROM plan_item_progress WHERE user_id = ?",
+                                        (user_id,)).fetchall()
+    duration_progress = source_conn.execute("SELECT career_goal, duration_index, duration, completed, total FROM plan_duration_progress WHERE user_id = ?",
+                                            (user_id,)).fetchall()
+    with target_conn:
+        for table in ("plan_item_progress", "plan_duration_progress", "career_plans_sqlite"): # Triggers drop search entries and blob references
+            target_conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+        for career_goal, checkbox_states, created_at, version, generation_inputs, body in plans:
+            roadmap_json = decode_roadmap(body)
+            cursor = target_conn.execute("""
+                INSERT INTO career_plans_sqlite (user_id, career_goal, roadmap_hash, checkbox_states, created_at, version, generation_inputs)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (user_id, career_goal, put_roadmap_blob(target_conn, roadmap_json), checkbox_states, created_at, version, generation_inputs))
+            index_plan_search(target_conn, cursor.lastrowid, user_id, career_goal, compile_roadmap(roadmap_json))
+        # Item rows before counter rows: the counter triggers find nothing to update, the copied counters are already exact
+        target_conn.executemany("INSERT INTO plan_item_progress (user_id, career_goal, item_id, duration_index, checked, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                                [(user_id, *row) for row in item_progress])
+        target_conn.executemany("INSERT INTO plan_duration_progress (user_id, career_goal, duration_index, duration, completed, total) VALUES (?, ?, ?, ?, ?, ?)",
+                                [(user_id, *row) for row in duration_progress])
+    with source_conn:
+        for table in ("plan_item_progress", "plan_duration_progress", "career_plans_sqlite"):
+            source_conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+        source_conn.execute("DELETE FROM roadmap_blobs WHERE refcount <= 0")
+    log_info("Moved %d plan(s) of user %s to another shard", len(plans), user_id)
+    return len(plans)
+
+def export_plans_sqlite(conn):
+    """
+    Streams every plan of one database as (plan, roadmap_text) pairs, in (user_id, career_goal) order.
+
+    ``plan`` is {user_id, career_goal, created_at, version, generation_inputs, progress}, with progress
+    as [[item_id, checked], ...]; ``roadmap_text`` is the roadmap's canonical JSON, left unparsed so
+    it can be written out as-is. Plans and progress are read by two cursors merged in primary-key
+    order inside one read transaction: a consistent snapshot in constant memory.
+    """
+    conn.execute("BEGIN") # Snapshot; WAL lets writers carry on meanwhile
+    try:
+        plans = conn.execute("""
+            SELECT p.user_id, p.career_goal, p.created_at, p.version, p.generation_inputs, p.roadmap_hash, b.body
+            FROM career_plans_sqlite p JOIN roadmap_blobs b ON b.blob_hash = p.roadmap_hash
+            ORDER BY p.user_id, p.career_goal
+        """)
+        progress = conn.execute("SELECT user_id, career_goal, item_id, checked FROM plan_item_progress ORDER BY user_id, career_goal, item_id")
+        progress_row = progress.fetchone()
+        last_hash, last_text = None, None # Shared bodies are often adjacent; decompress them once
+        while True:
+            rows = plans.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            for user_id, career_goal, created_at, version, generation_inputs, roadmap_hash, body in rows:
+                plan_progress = []
+                while progress_row is not None and (progress_row[0], progress_row[1]) < (user_id, career_goal):
+                    progress_row = progress.fetchone() # Progress of a plan that no longer exists
+                while progress_row is not None and progress_row[0] == user_id and progress_row[1] == career_goal:
+                    plan_progress.append([progress_row[2], bool(progress_row[3])])
+                    progress_row = progress.fetchone()
+                if roadmap_hash != last_hash:
+                    last_hash, last_text = roadmap_hash, decode_roadmap_text(body)
+                yield {
+                    "user_id": user_id,
+                    "career_goal": career_goal,
+                    "created_at": created_at,
+                    "version": version,
+                    "generation_inputs": json.loads(generation_inputs) if generation_inputs else None,
+                    "progress": plan_progress,
+                }, last_text
+    finally:
+        conn.rollback()
+
+@timed("db.query", op="import_plans")
+def import_plans_sqlite(conn, plans, on_conflict="skip"):
+    """
+    Inserts a batch of exported plans (dicts with a "roadmap") in one transaction, using executemany
+    for blobs, plans, counters, progress and search entries.
+
+    Args:
+        plans (list): Plans as produced by the export, each with its parsed "roadmap".
+        on_conflict (str): For plans the user already has: "skip" keeps the stored plan, "replace"
+                           overwrites it (progress included) under a version above both the stored
+                           and the imported one, "fail" raises before writing anything.
+
+    Returns:
+        dict: {"imported": n, "skipped": n, "replaced": n}; replaced plans are also counted as imported.
+
+    Raises:
+        ValueError: For an unknown on_conflict mode, or on a conflict with on_conflict="fail".
+    """
+    if on_conflict not in IMPORT_CONFLICT_MODES:
+        raise ValueError(f"on_conflict must be one of {IMPORT_CONFLICT_MODES}, not {on_conflict!r}")
+    counts = {"imported": 0, "skipped": 0, "replaced": 0}
+    conn.execute("BEGIN IMMEDIATE") # Plan ids are assigned below; no other writer may take them meanwhile
+    try:
+        existing = {} # (user_id, career_goal) -> stored version
+        keys = [(plan["user_id"], plan["career_goal"]) for plan in plans]
+        for start in range(0, len(keys), 400): # Stay under SQLite's bound-parameter limit
+            chunk = keys[start:start + 400]
+            existing.update(((user_id, career_goal), version) for user_id, career_goal, version in conn.execute(f"""
+                SELECT user_id, career_goal, version FROM career_plans_sqlite
+                WHERE (user_id, career_goal) IN (VALUES {", ".join(["(?, ?)"] * len(chunk))})
+            """, [value for key in chunk for value in key]).fetchall())
+        if existing and on_conflict == "fail":
+            raise ValueError(f"{len(existing)} plan(s) already exist, e.g. {sorted(existing)[0]}")
+        if existing and on_conflict == "replace":
+            for table in ("plan_item_progress", "plan_duration_progress", "career_plans_sqlite"): # Triggers drop search entries and blob references
+                conn.executemany(f"DELETE FROM {table} WHERE user_id = ? AND career_goal = ?", sorted(existing))
+            counts["replaced"] = len(existing)
+
+        next_plan_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM career_plans_sqlite").fetchone()[0] + 1
+        blob_rows, plan_rows, counter_rows, progress_rows, search_rows = [], [], [], [], []
+        compiled_by_hash = {} # Identical roadmaps in a batch are compiled and compressed once
+        seen = set()
+        for plan in plans:
+            key = (plan["user_id"], plan["career_goal"])
+            if (key in existing and on_conflict == "skip") or key in seen:
+                counts["skipped"] += 1
+                continue
+            seen.add(key)
+            roadmap_json = plan["roadmap"]
+            blob_hash, raw = canonical_roadmap(roadmap_json)
+            compiled = compiled_by_hash.get(blob_hash)
+            if compiled is None:
+                compiled = compiled_by_hash[blob_hash] = compile_roadmap(roadmap_json)
+                blob_rows.append((blob_hash, compress_roadmap(raw), len(raw)))
+            generation_inputs = plan.get("generation_inputs")
+            version = plan.get("version") or 1
+            if key in existing: # Replaced: a new version, so compiled roadmaps and pending toggles of the old body are not reused
+                version = max(existing[key], version) + 1
+            plan_rows.append((next_plan_id, *key, blob_hash, json.dumps({}), plan.get("created_at"), version,
+                              json.dumps(generation_inputs) if generation_inputs is not None else None))
+            counter_rows.extend((*key, duration_index, duration, compiled.duration_totals[duration_index])
+                                for duration_index, duration in enumerate(compiled.durations))
+            progress_rows.extend((*key, item_id, compiled.item_durations[item_id], int(bool(checked)))
+                                 for item_id, checked in plan.get("progress") or () if 0 <= item_id < compiled.total_items)
+            search_rows.extend(plan_search_rows(next_plan_id, *key, compiled))
+            next_plan_id += 1
+
+        conn.executemany("INSERT OR IGNORE INTO roadmap_blobs (blob_hash, body, raw_size) VALUES (?, ?, ?)", blob_rows)
+        conn.executemany("""
+            INSERT INTO career_plans_sqlite (id, user_id, career_goal, roadmap_hash, checkbox_states, created_at, version, generation_inputs)
+            VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?)
+        """, plan_rows)
+        conn.executemany("INSERT INTO plan_duration_progress (user_id, career_goal, duration_index, duration, completed, total) VALUES (?, ?, ?, ?, 0, ?)",
+                         counter_rows)
+        conn.executemany(PROGRESS_UPSERT_SQL, progress_rows) # Triggers count completed items into the counters above
+        conn.executemany(PLAN_SEARCH_INSERT_SQL, search_rows)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    counts["imported"] = len(plan_rows)
+    return counts
+
+@timed("db.query", op="update_checkbox_states")
+def update_checkbox_states_sqlite(conn, user_id, career_goal, checkbox_states):
+    """Updates the checkbox states ({item_id: checked}) in SQLite database for a specific roadmap (bulk upsert)."""
+    roadmap_json = fetch_roadmap_json_sqlite(conn, user_id, career_goal)
+    if roadmap_json is None:
+        log_error("No roadmap found in SQLite for user: %s and career goal: %s", user_id, career_goal)
+        return False
+    compiled = compile_roadmap(roadmap_json) # Needed to attribute each item to its duration counter
+    known_states = {item_id: checked for item_id, checked in checkbox_states.items() if 0 <= item_id < compiled.total_items}
+    if set_progress_items_sqlite(conn, user_id, career_goal, known_states, compiled.item_durations):
+        log_debug("Checkbox states updated in SQLite for user: %s, career goal: %s", user_id, career_goal)
+        return True
+    return False
 
 if __name__ == "__main__":
     # Example usage (for testing database.py directly)
@@ -128,7 +810,7 @@ if __name__ == "__main__":
             print("Failed to fetch roadmap or no roadmap found in SQLite.")
 
         # Example update checkbox states (for testing)
-        updated_checkbox_states = {"Month 1-Fundamentals-Learn Python basics (Persistent Progress Test)": True}
+        updated_checkbox_states = {0: True} # Item 0: "Learn Python basics (Persistent Progress Test)"
         if update_checkbox_states_sqlite(conn, test_user_id, test_career_goal, updated_checkbox_states):
             print("Checkbox states updated successfully in SQLite.")
 
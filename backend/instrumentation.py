@@ -0,0 +1,276 @@
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# How much instrumentation runs, from the TRACE_LEVEL environment variable:
+#   off     - spans and metrics are no-ops; only warnings and errors are logged
+#   metrics - spans feed the in-process histograms; notable events (e.g. migrations) are logged (default)
+#   debug   - metrics, plus a log line per span and per-request diagnostic messages
+TRACE_LEVELS = {"off": 0, "metrics": 1, "debug": 2}
+TRACE_LEVEL = TRACE_LEVELS.get(os.environ.get("TRACE_LEVEL", "metrics").strip().lower(), 1)
+METRICS_EXPORT_PATH = os.environ.get("METRICS_EXPORT_PATH") # Written at exit; ".prom" selects Prometheus text, anything else JSON
+
+# Histogram bucket upper bounds, in seconds for spans
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+logger = logging.getLogger("career_planner")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel({0: logging.WARNING, 1: logging.INFO}.get(TRACE_LEVEL, logging.DEBUG))
+    logger.propagate = False
+
+
+class Histogram:
+    """Fixed-bucket histogram (count, sum, cumulative bucket counts), as in the Prometheus data model."""
+
+    __slots__ = ("buckets", "counts", "count", "total")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None when empty or beyond the last bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return None
+
+
+class MetricsRegistry:
+    """Thread-safe, in-process store of histograms and counters, keyed by (name, sorted labels)."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, labels=None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def increment(self, name, amount=1, labels=None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def to_dict(self):
+        """JSON-friendly snapshot: count/sum/p50/p95/p99 per histogram and the value of each counter."""
+        with self._lock:
+            histograms = [(name, dict(labels), histogram.count, histogram.total,
+                           histogram.quantile(0.5), histogram.quantile(0.95), histogram.quantile(0.99))
+                          for (name, labels), histogram in sorted(self._histograms.items())]
+            counters = [(name, dict(labels), value) for (name, labels), value in sorted(self._counters.items())]
+        return {
+            "histograms": [{"name": name, "labels": labels, "count": count, "sum": total, "p50": p50, "p95": p95, "p99": p99}
+                           for name, labels, count, total, p50, p95, p99 in histograms],
+            "counters": [{"name": name, "labels": labels, "value": value} for name, labels, value in counters],
+        }
+
+    def to_prometheus(self):
+        """Prometheus text exposition format (histograms in seconds, counters as _total)."""
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            typed = set()
+            for (name, labels), histogram in histograms:
+                metric = _prometheus_name(name) + "_seconds"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} histogram")
+                    typed.add(metric)
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{metric}_bucket{_prometheus_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{metric}_sum{_prometheus_labels(labels)} {histogram.total}")
+                lines.append(f"{metric}_count{_prometheus_labels(labels)} {histogram.count}")
+            for (name, labels), value in counters:
+                metric = _prometheus_name(name) + "_total"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} counter")
+                    typed.add(metric)
+                lines.append(f"{metric}{_prometheus_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _prometheus_name(name):
+    return "career_planner_" + "".join(char if char.isalnum() else "_" for char in name)
+
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry():
+    return _registry
+
+
+class Span:
+    """A timed operation. ``set()`` attaches attributes; numeric ones are also summed into counters."""
+
+    __slots__ = ("name", "labels", "attributes", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.attributes = {}
+        self.start = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+@contextmanager
+def span(name, **labels):
+    """
+    Times the enclosed block into the ``name`` histogram (seconds).
+
+    Keyword arguments become metric labels, so keep them low-cardinality (an operation or
+    page name, never a user id). An exception marks the span with status="error" (or "interrupted"
+    for GeneratorExit, KeyboardInterrupt and the like) and is re-raised.
+    At TRACE_LEVEL=off this yields a shared no-op span and records nothing.
+
+    Usage:
+        with span("llm.request", mode="stream") as current:
+            ...
+            current.set(completion_tokens=123)
+    """
+    if TRACE_LEVEL == 0:
+        yield _NOOP_SPAN
+        return
+    current = Span(name, labels)
+    status = "ok"
+    try:
+        yield current
+    except Exception:
+        status = "error"
+        raise
+    except BaseException:
+        status = "interrupted" # e.g. a generator closed mid-span, or Streamlit's rerun/stop
+        raise
+    finally:
+        _finish_span(current, status)
+
+
+def _finish_span(current, status):
+    elapsed = time.perf_counter() - current.start
+    labels = dict(current.labels, status=status)
+    _registry.observe(current.name, elapsed, labels)
+    for attribute, value in current.attributes.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            _registry.increment(f"{current.name}.{attribute}", value, current.labels)
+    if TRACE_LEVEL >= TRACE_LEVELS["debug"]:
+        logger.debug("span %s %.2fms %s %s", current.name, elapsed * 1000, labels, current.attributes)
+
+
+def timed(name, **labels):
+    """Decorator form of span(). At TRACE_LEVEL=off the function is returned unwrapped."""
+    def decorator(func):
+        if TRACE_LEVEL == 0:
+            return func
+        def wrapper(*args, **kwargs):
+            with span(name, **labels):
+                return func(*args, **kwargs)
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
+        return wrapper
+    return decorator
+
+
+def observe(name, value, **labels):
+    """Records one value (e.g. a queue wait in seconds) into a histogram."""
+    if TRACE_LEVEL:
+        _registry.observe(name, value, labels)
+
+
+def increment(name, amount=1, **labels):
+    if TRACE_LEVEL:
+        _registry.increment(name, amount, labels)
+
+
+def log_debug(message, *args):
+    """Diagnostic message, only formatted and emitted at TRACE_LEVEL=debug."""
+    logger.debug(message, *args)
+
+
+def log_info(message, *args):
+    logger.info(message, *args)
+
+
+def log_error(message, *args):
+    logger.error(message, *args)
+
+
+def export_metrics_json():
+    return _registry.to_dict()
+
+
+def export_metrics_prometheus():
+    return _registry.to_prometheus()
+
+
+def write_metrics(path):
+    """Writes the current metrics to a file: Prometheus text for a ".prom" path, JSON otherwise."""
+    with open(path, "w", encoding="utf-8") as metrics_file:
+        if path.endswith(".prom"):
+            metrics_file.write(export_metrics_prometheus())
+        else:
+            json.dump(export_metrics_json(), metrics_file, indent=2)
+
+
+def _write_metrics_at_exit():
+    if METRICS_EXPORT_PATH and TRACE_LEVEL:
+        try:
+            write_metrics(METRICS_EXPORT_PATH)
+        except OSError as e:
+            log_error("Could not write metrics to %s: %s", METRICS_EXPORT_PATH, e)
+
+
+atexit.register(_write_metrics_at_exit)
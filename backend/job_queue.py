@@ -0,0 +1,389 @@
+import atexit
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from backend.connection_manager import get_pool
+from backend.migrations import apply_migrations
+from backend.instrumentation import increment, log_debug, log_error, log_info, observe, span
+
+DATABASE_NAME = "jobs.db" # Separate file: job polling and heartbeats never contend with plan writes
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4")) # Roadmap generations running at once in this process
+JOB_POLL_INTERVAL_SECONDS = 2.0 # Idle workers look for jobs submitted by other processes this often
+JOB_STALE_SECONDS = 300.0 # A running job without a heartbeat for this long is assumed lost and requeued
+JOB_MAX_ATTEMPTS = 2
+
+DUPLICATE_PLAN_ERROR = "A plan for this goal already exists. Regenerate or extend it from the Monitor Goal page."
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+ACTIVE_JOB_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+# What a job does; generation_inputs holds the inputs of its kind
+JOB_KIND_GENERATE = "generate" # A new roadmap: education_status, resources_available, timeline
+JOB_KIND_REGENERATE_DURATION = "regenerate_duration" # An edit of a stored plan: duration
+JOB_KIND_EXTEND_TIMELINE = "extend_timeline" # An edit of a stored plan: new_timeline
+
+_PLAN_EDIT_ERRORS = {
+    JOB_KIND_REGENERATE_DURATION: "Could not regenerate this duration. Please try again.",
+    JOB_KIND_EXTEND_TIMELINE: "Could not extend the timeline. Please try again.",
+}
+
+
+def connect_to_jobs_db():
+    """Checks out a pooled connection to the jobs database. Calling close() on it returns it to the pool."""
+    return get_pool(DATABASE_NAME, initializer=initialize_jobs_db).acquire()
+
+
+def _create_generation_jobs_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS generation_jobs (
+            job_id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            career_goal TEXT NOT NULL,
+            generation_inputs TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker TEXT,
+            partial_timeline TEXT,
+            error TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            heartbeat_at REAL,
+            finished_at REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_generation_jobs_status_created ON generation_jobs (status, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_generation_jobs_user_created ON generation_jobs (user_id, created_at)")
+
+
+def _add_generation_jobs_kind(conn):
+    conn.execute(f"ALTER TABLE generation_jobs ADD COLUMN kind TEXT NOT NULL DEFAULT '{JOB_KIND_GENERATE}'")
+
+
+# Append-only: never edit or reorder a released migration, add a new version instead
+JOBS_MIGRATIONS = [
+    (1, "create generation_jobs", _create_generation_jobs_table),
+    (2, "add generation_jobs.kind for plan edit jobs", _add_generation_jobs_kind),
+]
+
+
+def initialize_jobs_db(conn):
+    """One-time setup run on the first pooled connection of the process: applies pending migrations."""
+    apply_migrations(conn, JOBS_MIGRATIONS)
+
+
+def _job_from_row(row):
+    if row is None:
+        return None
+    (job_id, kind, user_id, career_goal, generation_inputs, status, attempts, partial_timeline, error,
+     created_at, started_at, finished_at) = row
+    return {
+        "job_id": job_id,
+        "kind": kind,
+        "user_id": user_id,
+        "career_goal": career_goal,
+        "generation_inputs": json.loads(generation_inputs),
+        "status": status,
+        "attempts": attempts,
+        "timeline": json.loads(partial_timeline) if partial_timeline else {}, # Durations generated so far
+        "error": error,
+        "created_at": created_at,
+        "started_at": started_at,
+        "finished_at": finished_at,
+    }
+
+
+_JOB_COLUMNS = ("job_id, kind, user_id, career_goal, generation_inputs, status, attempts, partial_timeline, error, "
+                "created_at, started_at, finished_at")
+
+
+def _submit_job(kind, user_id, career_goal, generation_inputs):
+    job_id = uuid.uuid4().hex
+    conn = connect_to_jobs_db()
+    try:
+        with conn:
+            conn.execute("INSERT INTO generation_jobs (job_id, kind, user_id, career_goal, generation_inputs, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (job_id, kind, user_id, career_goal, json.dumps(generation_inputs), JOB_QUEUED, time.time()))
+    finally:
+        conn.close()
+    increment("job.submitted", kind=kind)
+    log_debug("Queued %s job %s for '%s' of user: %s", kind, job_id, career_goal, user_id)
+    get_job_worker_pool().notify()
+    return job_id
+
+
+def submit_generation_job(user_id, career_goal, education_status, resources_available, timeline):
+    """
+    Queues a roadmap generation and makes sure this process has workers to run it.
+
+    Returns:
+        str: The job id, to be polled with fetch_job().
+    """
+    return _submit_job(JOB_KIND_GENERATE, user_id, career_goal,
+                       {"education_status": education_status, "resources_available": resources_available, "timeline": timeline})
+
+
+def submit_plan_edit_job(user_id, career_goal, kind, **edit_inputs):
+    """
+    Queues an edit of a stored plan: JOB_KIND_REGENERATE_DURATION with ``duration``, or
+    JOB_KIND_EXTEND_TIMELINE with ``new_timeline``. Edits call the LLM too, so they share the
+    worker pool (and its cap on concurrent generations) with new roadmaps.
+
+    Returns:
+        str: The job id, to be polled with fetch_job().
+    """
+    if kind not in _PLAN_EDIT_ERRORS:
+        raise ValueError(f"Unknown plan edit: {kind}")
+    return _submit_job(kind, user_id, career_goal, edit_inputs)
+
+
+def fetch_job(job_id):
+    """Returns a job as a dict (status, timeline generated so far, error, timestamps), or None."""
+    conn = connect_to_jobs_db()
+    try:
+        row = conn.execute(f"SELECT {_JOB_COLUMNS} FROM generation_jobs WHERE job_id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _job_from_row(row)
+
+
+def fetch_active_job_for_user(user_id, kind=JOB_KIND_GENERATE):
+    """The user's most recent queued or running job of a kind, or None; lets a page pick a job back up after navigation."""
+    conn = connect_to_jobs_db()
+    try:
+        row = conn.execute(f"""
+            SELECT {_JOB_COLUMNS} FROM generation_jobs
+            WHERE user_id = ? AND kind = ? AND status IN (?, ?) ORDER BY created_at DESC LIMIT 1
+        """, (user_id, kind, *ACTIVE_JOB_STATUSES)).fetchone()
+    finally:
+        conn.close()
+    return _job_from_row(row)
+
+
+def claim_next_job(worker):
+    """
+    Atomically claims the oldest queued job (or a running one whose worker stopped heartbeating).
+
+    The select and the status change are one UPDATE ... RETURNING statement inside a write
+    transaction, so two workers, in this or another process, can never claim the same job.
+
+    Returns:
+        dict: The claimed job, or None if there is nothing to run.
+    """
+    now = time.time()
+    conn = connect_to_jobs_db()
+    try:
+        with conn:
+            row = conn.execute(f"""
+                UPDATE generation_jobs SET status = ?, worker = ?, attempts = attempts + 1, started_at = ?, heartbeat_at = ?
+                WHERE job_id = (
+                    SELECT job_id FROM generation_jobs
+                    WHERE status = ? OR (status = ? AND heartbeat_at < ? AND attempts < ?)
+                    ORDER BY created_at LIMIT 1
+                )
+                RETURNING {_JOB_COLUMNS}
+            """, (JOB_RUNNING, worker, now, now, JOB_QUEUED, JOB_RUNNING, now - JOB_STALE_SECONDS, JOB_MAX_ATTEMPTS)).fetchone()
+    finally:
+        conn.close()
+    return _job_from_row(row)
+
+
+def _update_job(job_id, **columns):
+    assignments = ", ".join(f"{column} = ?" for column in columns)
+    conn = connect_to_jobs_db()
+    try:
+        with conn:
+            conn.execute(f"UPDATE generation_jobs SET {assignments} WHERE job_id = ?", (*columns.values(), job_id))
+    finally:
+        conn.close()
+
+
+def fail_stale_jobs():
+    """Marks running jobs that lost their worker and used up their attempts as failed. Returns how many."""
+    conn = connect_to_jobs_db()
+    try:
+        with conn:
+            return conn.execute("UPDATE generation_jobs SET status = ?, error = ?, finished_at = ? WHERE status = ? AND heartbeat_at < ? AND attempts >= ?",
+                                (JOB_FAILED, "Generation was interrupted", time.time(), JOB_RUNNING,
+                                 time.time() - JOB_STALE_SECONDS, JOB_MAX_ATTEMPTS)).rowcount
+    finally:
+        conn.close()
+
+
+def plan_exists(user_id, career_goal):
+    """True if the user already has a stored plan for this career goal (a job for it could not store its roadmap)."""
+    from backend.database import connect_to_sqlite, fetch_roadmap_version_sqlite
+
+    sqlite_conn = connect_to_sqlite(user_id)
+    try:
+        return fetch_roadmap_version_sqlite(sqlite_conn, user_id, career_goal) is not None
+    finally:
+        sqlite_conn.close()
+
+
+def run_generation_job(job):
+    """
+    Generates the roadmap of a claimed job and stores it with store_roadmap_sqlite.
+
+    Each streamed duration is saved on the job (doubling as its heartbeat), so pages polling the
+    job can show the roadmap as it grows. Only a complete roadmap is stored: a generation that
+    stops partway is requeued while the job has attempts left, and fails after that.
+
+    Returns:
+        str: The job's new status (JOB_QUEUED when it was requeued).
+    """
+    from backend.ai_agent import stream_career_roadmap # Deferred: pulls in the Groq SDK
+    from backend.database import connect_to_sqlite, store_roadmap_sqlite
+
+    if plan_exists(job["user_id"], job["career_goal"]): # E.g. queued twice; don't pay for a generation that can't be stored
+        return _finish_job(job, JOB_FAILED, DUPLICATE_PLAN_ERROR)
+    inputs = job["generation_inputs"]
+    timeline_data = {}
+    with span("job.run", kind=JOB_KIND_GENERATE) as current:
+        try:
+            for duration, duration_content in stream_career_roadmap(inputs["education_status"], job["career_goal"],
+                                                                    inputs["resources_available"], inputs["timeline"]):
+                timeline_data[duration] = duration_content
+                _update_job(job["job_id"], partial_timeline=json.dumps(timeline_data), heartbeat_at=time.time())
+        except RuntimeError as e: # The stream stopped short of a complete roadmap
+            current.set(durations=len(timeline_data))
+            if job["attempts"] < JOB_MAX_ATTEMPTS:
+                log_info("Requeueing generation job %s after an incomplete roadmap: %s", job["job_id"], e)
+                _update_job(job["job_id"], status=JOB_QUEUED, partial_timeline=None, error=str(e))
+                increment("job.requeued", reason="incomplete")
+                return JOB_QUEUED
+            return _finish_job(job, JOB_FAILED, "Failed to generate a complete career roadmap. Please try again.")
+        current.set(durations=len(timeline_data))
+        sqlite_conn = connect_to_sqlite(job["user_id"])
+        try:
+            stored = store_roadmap_sqlite(sqlite_conn, job["user_id"], job["career_goal"], {"timeline": timeline_data}, inputs)
+        finally:
+            sqlite_conn.close()
+    if stored:
+        return _finish_job(job, JOB_DONE, None)
+    if plan_exists(job["user_id"], job["career_goal"]): # Stored by another job meanwhile
+        return _finish_job(job, JOB_FAILED, DUPLICATE_PLAN_ERROR)
+    return _finish_job(job, JOB_FAILED, "The roadmap was generated but could not be saved. Please try again.")
+
+
+def run_plan_edit_job(job):
+    """
+    Applies a claimed plan edit with backend.plan_editing, which saves it as a new plan version.
+
+    An edit is not retried here: one refused because the plan changed since it was submitted
+    would be refused again, and any other failure is shown to the user to try again.
+
+    Returns:
+        str: The job's new status.
+    """
+    from backend.plan_editing import extend_plan_timeline, regenerate_plan_duration # Deferred: pulls in the Groq SDK
+
+    inputs = job["generation_inputs"]
+    with span("job.run", kind=job["kind"]):
+        try:
+            if job["kind"] == JOB_KIND_REGENERATE_DURATION:
+                new_version = regenerate_plan_duration(job["user_id"], job["career_goal"], inputs["duration"])
+            else:
+                new_version = extend_plan_timeline(job["user_id"], job["career_goal"], inputs["new_timeline"])
+        except ValueError as e: # E.g. the plan was changed elsewhere since the edit was submitted
+            log_error("Plan edit job %s (%s of '%s') was refused: %s", job["job_id"], job["kind"], job["career_goal"], e)
+            new_version = None
+    if new_version is None:
+        return _finish_job(job, JOB_FAILED, _PLAN_EDIT_ERRORS[job["kind"]])
+    return _finish_job(job, JOB_DONE, None)
+
+
+def run_job(job):
+    """Runs a claimed job of any kind. Returns its new status."""
+    if job["kind"] in _PLAN_EDIT_ERRORS:
+        return run_plan_edit_job(job)
+    return run_generation_job(job)
+
+
+def _finish_job(job, status, error):
+    _update_job(job["job_id"], status=status, error=error, finished_at=time.time())
+    increment("job.finished", status=status)
+    return status
+
+
+class JobWorkerPool:
+    """
+    Fixed number of threads that claim and run queued jobs: new roadmaps and plan edits.
+
+    The pool size caps how many roadmap generations and edits (LLM calls) this process runs at once,
+    however many sessions submit work. Submitting in-process wakes an idle worker right away;
+    jobs queued by other processes are picked up within JOB_POLL_INTERVAL_SECONDS.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, poll_interval=JOB_POLL_INTERVAL_SECONDS):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._threads = []
+        self._wake = threading.Condition()
+        self._stopped = False
+        self._worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    def start(self):
+        with self._wake:
+            if self._threads:
+                return self
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, args=(f"{self._worker_prefix}:{index}",), name=f"job-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        log_info("Started %d generation job workers", self.workers)
+        return self
+
+    def notify(self):
+        with self._wake:
+            self._wake.notify()
+
+    def _run(self, worker):
+        while not self._stopped:
+            try:
+                job = claim_next_job(worker)
+            except sqlite3.Error as e:
+                log_error("Error claiming a generation job: %s", e)
+                job = None
+            if job is None:
+                with self._wake:
+                    if not self._stopped:
+                        self._wake.wait(self.poll_interval)
+                continue
+            observe("job.queue_wait", job["started_at"] - job["created_at"], kind=job["kind"])
+            try:
+                run_job(job)
+            except Exception as e:
+                log_error("Generation job %s failed: %s", job["job_id"], e)
+                _update_job(job["job_id"], status=JOB_FAILED, error=str(e), finished_at=time.time())
+
+    def shutdown(self, timeout=5):
+        """Stops claiming new jobs. Running jobs are requeued by the next process once their heartbeat goes stale."""
+        self._stopped = True
+        with self._wake:
+            self._wake.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(timeout=max(0.0, deadline - time.monotonic()))
+
+
+_job_worker_pool = None
+_job_worker_pool_lock = threading.Lock()
+
+
+def get_job_worker_pool():
+    """Returns the process-wide worker pool, started on first use."""
+    global _job_worker_pool
+    if _job_worker_pool is None:
+        with _job_worker_pool_lock:
+            if _job_worker_pool is None:
+                fail_stale_jobs()
+                _job_worker_pool = JobWorkerPool().start()
+                atexit.register(_job_worker_pool.shutdown)
+    return _job_worker_pool
@@ -0,0 +1,242 @@
+import json
+from backend.instrumentation import increment
+
+# Local repair of LLM JSON output, tried before a completion is given up on (or, for segmented generation, regenerated).
+#
+# Text level (repair_json_text): surrounding prose and code fences, // and /* */ comments,
+# trailing commas, and truncation - the output is cut back to the last complete value and
+# the open strings, arrays and objects are closed.
+# Shape level (normalize_roadmap): the {"timeline": {duration: {topic: list | {group: list}}}}
+# structure components.roadmap_display renders; scalar sub-topics become one-item lists and
+# entries that cannot be rendered are dropped.
+#
+# Every repair increments llm.json_repair{kind=...}; llm.json_repair.repaired_completions counts
+# completions that were only usable because of a repair.
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def repair_json_text(text):
+    """
+    Rewrites almost-JSON into parseable JSON.
+
+    Returns:
+        tuple: (repaired_text, kinds, truncated_depth) where kinds is the set of repairs applied (empty
+               if none were needed) and truncated_depth is the number of containers still open where a
+               truncated text was cut back to (0 unless "truncation" is in kinds). The cut falls between
+               members of the innermost open container, so everything nested deeper than that is complete.
+    """
+    kinds = set()
+    start = text.find("{")
+    if start == -1:
+        return text, kinds, 0
+    if text[:start].strip():
+        kinds.add("extracted") # Prose or a ```json fence before the object
+    out = []
+    stack = [] # Open containers: "{" or "["
+    safe_point = (0, ()) # (len(out), open containers) right after the last complete value
+    in_string = False
+    expect_key = False # The next string in the current object is a key, not a value
+    i, length = start, len(text)
+    while i < length:
+        char = text[i]
+        if in_string:
+            out.append(char)
+            if char == "\\" and i + 1 < length:
+                out.append(text[i + 1])
+                i += 2
+                continue
+            if char == '"':
+                in_string = False
+                if not (expect_key and stack[-1] == "{"): # A key alone, even at the end of the text, is not a complete value
+                    safe_point = (len(out), tuple(stack))
+            i += 1
+            continue
+        if char == '"':
+            in_string = True
+            out.append(char)
+        elif char == "/" and text.startswith("//", i):
+            kinds.add("comments")
+            newline = text.find("\n", i)
+            i = length if newline == -1 else newline
+            continue
+        elif char == "/" and text.startswith("/*", i):
+            kinds.add("comments")
+            end = text.find("*/", i + 2)
+            i = length if end == -1 else end + 2
+            continue
+        elif char in _CLOSERS:
+            stack.append(char)
+            expect_key = char == "{"
+            out.append(char)
+        elif char in "}]":
+            if _strip_trailing_comma(out):
+                kinds.add("trailing_commas")
+            if not stack or _CLOSERS[stack[-1]] != char:
+                kinds.add("mismatched_brackets")
+                i += 1
+                continue # A stray closer; the right ones are added below if needed
+            stack.pop()
+            expect_key = False
+            out.append(char)
+            safe_point = (len(out), tuple(stack))
+            if not stack:
+                if text[i + 1:].strip():
+                    kinds.add("extracted") # Prose after the object
+                return "".join(out), kinds, 0
+        elif char == ",":
+            safe_point = (len(out), tuple(stack)) # Whatever came before the comma is complete
+            expect_key = True
+            out.append(char)
+        elif char == ":":
+            expect_key = False
+            out.append(char)
+        else:
+            out.append(char)
+        i += 1
+
+    # Ran out of text with containers still open: the completion was truncated
+    kinds.add("truncation")
+    cut, open_containers = safe_point
+    del out[cut:]
+    _strip_trailing_comma(out)
+    out.extend(_CLOSERS[container] for container in reversed(open_containers))
+    return "".join(out), kinds, len(open_containers)
+
+
+def _strip_trailing_comma(out):
+    """Removes a comma (and whitespace after it) at the end of out. Returns True if one was removed."""
+    index = len(out) - 1
+    while index >= 0 and out[index] in " \t\r\n":
+        index -= 1
+    if index >= 0 and out[index] == ",":
+        del out[index:]
+        return True
+    return False
+
+
+def loads_with_repair(text):
+    """
+    json.loads, falling back to repair_json_text when the text does not parse as-is.
+
+    Returns:
+        tuple: (parsed_json, kinds, truncated_depth) - the set of repairs applied, empty if the text
+        parsed as-is, and repair_json_text's truncated_depth. "truncation" in kinds means the
+        completion was cut off and only its complete values were kept.
+
+    Raises:
+        json.JSONDecodeError: If the text cannot be parsed even after repair.
+    """
+    try:
+        return json.loads(text), frozenset(), 0
+    except json.JSONDecodeError:
+        repaired_text, kinds, truncated_depth = repair_json_text(text)
+        parsed = json.loads(repaired_text) # Still invalid: let the caller regenerate
+        for kind in kinds:
+            increment("llm.json_repair", kind=kind)
+        return parsed, frozenset(kinds), truncated_depth
+
+
+def _is_valid_duration(duration_content):
+    if not isinstance(duration_content, dict) or not duration_content:
+        return False
+    for sub_topics in duration_content.values():
+        if isinstance(sub_topics, dict):
+            if not sub_topics or not all(_is_valid_items(items) for items in sub_topics.values()):
+                return False
+        elif not _is_valid_items(sub_topics):
+            return False
+    return True
+
+
+def _is_valid_items(items):
+    return isinstance(items, list) and bool(items) and all(isinstance(item, str) for item in items)
+
+
+def is_valid_roadmap(roadmap_json):
+    """Fast check that a roadmap already has the shape the app renders, without copying it."""
+    timeline_data = roadmap_json.get("timeline") if isinstance(roadmap_json, dict) else None
+    if not isinstance(timeline_data, dict) or not timeline_data:
+        return False
+    return all(_is_valid_duration(duration_content) for duration_content in timeline_data.values())
+
+
+def _scalar_text(value):
+    """Sub-topic text of a JSON value: scalars as-is, objects such as {"name", "url"} joined, anything else None."""
+    if isinstance(value, dict):
+        parts = [_scalar_text(part) for part in value.values()]
+        return " - ".join(part for part in parts if part) or None
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        return None
+    return str(value).strip() or None
+
+
+def _scalar_items(value):
+    """A list of sub-topic strings from a list or scalar value; entries with no text are dropped."""
+    if not isinstance(value, list):
+        text = _scalar_text(value)
+        if text is None:
+            return []
+        increment("llm.json_repair", kind="coerced_scalar")
+        return [text]
+    items = [_scalar_text(item) for item in value]
+    if None in items:
+        increment("llm.json_repair", kind="dropped_entries")
+    return [item for item in items if item is not None]
+
+
+def normalize_duration(duration_content):
+    """
+    Returns a duration's {topic: list | {group: list}} content with scalars coerced to lists and
+    unrenderable topics dropped, or None if nothing renderable is left. Valid content is returned as-is.
+    """
+    if _is_valid_duration(duration_content):
+        return duration_content
+    if not isinstance(duration_content, dict):
+        return None
+    normalized = {}
+    for topic, sub_topics in duration_content.items():
+        if isinstance(sub_topics, dict):
+            groups = {str(group): items for group, items in ((group, _scalar_items(items)) for group, items in sub_topics.items()) if items}
+            if groups:
+                normalized[str(topic)] = groups
+        else:
+            items = _scalar_items(sub_topics)
+            if items:
+                normalized[str(topic)] = items
+    return normalized or None
+
+
+def normalize_roadmap(roadmap_json):
+    """
+    Validates a roadmap and, if needed, repairs it into the {"timeline": {duration: {topic: ...}}} shape.
+
+    A missing "timeline" wrapper is tolerated when the object itself maps durations to topics.
+
+    Returns:
+        dict: The roadmap (the same object when it was already valid).
+
+    Raises:
+        ValueError: If no renderable duration is left.
+    """
+    if is_valid_roadmap(roadmap_json):
+        return roadmap_json
+    if not isinstance(roadmap_json, dict):
+        raise ValueError("Roadmap is not a JSON object")
+    timeline_data = roadmap_json.get("timeline")
+    if timeline_data is None and roadmap_json and all(isinstance(value, dict) for value in roadmap_json.values()):
+        timeline_data = roadmap_json
+        increment("llm.json_repair", kind="missing_timeline")
+    if not isinstance(timeline_data, dict):
+        raise ValueError("Roadmap has no timeline")
+    normalized = {}
+    for duration, duration_content in timeline_data.items():
+        content = normalize_duration(duration_content)
+        if content is None:
+            increment("llm.json_repair", kind="dropped_entries")
+            continue
+        normalized[str(duration)] = content
+    if not normalized:
+        raise ValueError("Roadmap has no renderable durations")
+    increment("llm.json_repair", kind="shape")
+    return {"timeline": normalized}
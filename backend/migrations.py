@@ -0,0 +1,96 @@
+import sqlite3
+from backend.instrumentation import log_info
+
+
+def create_schema_version_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+
+
+def get_schema_version(conn):
+    """Returns the highest applied migration version (0 for a fresh database)."""
+    create_schema_version_table(conn)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def apply_migrations(conn, migrations):
+    """
+    Brings a database up to date with an ordered list of migrations.
+
+    The applied version is read once without a lock, so an up-to-date database (every pool
+    initialization after the first deploy) costs one read; the write lock is only taken per
+    pending migration.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database to migrate.
+        migrations (list): (version, description, migrate(conn)) tuples in ascending version order.
+                           A migration must not commit; each one runs in its own transaction
+                           together with its schema_version row.
+
+    Returns:
+        list: Versions applied by this call.
+    """
+    current_version = get_schema_version(conn)
+    pending = [migration for migration in migrations if migration[0] > current_version]
+    applied = []
+    for version, description, migrate in pending:
+        conn.execute("BEGIN IMMEDIATE") # Take the write lock so two processes cannot apply the same version
+        try:
+            current_version = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+            if version <= current_version: # Applied by another process since the unlocked read
+                conn.rollback()
+                continue
+            migrate(conn)
+            conn.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)", (version, description))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+        log_info("Applied migration %d: %s", version, description)
+    return applied
+
+
+def unique_index_columns(conn, table_name):
+    """Returns the column lists of every UNIQUE index on a table (including inline UNIQUE constraints)."""
+    columns = []
+    for index_row in conn.execute(f"PRAGMA index_list({table_name})").fetchall():
+        index_name, is_unique = index_row[1], index_row[2]
+        if is_unique:
+            columns.append([info_row[2] for info_row in conn.execute(f"PRAGMA index_info({index_name})").fetchall()])
+    return columns
+
+
+def migrate_all():
+    """
+    Runs every database's migrations; used as a deploy step via ``python -m backend.migrations``.
+    Also garbage-collects roadmap blobs no plan references any more.
+    """
+    from backend.blob_store import collect_roadmap_blobs
+    from backend.database import for_each_shard
+    from backend.job_queue import connect_to_jobs_db
+    from components.auth import connect_to_users_db
+
+    for connect in (connect_to_users_db, connect_to_jobs_db): # The pools run their migrations on first connect
+        conn = connect()
+        try:
+            print(f"{connect.__name__}: schema version {get_schema_version(conn)}")
+        finally:
+            conn.close()
+    for shard_index, (version, removed_blobs) in enumerate(for_each_shard(lambda conn: (get_schema_version(conn), collect_roadmap_blobs(conn)))):
+        print(f"career_plans shard {shard_index}: schema version {version}, removed {removed_blobs} unreferenced roadmap blobs")
+
+
+if __name__ == "__main__":
+    try:
+        migrate_all()
+    except sqlite3.Error as e:
+        print(f"Migration failed: {e}")
+        raise SystemExit(1)
@@ -0,0 +1,104 @@
+from backend.database import (connect_to_sqlite, fetch_generation_inputs_sqlite, fetch_roadmap_json_sqlite,
+                              fetch_roadmap_version_sqlite, update_roadmap_sqlite)
+from backend.instrumentation import log_error, span
+from backend.progress_writer import get_progress_writer
+
+UNKNOWN_INPUT = "not specified" # Stands in for inputs of plans stored before generation inputs were recorded
+
+
+def _load_plan(conn, user_id, career_goal):
+    """Returns (version, roadmap_json, generation_inputs) of a stored plan, or None."""
+    version = fetch_roadmap_version_sqlite(conn, user_id, career_goal)
+    roadmap_json = fetch_roadmap_json_sqlite(conn, user_id, career_goal)
+    if version is None or roadmap_json is None:
+        return None
+    generation_inputs = fetch_generation_inputs_sqlite(conn, user_id, career_goal) or {}
+    return version, roadmap_json, generation_inputs
+
+
+def _edit_plan(user_id, career_goal, edit):
+    """
+    Applies ``edit(roadmap_json, generation_inputs) -> (new_roadmap_json, new_generation_inputs)`` to a stored plan.
+
+    Buffered checkbox toggles are flushed first so progress is remapped from what the user last saw,
+    and again right before the update for toggles made during the LLM call. The LLM call runs outside
+    any transaction; the write is refused if the plan changed meanwhile. Toggles queued after that are
+    tagged with the old version and dropped by the progress writer instead of landing on remapped items.
+
+    Returns:
+        int: The new plan version, or None if the plan is missing, changed concurrently or could not be saved.
+    """
+    get_progress_writer().flush() # Pending toggles are keyed by the current version's item ids
+    conn = connect_to_sqlite(user_id)
+    try:
+        plan = _load_plan(conn, user_id, career_goal)
+    finally:
+        conn.close()
+    if plan is None:
+        return None
+    version, roadmap_json, generation_inputs = plan
+    new_roadmap_json, new_generation_inputs = edit(roadmap_json, generation_inputs)
+    get_progress_writer().flush() # Toggles made while the LLM call ran still refer to this version's item ids
+    conn = connect_to_sqlite(user_id)
+    try:
+        return update_roadmap_sqlite(conn, user_id, career_goal, new_roadmap_json, version, new_generation_inputs)
+    finally:
+        conn.close()
+
+
+def regenerate_plan_duration(user_id, career_goal, duration):
+    """
+    Regenerates one duration of a stored plan in place, keeping progress on every other duration
+    (and on any items of this duration that come back unchanged).
+
+    Returns:
+        int: The new plan version, or None on failure.
+
+    Raises:
+        ValueError: If the duration cannot be regenerated (unknown duration or non-month labels).
+    """
+    from backend.ai_agent import regenerate_roadmap_duration # Deferred: the dashboard should not pull in the Groq SDK until a plan is edited
+
+    def edit(roadmap_json, generation_inputs):
+        duration_label, duration_content = regenerate_roadmap_duration(
+            generation_inputs.get("education_status", UNKNOWN_INPUT), career_goal,
+            generation_inputs.get("resources_available", UNKNOWN_INPUT), roadmap_json, duration)
+        timeline_data = {label: (duration_content if label == duration else content)
+                         for label, content in roadmap_json["timeline"].items()} # Keep the duration's position
+        return {"timeline": timeline_data}, None
+
+    with span("plan.edit", action="regenerate_duration"):
+        try:
+            return _edit_plan(user_id, career_goal, edit)
+        except RuntimeError as e:
+            log_error("Regenerating %s of '%s' failed: %s", duration, career_goal, e)
+            return None
+
+
+def extend_plan_timeline(user_id, career_goal, new_timeline):
+    """
+    Appends generated durations so a stored plan covers ``new_timeline`` months; existing durations
+    and their progress are untouched.
+
+    Returns:
+        int: The new plan version, or None on failure.
+
+    Raises:
+        ValueError: If new_timeline does not extend the plan or its durations are not labelled by month.
+    """
+    from backend.ai_agent import extend_roadmap_timeline # Deferred, as above
+
+    def edit(roadmap_json, generation_inputs):
+        new_durations = extend_roadmap_timeline(
+            generation_inputs.get("education_status", UNKNOWN_INPUT), career_goal,
+            generation_inputs.get("resources_available", UNKNOWN_INPUT), roadmap_json, new_timeline)
+        timeline_data = dict(roadmap_json["timeline"])
+        timeline_data.update(new_durations)
+        return {"timeline": timeline_data}, dict(generation_inputs, timeline=int(new_timeline))
+
+    with span("plan.edit", action="extend_timeline"):
+        try:
+            return _edit_plan(user_id, career_goal, edit)
+        except RuntimeError as e:
+            log_error("Extending '%s' to %s months failed: %s", career_goal, new_timeline, e)
+            return None
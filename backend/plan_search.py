@@ -0,0 +1,83 @@
+import re
+
+# Rowids of plan_search are (plan id << SEARCH_ROWID_ITEM_BITS) | item id, so all entries of one plan
+# are a contiguous rowid range that can be replaced or deleted without scanning the index
+SEARCH_ROWID_ITEM_BITS = 20
+SEARCH_RESULT_LIMIT = 50
+
+_QUERY_TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def create_plan_search_table(conn):
+    """
+    FTS5 index with one row per roadmap item: its topic, sub-topic group and text are searchable,
+    the owning plan and duration are stored alongside for display only. user_id is indexed too, so
+    a search MATCHes only the searching user's rows instead of scoring the whole shard.
+
+    This is the shape career_plans migration 10 creates; changing it needs a new migration.
+    """
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS plan_search USING fts5(
+            user_id,
+            career_goal UNINDEXED,
+            duration UNINDEXED,
+            topic,
+            sub_topic_group,
+            item,
+            tokenize = 'porter unicode61'
+        )
+    """)
+
+
+def plan_rowid_range(plan_id):
+    """(first, last) rowid of the search entries of a plan."""
+    first_rowid = plan_id << SEARCH_ROWID_ITEM_BITS
+    return first_rowid, first_rowid + (1 << SEARCH_ROWID_ITEM_BITS) - 1
+
+
+def plan_search_rows(plan_id, user_id, career_goal, compiled):
+    """Yields the plan_search rows (rowid first) of every item of a compiled roadmap."""
+    first_rowid, last_rowid = plan_rowid_range(plan_id)
+    for duration_index, duration in enumerate(compiled.durations):
+        for topic_index in compiled.topic_range(duration_index):
+            topic = compiled.topics[topic_index]
+            for item_id in compiled.item_range(topic_index):
+                if item_id > last_rowid - first_rowid:
+                    return # Beyond the plan's rowid range; no generated roadmap comes close
+                yield (first_rowid + item_id, user_id, career_goal, duration, topic,
+                       compiled.item_groups[item_id] or "", compiled.item_texts[item_id])
+
+
+PLAN_SEARCH_INSERT_SQL = """
+    INSERT INTO plan_search (rowid, user_id, career_goal, duration, topic, sub_topic_group, item)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def index_plan_search(conn, plan_id, user_id, career_goal, compiled):
+    """(Re)indexes every item of a compiled roadmap under its plan. Does not commit."""
+    conn.execute("DELETE FROM plan_search WHERE rowid BETWEEN ? AND ?", plan_rowid_range(plan_id))
+    conn.executemany(PLAN_SEARCH_INSERT_SQL, plan_search_rows(plan_id, user_id, career_goal, compiled))
+
+
+def build_match_query(text, user_id=None):
+    """
+    Turns free text into an FTS5 query: every word must match, as a prefix ("dock" finds "Docker").
+
+    With user_id, the query is also restricted to the user_id column holding that user's words, so
+    FTS5 only visits (and ranks) that user's rows. Words that merely tokenize alike ("ann.lee" and
+    "ann-lee") still match, so callers compare user_id exactly as well.
+
+    Words are quoted, so FTS5 operators and punctuation typed by the user are never interpreted.
+    Returns None when the text has no searchable words.
+    """
+    terms = _QUERY_TERM_PATTERN.findall(text or "")
+    if not terms:
+        return None
+    # Only the item columns are searched; user_id is indexed for the filter below, not for the user's words
+    match_query = "{topic sub_topic_group item} : (" + " ".join(f'"{term}"*' for term in terms) + ")"
+    user_terms = _QUERY_TERM_PATTERN.findall(user_id or "")
+    if not user_terms: # No indexable words in the user id: the exact comparison alone has to do
+        return match_query
+    user_phrase = " ".join(user_terms)
+    return f'user_id : "{user_phrase}" AND {match_query}'
@@ -0,0 +1,121 @@
+"""
+Bulk export and import of every user's plans and progress as NDJSON, one plan per line
+(gzip-compressed when the file name ends in ".gz"):
+
+    python -m backend.plan_transfer export plans.ndjson.gz
+    python -m backend.plan_transfer import plans.ndjson.gz --on-conflict replace
+
+Each line is {"user_id", "career_goal", "created_at", "version", "generation_inputs",
+"progress": [[item_id, checked], ...], "roadmap": {"timeline": ...}}. Imported plans are routed to
+their user's shard, so an export also moves data between shard counts.
+"""
+import argparse
+import contextlib
+import gzip
+import json
+import sys
+import time
+from backend.database import IMPORT_CONFLICT_MODES, connect_to_shard, export_plans_sqlite, import_plans_sqlite
+from backend.instrumentation import log_info, span
+from backend.sharding import SHARD_COUNT, existing_shard_indexes, shard_for_user
+
+IMPORT_BATCH_PLANS = 5000 # Plans per shard written in one transaction
+
+
+def _open_text(path, mode):
+    if path == "-":
+        return contextlib.nullcontext(sys.stdout if mode == "w" else sys.stdin) # Never close the process's stdio
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+    return open(path, mode, encoding="utf-8")
+
+
+def export_plans(path):
+    """
+    Writes every plan of every shard file on disk to ``path``. Memory use does not grow with the
+    number of plans: rows are streamed from each shard and written line by line.
+
+    Returns:
+        int: The number of plans written.
+    """
+    exported = 0
+    with span("plans.export") as current, _open_text(path, "w") as output:
+        for shard_index in existing_shard_indexes() or [0]:
+            conn = connect_to_shard(shard_index)
+            try:
+                for plan, roadmap_text in export_plans_sqlite(conn):
+                    # The stored canonical roadmap text is spliced in as-is instead of being parsed and re-serialized
+                    output.write(json.dumps(plan, ensure_ascii=False)[:-1] + ', "roadmap": ' + roadmap_text + "}\n")
+                    exported += 1
+            finally:
+                conn.close()
+        current.set(plans=exported)
+    log_info("Exported %d plan(s) to %s", exported, path)
+    return exported
+
+
+def import_plans(path, on_conflict="skip", batch_size=IMPORT_BATCH_PLANS):
+    """
+    Reads an export and writes its plans to their users' shards, batch_size plans per transaction.
+
+    With on_conflict="fail" the import stops at the first batch containing a plan that already
+    exists; batches before it stay committed.
+
+    Returns:
+        dict: {"imported": n, "skipped": n, "replaced": n} over all batches.
+    """
+    totals = {"imported": 0, "skipped": 0, "replaced": 0}
+    batches = {} # shard index -> pending plans
+
+    def write_batch(shard_index):
+        conn = connect_to_shard(shard_index)
+        try:
+            counts = import_plans_sqlite(conn, batches.pop(shard_index), on_conflict)
+        finally:
+            conn.close()
+        for key, count in counts.items():
+            totals[key] += count
+
+    with span("plans.import") as current, _open_text(path, "r") as source:
+        for line in source:
+            if not line.strip():
+                continue
+            plan = json.loads(line)
+            shard_index = shard_for_user(plan["user_id"], SHARD_COUNT)
+            batches.setdefault(shard_index, []).append(plan)
+            if len(batches[shard_index]) >= batch_size:
+                write_batch(shard_index)
+        for shard_index in list(batches):
+            write_batch(shard_index)
+        current.set(plans=totals["imported"])
+    log_info("Imported plans from %s: %s", path, totals)
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk export or import career plans and progress as NDJSON.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Write every plan to a file (.gz to compress, - for stdout)")
+    export_parser.add_argument("path")
+    import_parser = subparsers.add_parser("import", help="Load plans from an export")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--on-conflict", choices=IMPORT_CONFLICT_MODES, default="skip",
+                               help="What to do with plans the user already has (default: skip)")
+    import_parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_PLANS)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.command == "export":
+        result = {"exported": export_plans(args.path)}
+    else:
+        try:
+            result = import_plans(args.path, args.on_conflict, args.batch_size)
+        except ValueError as e:
+            print(f"Import stopped: {e}", file=sys.stderr)
+            raise SystemExit(1)
+    result["seconds"] = round(time.perf_counter() - started, 2)
+    print(json.dumps(result), file=sys.stderr if args.path == "-" else sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import atexit
+import threading
+from backend.database import connect_to_shard, set_versioned_progress_rows_sqlite
+from backend.sharding import shard_for_user
+from backend.instrumentation import log_error, span
+
+PROGRESS_FLUSH_MAX_PENDING = 64 # Flush as soon as this many distinct items are waiting
+PROGRESS_FLUSH_INTERVAL_SECONDS = 1.0 # ...or at the latest this long after a toggle
+
+
+class ProgressWriter:
+    """
+    Write-behind buffer for checkbox toggles.
+
+    Toggles are queued in memory keyed by (user_id, career_goal, version, item_id), so
+    clicking the same item repeatedly before a flush costs a single row write. Item ids
+    are only meaningful for the plan version they were made on: toggles whose plan has
+    since been edited to a new version are dropped when flushed.
+    A background thread flushes everything pending (one transaction per shard) once
+    PROGRESS_FLUSH_MAX_PENDING items are queued or PROGRESS_FLUSH_INTERVAL_SECONDS
+    have passed. ``flush()`` forces a synchronous flush (used on logout), and the
+    process-wide writer is flushed again at interpreter shutdown.
+    """
+
+    def __init__(self, max_pending=PROGRESS_FLUSH_MAX_PENDING, flush_interval=PROGRESS_FLUSH_INTERVAL_SECONDS):
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self._pending = {} # (user_id, career_goal, version, item_id) -> (duration_index, checked)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock() # One flush at a time keeps writes in toggle order
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._stats = {
+            "enqueued": 0,
+            "coalesced": 0,
+            "flushes": 0,
+            "flushed_items": 0,
+            "commits": 0,
+            "flush_errors": 0,
+            "stale_dropped": 0,
+        }
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="progress-writer", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, user_id, career_goal, item_id, duration_index, checked, version=None):
+        """
+        Queues one toggle. Returns immediately; the write happens on the background thread.
+
+        version is the plan version the item id belongs to; None writes the toggle whatever the stored version.
+        """
+        self.enqueue_many(user_id, career_goal, duration_index, {item_id: checked}, version)
+
+    def enqueue_many(self, user_id, career_goal, duration_index, item_states, version=None):
+        """Queues several toggles of one duration of a plan, e.g. a whole month marked as done."""
+        with self._lock:
+            for item_id, checked in item_states.items():
+                key = (user_id, career_goal, version, item_id)
+                if key in self._pending:
+                    self._stats["coalesced"] += 1
+                self._pending[key] = (duration_index, bool(checked))
+                self._stats["enqueued"] += 1
+            pending_count = len(self._pending)
+            if not self._stopped:
+                self._ensure_thread()
+        if self._stopped:
+            self.flush() # Late toggles during shutdown are written straight away
+        elif pending_count >= self.max_pending:
+            self._wake.set()
+
+    def pending_for(self, user_id, career_goal, version=None):
+        """Returns {item_id: checked} toggles for one version of a plan that have not been written yet."""
+        with self._lock:
+            return {item_id: checked for (pending_user, pending_goal, pending_version, item_id), (_, checked) in self._pending.items()
+                    if pending_user == user_id and pending_goal == career_goal and pending_version in (None, version)}
+
+    def flush(self):
+        """Writes every pending toggle, in one transaction per shard. Returns the number of items written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            batches_by_shard = {}
+            for key, pending in batch.items():
+                batches_by_shard.setdefault(shard_for_user(key[0]), {})[key] = pending
+            written_items = 0
+            for shard_index, shard_batch in batches_by_shard.items():
+                rows = [(user_id, career_goal, version, item_id, duration_index, checked)
+                        for (user_id, career_goal, version, item_id), (duration_index, checked) in shard_batch.items()]
+                with span("progress.flush") as current:
+                    current.set(items=len(rows))
+                    try:
+                        sqlite_conn = connect_to_shard(shard_index)
+                        try:
+                            written = set_versioned_progress_rows_sqlite(sqlite_conn, rows)
+                        finally:
+                            sqlite_conn.close()
+                    except Exception as e: # E.g. a pool checkout timeout; the batch is retried on the next flush
+                        log_error("Error writing progress updates to shard %d: %s", shard_index, e)
+                        written = None
+                with self._lock:
+                    if written is not None:
+                        self._stats["commits"] += 1
+                        self._stats["flushed_items"] += written
+                        self._stats["stale_dropped"] += len(rows) - written
+                        written_items += written
+                        continue
+                    self._stats["flush_errors"] += 1
+                    for key, pending in shard_batch.items(): # Put the batch back unless a newer toggle superseded it
+                        self._pending.setdefault(key, pending)
+            if written_items:
+                with self._lock:
+                    self._stats["flushes"] += 1
+            return written_items
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                log_error("Error flushing progress updates: %s", e)
+
+    def shutdown(self):
+        """Stops the background thread and flushes whatever is still pending."""
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        return stats
+
+
+_progress_writer = None
+_progress_writer_lock = threading.Lock()
+
+
+def get_progress_writer():
+    """Returns the process-wide progress writer, flushed automatically at interpreter shutdown."""
+    global _progress_writer
+    if _progress_writer is None:
+        with _progress_writer_lock:
+            if _progress_writer is None:
+                _progress_writer = ProgressWriter()
+                atexit.register(_progress_writer.shutdown)
+    return _progress_writer
@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+
+class AsyncTokenBucket:
+    """
+    Token-bucket limiter for asyncio code.
+
+    The bucket holds up to ``capacity`` tokens and refills continuously at
+    ``capacity / period_seconds`` tokens per second, so a limit of 30
+    requests per minute is ``AsyncTokenBucket(30)``. ``acquire`` waits until
+    enough tokens are available; ``adjust`` settles an estimate once the real
+    cost is known and may push the balance below zero, which simply delays
+    later callers.
+    """
+
+    def __init__(self, capacity, period_seconds=60.0):
+        self.capacity = float(capacity)
+        self.refill_rate = self.capacity / period_seconds
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.total_wait_seconds = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.refill_rate)
+        self._updated_at = now
+
+    async def acquire(self, amount=1):
+        """Waits until ``amount`` tokens are available and takes them. Returns the time spent waiting."""
+        amount = min(float(amount), self.capacity) # A single oversized request must still be able to run
+        waited = 0.0
+        async with self._lock: # Serve waiters in FIFO order
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    self.total_wait_seconds += waited
+                    return waited
+                delay = (amount - self._tokens) / self.refill_rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def adjust(self, amount):
+        """Takes (positive) or returns (negative) tokens without waiting."""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - amount)
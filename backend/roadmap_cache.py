@@ -0,0 +1,225 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+import hashlib
+from collections import OrderedDict
+from backend.connection_manager import get_pool
+from backend.instrumentation import log_error
+
+CACHE_DATABASE_NAME = "roadmap_cache.db" # SQLite database file for cached roadmaps
+CACHE_MAX_ENTRIES = 256 # Max roadmaps held in the in-process LRU
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60 # Cached roadmaps expire after a week
+
+# Whole-goal synonyms, applied after abbreviation expansion
+CAREER_GOAL_SYNONYMS = {
+    "software developer": "software engineer",
+    "software development engineer": "software engineer",
+    "front end developer": "frontend developer",
+    "front-end developer": "frontend developer",
+    "back end developer": "backend developer",
+    "back-end developer": "backend developer",
+    "full stack developer": "fullstack developer",
+    "full-stack developer": "fullstack developer",
+    "artificial intelligence engineer": "ai engineer",
+    "data science": "data scientist",
+    "machine learning": "machine learning engineer",
+    "devops": "devops engineer",
+}
+
+# Word-level abbreviations expanded before synonym lookup ("ML Engineer" -> "machine learning engineer")
+CAREER_GOAL_ABBREVIATIONS = {
+    "ml": "machine learning",
+    "swe": "software engineer",
+    "sde": "software engineer",
+    "ds": "data scientist",
+    "dev": "developer",
+    "sr": "senior",
+    "jr": "junior",
+}
+
+
+def _normalize_text(value):
+    """Lowercases, trims and collapses whitespace in a free-text input."""
+    return re.sub(r"\s+", " ", str(value or "")).strip().lower()
+
+
+def normalize_career_goal(career_goal):
+    """Normalizes a career goal so that spelling variants map to the same cache key."""
+    goal = _normalize_text(career_goal)
+    goal = re.sub(r"[^\w\s+#.-]", "", goal).strip(" .") # Drop punctuation but keep things like C++ / C# / .NET
+    words = [CAREER_GOAL_ABBREVIATIONS.get(word, word) for word in goal.split(" ")]
+    goal = " ".join(words)
+    return CAREER_GOAL_SYNONYMS.get(goal, goal)
+
+
+def make_cache_key(education_status, career_goal, resources_available, timeline):
+    """Builds a stable cache key from the normalized generation inputs."""
+    normalized_inputs = [
+        _normalize_text(education_status),
+        normalize_career_goal(career_goal),
+        _normalize_text(resources_available),
+        int(timeline),
+    ]
+    return hashlib.sha256(json.dumps(normalized_inputs).encode("utf-8")).hexdigest()
+
+
+def create_roadmap_cache_table(conn):
+    """Creates the roadmap_cache table if it doesn't exist."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS roadmap_cache (
+            cache_key TEXT PRIMARY KEY,
+            career_goal TEXT NOT NULL,
+            roadmap_json TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+class RoadmapCache:
+    """
+    Two-tier roadmap cache: an in-process LRU in front of a SQLite table.
+
+    Entries are stored as JSON strings so every hit hands back a fresh dict that
+    callers are free to mutate.
+    """
+
+    def __init__(self, database_name=CACHE_DATABASE_NAME, max_entries=CACHE_MAX_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS):
+        self.database_name = database_name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict() # cache_key -> (expires_at, roadmap_json_str)
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "sqlite_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    def _connect(self):
+        return get_pool(self.database_name, initializer=create_roadmap_cache_table).acquire()
+
+    def _remember(self, cache_key, expires_at, roadmap_json_str):
+        """Inserts an entry into the in-process LRU, evicting the least recently used ones. Caller holds the lock."""
+        self._entries[cache_key] = (expires_at, roadmap_json_str)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get(self, cache_key):
+        """Returns the cached roadmap for a key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                expires_at, roadmap_json_str = entry
+                if expires_at > now:
+                    self._entries.move_to_end(cache_key)
+                    self._stats["memory_hits"] += 1
+                    return json.loads(roadmap_json_str)
+                del self._entries[cache_key] # Expired in memory, fall through to SQLite
+                self._stats["expirations"] += 1
+
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT roadmap_json, expires_at FROM roadmap_cache WHERE cache_key = ?", (cache_key,)).fetchone()
+                if row and row[1] <= now:
+                    conn.execute("DELETE FROM roadmap_cache WHERE cache_key = ?", (cache_key,))
+                    conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            log_error("Error reading roadmap cache: %s", e)
+            row = None
+
+        with self._lock:
+            if row and row[1] > now:
+                self._remember(cache_key, row[1], row[0])
+                self._stats["sqlite_hits"] += 1
+                return json.loads(row[0])
+            if row:
+                self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, cache_key, career_goal, roadmap_json):
+        """Stores a generated roadmap in both tiers."""
+        roadmap_json_str = json.dumps(roadmap_json)
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(cache_key, expires_at, roadmap_json_str)
+            self._stats["stores"] += 1
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("INSERT OR REPLACE INTO roadmap_cache (cache_key, career_goal, roadmap_json, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                             (cache_key, career_goal, roadmap_json_str, now, expires_at))
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            log_error("Error writing roadmap cache: %s", e)
+
+    def purge_expired(self):
+        """Deletes expired entries from both tiers. Returns the number of SQLite rows removed."""
+        now = time.time()
+        with self._lock:
+            expired_keys = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+            for key in expired_keys:
+                del self._entries[key]
+            self._stats["expirations"] += len(expired_keys)
+        conn = self._connect()
+        try:
+            removed = conn.execute("DELETE FROM roadmap_cache WHERE expires_at <= ?", (now,)).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+        return removed
+
+    def clear(self):
+        """Drops every cached roadmap from both tiers."""
+        with self._lock:
+            self._entries.clear()
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM roadmap_cache")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def stats(self):
+        """Returns a snapshot of hit/miss/eviction counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._entries)
+        lookups = stats["memory_hits"] + stats["sqlite_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["memory_hits"] + stats["sqlite_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+_roadmap_cache = None
+_roadmap_cache_lock = threading.Lock()
+
+
+def get_roadmap_cache():
+    """Returns the process-wide roadmap cache."""
+    global _roadmap_cache
+    if _roadmap_cache is None:
+        with _roadmap_cache_lock:
+            if _roadmap_cache is None:
+                _roadmap_cache = RoadmapCache()
+    return _roadmap_cache
+
+
+def get_roadmap_cache_stats():
+    """Returns hit/miss/eviction counters for the process-wide roadmap cache."""
+    return get_roadmap_cache().stats()
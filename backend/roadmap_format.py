@@ -0,0 +1,135 @@
+import re
+
+# Month-labelled durations, and the outline and segment prompts of segmented generation.
+# Every roadmap is asked of the model as minified {"timeline": {"Month X-Y": {topic: [...]}}} JSON:
+# a positional encoding was measured to save no completion tokens over that, once whitespace is dropped.
+RESOURCES_TOPIC = "Resources"
+
+_MONTH_LABEL_PATTERN = re.compile(r"^\s*months?\s+(\d+)(?:\s*-\s*(\d+))?\s*$", re.IGNORECASE)
+
+
+def duration_label(start_month, end_month):
+    """"Month 3" for a single month, "Month 3-4" for a range, matching the labels of verbose roadmaps."""
+    return f"Month {start_month}" if start_month == end_month else f"Month {start_month}-{end_month}"
+
+
+# Segmented generation (long timelines): a short outline first, then one duration per segment.
+OUTLINE_CONTAINER_KEY = "o"
+OUTLINE_FALLBACK_SEGMENT_MONTHS = 2 # Segment length used when the model's outline is unusable
+
+
+def build_outline_prompt(education_status, career_goal, resources_available, timeline):
+    """Asks for the list of durations only: {"o": [[start_month, end_month, "focus"], ...]}."""
+    return f"""
+    Outline a career roadmap for becoming a {career_goal} in {timeline} months.
+    Education status: {education_status}. Available resources: {resources_available}.
+
+    Split months 1 to {timeline} into consecutive durations of one to three months and give each a short focus.
+    Reply with minified JSON only, in exactly this shape:
+    {{"o":[[start_month,end_month,"Focus"]]}}
+    """
+
+
+def build_segment_prompt(education_status, career_goal, resources_available, timeline, outline, segment_index):
+    """Asks for the topics, sub-topics and resources of one outline segment, as a one-duration roadmap."""
+    start_month, end_month, focus = outline[segment_index]
+    label = duration_label(start_month, end_month)
+    overview = "; ".join(f"{duration_label(start, end)}: {segment_focus}" for start, end, segment_focus in outline)
+    return f"""
+    You are writing one part of a {timeline}-month roadmap for becoming a {career_goal}.
+    Education status: {education_status}. Available resources: {resources_available}.
+    Whole plan: {overview}.
+
+    Write {label} only (focus: {focus or "the next step after the previous part"}). Do not repeat material from other parts.
+    Reply with minified JSON only, in exactly this shape:
+    {{"timeline":{{"{label}":{{"Topic":["Sub-topic","Sub-topic"],"{RESOURCES_TOPIC}":["Resource","Resource"]}}}}}}
+    Give its topics with their sub-topics, then courses, books or platforms to use under "{RESOURCES_TOPIC}".
+    """
+
+
+def parse_duration_label(label):
+    """(start_month, end_month) of a "Month N" / "Month N-M" label, or None for any other label."""
+    match = _MONTH_LABEL_PATTERN.match(str(label))
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2) or match.group(1))
+
+
+def roadmap_covers_timeline(roadmap_json, timeline):
+    """True if the last duration of a roadmap is labelled by month and ends at or after month ``timeline``."""
+    durations = list((roadmap_json or {}).get("timeline") or {})
+    months = parse_duration_label(durations[-1]) if durations else None
+    return months is not None and months[1] >= int(timeline)
+
+
+def roadmap_outline(roadmap_json):
+    """
+    Derives the outline of an existing roadmap: [start_month, end_month, focus] per duration,
+    with the duration's topic names as its focus. This is all the context segment prompts need.
+
+    Raises:
+        ValueError: If a duration label is not "Month N" or "Month N-M".
+    """
+    outline = []
+    for duration, duration_content in ((roadmap_json or {}).get("timeline") or {}).items():
+        months = parse_duration_label(duration)
+        if months is None:
+            raise ValueError(f"Duration {duration!r} is not labelled by month")
+        topics = [topic for topic in duration_content if topic != RESOURCES_TOPIC] if isinstance(duration_content, dict) else []
+        outline.append([months[0], months[1], ", ".join(topics)])
+    return outline
+
+
+def fallback_outline(timeline, segment_months=OUTLINE_FALLBACK_SEGMENT_MONTHS):
+    """Evenly sized segments covering the timeline, with no focus."""
+    return [[start, min(start + segment_months - 1, timeline), ""] for start in range(1, timeline + 1, segment_months)]
+
+
+def parse_outline(outline_json, timeline):
+    """
+    Validates an outline completion ({"o": [[start, end, focus], ...]}).
+
+    Returns:
+        list: [start_month, end_month, focus] entries covering months 1..timeline without gaps or overlaps.
+
+    Raises:
+        ValueError: If the outline is malformed or does not cover the timeline exactly.
+    """
+    entries = (outline_json or {}).get(OUTLINE_CONTAINER_KEY) if isinstance(outline_json, dict) else None
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("Outline has no durations")
+    outline = []
+    next_month = 1
+    for entry in entries:
+        if not isinstance(entry, list) or len(entry) < 2 or not all(isinstance(month, int) for month in entry[:2]):
+            raise ValueError(f"Malformed outline entry: {entry!r}")
+        start_month, end_month = entry[0], entry[1]
+        if start_month != next_month or end_month < start_month:
+            raise ValueError(f"Outline does not cover month {next_month} exactly once")
+        outline.append([start_month, end_month, str(entry[2]) if len(entry) > 2 else ""])
+        next_month = end_month + 1
+    if next_month != timeline + 1:
+        raise ValueError(f"Outline covers {next_month - 1} of {timeline} months")
+    return outline
+
+
+def parse_segment(segment_json, start_month, end_month):
+    """
+    Validates one segment completion ({"timeline": {label: {topic: sub_topics}}}).
+
+    Returns:
+        tuple: (label, {topic: sub_topics}) for the requested duration, labelled as duration_label() does.
+
+    Raises:
+        ValueError: If the completion is not exactly the requested duration with at least one topic.
+    """
+    timeline_data = segment_json.get("timeline") if isinstance(segment_json, dict) else None
+    if not isinstance(timeline_data, dict) or len(timeline_data) != 1:
+        raise ValueError("Segment must contain exactly one duration")
+    [(duration, duration_content)] = timeline_data.items()
+    label = duration_label(start_month, end_month)
+    if parse_duration_label(duration) != (start_month, end_month) or not isinstance(duration_content, dict):
+        raise ValueError(f"Segment is not {label}")
+    if not any(topic != RESOURCES_TOPIC and sub_topics for topic, sub_topics in duration_content.items()):
+        raise ValueError(f"{label} has no topics")
+    return label, duration_content
@@ -0,0 +1,173 @@
+import bisect
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+
+COMPILED_ROADMAP_CACHE_SIZE = 128 # Compiled roadmaps kept per process
+
+
+class CompiledRoadmap:
+    """
+    Flat, array-backed form of a roadmap's timeline, built once per plan version.
+
+    Every trackable sub-topic becomes an item with a compact integer id (its
+    position in timeline order), so progress can be stored and keyed by that id
+    instead of by long "duration-topic-sub-topic" strings. Durations and topics
+    are index ranges into the item arrays:
+
+        items of duration d: range(duration_item_offsets[d], duration_item_offsets[d + 1])
+        topics of duration d: range(duration_topic_offsets[d], duration_topic_offsets[d + 1])
+        items of topic t:    range(topic_item_offsets[t], topic_item_offsets[t + 1])
+
+    Per-duration and overall totals are precomputed.
+    """
+
+    __slots__ = (
+        "durations", "duration_topic_offsets", "duration_item_offsets", "duration_totals",
+        "topics", "topic_item_offsets", "item_texts", "item_groups", "item_durations",
+        "total_items", "skipped_durations",
+    )
+
+    def __init__(self):
+        self.durations = [] # Duration labels, e.g. "Month 1-2"
+        self.duration_topic_offsets = array("I", [0])
+        self.duration_item_offsets = array("I", [0])
+        self.duration_totals = array("I")
+        self.topics = [] # Topic labels, e.g. "Resources"
+        self.topic_item_offsets = array("I", [0])
+        self.item_texts = [] # Sub-topic text
+        self.item_groups = [] # Sub-topic group for dict-shaped topics, else None
+        self.item_durations = array("I") # Item id -> duration index
+        self.total_items = 0
+        self.skipped_durations = 0 # Durations whose content was not a topic mapping
+
+    def __len__(self):
+        return self.total_items
+
+    def topic_range(self, duration_index):
+        return range(self.duration_topic_offsets[duration_index], self.duration_topic_offsets[duration_index + 1])
+
+    def item_range(self, topic_index):
+        return range(self.topic_item_offsets[topic_index], self.topic_item_offsets[topic_index + 1])
+
+    def duration_item_range(self, duration_index):
+        return range(self.duration_item_offsets[duration_index], self.duration_item_offsets[duration_index + 1])
+
+    def completed_by_duration(self, progress):
+        """Counts completed items per duration for a {item_id: checked} mapping in one pass over it."""
+        completed = array("I", bytes(4 * len(self.durations)))
+        for item_id, checked in progress.items():
+            if checked and 0 <= item_id < self.total_items:
+                completed[self.item_durations[item_id]] += 1
+        return completed
+
+    def item_identity(self, item_id):
+        """(duration, topic, group, text) of an item: what stays the same when the item is carried into a new plan version."""
+        duration_index = self.item_durations[item_id]
+        topic_index = bisect.bisect_right(self.topic_item_offsets, item_id) - 1
+        return self.durations[duration_index], self.topics[topic_index], self.item_groups[item_id], self.item_texts[item_id]
+
+    def legacy_checkbox_keys(self):
+        """
+        Yields (item_id, key) using the checkbox keys stored before items had ids,
+        i.e. "{duration}-{topic}-{sub_topic}-checkbox" and
+        "{duration}-{topic}-{sub_topic_group}-{sub_item}-checkbox".
+        """
+        for duration_index, duration in enumerate(self.durations):
+            for topic_index in self.topic_range(duration_index):
+                topic = self.topics[topic_index]
+                for item_id in self.item_range(topic_index):
+                    group = self.item_groups[item_id]
+                    if group is None:
+                        yield item_id, f"{duration}-{topic}-{self.item_texts[item_id]}-checkbox"
+                    else:
+                        yield item_id, f"{duration}-{topic}-{group}-{self.item_texts[item_id]}-checkbox"
+
+
+def compile_roadmap(roadmap_json):
+    """
+    Compiles a roadmap dict ({"timeline": {duration: {topic: list | dict}}}) into a CompiledRoadmap.
+
+    Topics whose value is a list contribute one item per entry; dict-shaped topics contribute
+    one item per entry of each group. Other values carry no trackable items.
+    """
+    compiled = CompiledRoadmap()
+    timeline_data = (roadmap_json or {}).get("timeline") or {}
+    for duration, duration_content in timeline_data.items():
+        if not isinstance(duration_content, dict):
+            compiled.skipped_durations += 1
+            continue
+        duration_index = len(compiled.durations)
+        compiled.durations.append(str(duration))
+        for topic, sub_topics in duration_content.items():
+            compiled.topics.append(str(topic))
+            if isinstance(sub_topics, list):
+                for sub_topic in sub_topics:
+                    compiled.item_texts.append(str(sub_topic))
+                    compiled.item_groups.append(None)
+                    compiled.item_durations.append(duration_index)
+            elif isinstance(sub_topics, dict):
+                for sub_topic_group, sub_topic_list in sub_topics.items():
+                    if not isinstance(sub_topic_list, list):
+                        sub_topic_list = [sub_topic_list]
+                    for sub_item in sub_topic_list:
+                        compiled.item_texts.append(str(sub_item))
+                        compiled.item_groups.append(str(sub_topic_group))
+                        compiled.item_durations.append(duration_index)
+            compiled.topic_item_offsets.append(len(compiled.item_texts))
+        compiled.duration_topic_offsets.append(len(compiled.topics))
+        compiled.duration_item_offsets.append(len(compiled.item_texts))
+        compiled.duration_totals.append(compiled.duration_item_offsets[-1] - compiled.duration_item_offsets[-2])
+    compiled.total_items = len(compiled.item_texts)
+    return compiled
+
+
+def remap_progress(old_compiled, new_compiled, progress):
+    """
+    Carries {item_id: checked} progress from one version of a roadmap to the next.
+
+    Items are matched on (duration, topic, group, text), so progress survives items moving to
+    new ids when other durations are regenerated or added; items that no longer exist are dropped.
+    """
+    new_item_ids = {new_compiled.item_identity(item_id): item_id for item_id in range(new_compiled.total_items)}
+    carried = {}
+    for item_id, checked in progress.items():
+        if 0 <= item_id < old_compiled.total_items:
+            new_item_id = new_item_ids.get(old_compiled.item_identity(item_id))
+            if new_item_id is not None:
+                carried[new_item_id] = checked
+    return carried
+
+
+def plan_key_prefix(user_id, career_goal, version):
+    """Short per-plan prefix for widget keys, so items of different plans never share a session_state key."""
+    return f"{zlib.crc32(f'{user_id}|{career_goal}|{version}'.encode('utf-8')):08x}"
+
+
+_compiled_roadmaps = OrderedDict() # (user_id, career_goal, version) -> CompiledRoadmap
+_compiled_roadmaps_lock = threading.Lock()
+
+
+def get_compiled_roadmap(user_id, career_goal, version, load_roadmap_json):
+    """
+    Returns the compiled roadmap for one plan version, compiling it on first use.
+
+    ``load_roadmap_json()`` is only called on a cache miss, so reruns skip both the
+    JSON parse and the compile.
+    """
+    cache_key = (user_id, career_goal, version)
+    with _compiled_roadmaps_lock:
+        compiled = _compiled_roadmaps.get(cache_key)
+        if compiled is not None:
+            _compiled_roadmaps.move_to_end(cache_key)
+            return compiled
+    roadmap_json = load_roadmap_json()
+    if roadmap_json is None:
+        return None
+    compiled = compile_roadmap(roadmap_json)
+    with _compiled_roadmaps_lock:
+        _compiled_roadmaps[cache_key] = compiled
+        while len(_compiled_roadmaps) > COMPILED_ROADMAP_CACHE_SIZE:
+            _compiled_roadmaps.popitem(last=False)
+    return compiled
@@ -0,0 +1,77 @@
+import glob
+import hashlib
+import os
+import re
+from functools import lru_cache
+
+# Number of career plan database files users are spread over. Changing it needs a rebalance
+# (python -m backend.sharding) with the app stopped, so every user's plans live on their new shard.
+SHARD_COUNT = max(1, int(os.environ.get("CAREER_PLANS_SHARDS", "1")))
+SHARD_FILE_PREFIX = "career_plans" # Shard 0 is career_plans.db, the single file used before sharding
+_SHARD_FILE_PATTERN = re.compile(r"^career_plans(?:\.shard(\d+))?\.db$")
+
+
+def shard_database_name(shard_index):
+    """File name of a shard: career_plans.db for shard 0, career_plans.shard<N>.db otherwise."""
+    return f"{SHARD_FILE_PREFIX}.db" if shard_index == 0 else f"{SHARD_FILE_PREFIX}.shard{shard_index}.db"
+
+
+@lru_cache(maxsize=65536)
+def shard_for_user(user_id, shard_count=SHARD_COUNT):
+    """
+    Index of the shard holding a user's plans, by rendezvous (highest random weight) hashing.
+
+    Stable across processes and restarts, and changing the shard count only moves the users
+    whose highest-scoring shard changed: about 1/N of them when going from N-1 to N shards.
+    """
+    if shard_count == 1:
+        return 0
+    user_bytes = str(user_id).encode("utf-8")
+    return max(range(shard_count), key=lambda shard_index: hashlib.blake2b(
+        user_bytes + b"\x00" + str(shard_index).encode("ascii"), digest_size=8).digest())
+
+
+def existing_shard_indexes(directory="."):
+    """Indexes of the shard files present in a directory, including ones beyond the current SHARD_COUNT."""
+    indexes = []
+    for path in glob.glob(os.path.join(directory, f"{SHARD_FILE_PREFIX}*.db")):
+        match = _SHARD_FILE_PATTERN.match(os.path.basename(path))
+        if match:
+            indexes.append(int(match.group(1) or 0))
+    return sorted(indexes)
+
+
+def rebalance_shards(shard_count=SHARD_COUNT):
+    """
+    Moves every user whose plans are not on their shard for ``shard_count`` shards onto it.
+
+    Reads every shard file on disk, so it also drains shards left over from a larger shard count.
+    Each user is copied and committed on the target before being deleted from the source, and a
+    copy replaces whatever a previous interrupted run left on the target, so it can be re-run safely.
+    Run it with the app stopped. Returns {"users_moved": ..., "plans_moved": ...}.
+    """
+    from backend.database import connect_to_shard, move_user_plans_sqlite
+
+    moved = {"users_moved": 0, "plans_moved": 0}
+    for source_index in existing_shard_indexes():
+        source_conn = connect_to_shard(source_index)
+        try:
+            user_ids = [row[0] for row in source_conn.execute("SELECT DISTINCT user_id FROM career_plans_sqlite").fetchall()]
+            for user_id in user_ids:
+                target_index = shard_for_user(user_id, shard_count)
+                if target_index == source_index:
+                    continue
+                target_conn = connect_to_shard(target_index)
+                try:
+                    moved["plans_moved"] += move_user_plans_sqlite(source_conn, target_conn, user_id)
+                finally:
+                    target_conn.close()
+                moved["users_moved"] += 1
+        finally:
+            source_conn.close()
+    return moved
+
+
+if __name__ == "__main__":
+    print(f"Rebalancing career plans onto {SHARD_COUNT} shard(s)...")
+    print(rebalance_shards())
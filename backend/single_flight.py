@@ -0,0 +1,124 @@
+import copy
+import threading
+from backend.instrumentation import increment
+
+
+class _Flight:
+    """One in-flight call: its result, or for streams the items produced so far, shared by every caller."""
+
+    __slots__ = ("condition", "items", "result", "error", "done", "callers")
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.items = []
+        self.result = None
+        self.error = None
+        self.done = False
+        self.callers = 1
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for a key is running, later callers with
+    the same key wait for it and share its result instead of starting their own.
+
+    Only calls that overlap in time are merged; nothing is remembered once a call finishes
+    (that is the roadmap cache's job). Every caller gets its own deep copy of the result, so one
+    caller mutating it cannot change what the others see. ``name`` labels the single_flight.* metrics.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "leaders": 0, "coalesced": 0, "max_waiters": 0}
+
+    def _join(self, key):
+        """Returns (flight, is_leader), registering a new flight if none is running for key."""
+        with self._lock:
+            self._stats["calls"] += 1
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self._stats["leaders"] += 1
+                return flight, True
+            flight.callers += 1
+            self._stats["coalesced"] += 1
+            self._stats["max_waiters"] = max(self._stats["max_waiters"], flight.callers - 1)
+        increment("single_flight.coalesced", flight=self.name)
+        return flight, False
+
+    def _finish(self, key, flight):
+        with self._lock:
+            self._flights.pop(key, None)
+        with flight.condition:
+            flight.done = True
+            flight.condition.notify_all()
+
+    def do(self, key, func):
+        """
+        Returns func() for the first caller with this key, and the same result for everyone who
+        calls with the key while it runs (each waiter gets a copy). An exception raised by func is
+        re-raised to all of them.
+        """
+        flight, is_leader = self._join(key)
+        if is_leader:
+            try:
+                flight.result = func()
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                self._finish(key, flight)
+            return flight.result
+        with flight.condition:
+            while not flight.done:
+                flight.condition.wait()
+        if flight.error is not None:
+            raise flight.error
+        return copy.deepcopy(flight.result)
+
+    def stream(self, key, make_iterator):
+        """
+        Yields the items of make_iterator() to every concurrent caller with this key.
+
+        The iterator is drained on a helper thread, so it always runs to completion even if the
+        caller that started it stops reading (e.g. a Streamlit rerun); callers that join late get
+        the items produced so far replayed first. If the iterator raises, every caller gets the
+        items produced before the failure and then the exception.
+        """
+        flight, is_leader = self._join(key)
+        if is_leader:
+            threading.Thread(target=self._drain, args=(key, flight, make_iterator), name=f"single-flight-{self.name}", daemon=True).start()
+        index = 0
+        while True:
+            with flight.condition:
+                while index >= len(flight.items) and not flight.done:
+                    flight.condition.wait()
+                items, done = flight.items[index:], flight.done
+            for item in items:
+                yield copy.deepcopy(item) # The drain thread keeps the originals for callers that join later
+            index += len(items)
+            if done and index >= len(flight.items):
+                if flight.error is not None:
+                    raise flight.error
+                return
+
+    def _drain(self, key, flight, make_iterator):
+        try:
+            for item in make_iterator():
+                with flight.condition:
+                    flight.items.append(item)
+                    flight.condition.notify_all()
+        except Exception as e:
+            flight.error = e # Re-raised to stream callers once they have the items produced before the failure
+        finally:
+            self._finish(key, flight)
+
+    def stats(self):
+        """Calls, leaders (calls that did the work), coalesced callers, the largest waiter count and the coalescing ratio."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._flights)
+        stats["coalescing_ratio"] = round(stats["coalesced"] / stats["calls"], 3) if stats["calls"] else 0.0
+        return stats
@@ -0,0 +1,126 @@
+import json
+
+
+class JsonMemberStreamParser:
+    """
+    Incrementally scans a streamed JSON document and emits the members of one
+    top-level container as soon as each member's value is complete.
+
+    For ``{"timeline": {"Month 1-2": {...}, "Month 3-4": {...}}}`` and
+    ``container_key="timeline"`` this yields ``("Month 1-2", {...})`` once the
+    closing brace of that duration has arrived, without waiting for the rest
+    of the completion. Array containers yield ``(index, element)`` pairs.
+
+    The scanner only tracks string/escape state and bracket depth; each
+    completed member is then handed to ``json.loads`` on its own slice.
+    """
+
+    def __init__(self, container_key="timeline"):
+        self.container_key = container_key
+        self._text = ""
+        self._pos = 0 # Next character of self._text to scan
+        self._started = False # Scanning begins at the first '{'
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._keys = {} # depth -> most recent key seen at that depth
+        self._container_depth = None # Depth inside the target container, once opened
+        self._container_is_array = False
+        self._container_closed = False
+        self._member_key = None
+        self._member_start = None
+        self._member_index = 0
+
+    @property
+    def text(self):
+        """Everything fed to the parser so far."""
+        return self._text
+
+    def _emit(self, end):
+        """Parses the pending member value ending at ``end`` (exclusive) and returns (key, value) or None."""
+        raw_value = self._text[self._member_start:end].strip()
+        key = self._member_index if self._container_is_array else self._member_key
+        self._member_start = None
+        self._member_key = None
+        if self._container_is_array:
+            self._member_index += 1
+        if not raw_value:
+            return None
+        try:
+            return key, json.loads(raw_value)
+        except json.JSONDecodeError:
+            return None # Malformed member, the caller can fall back to parsing the full document
+
+    def feed(self, chunk):
+        """Feeds the next chunk of streamed text and returns the list of members completed by it."""
+        completed = []
+        if not chunk:
+            return completed
+        self._text += chunk
+        text = self._text
+        i = self._pos
+        while i < len(text):
+            char = text[i]
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                else:
+                    i += 1
+                    continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    try:
+                        self._last_string = json.loads(text[self._string_start:i + 1])
+                    except json.JSONDecodeError:
+                        self._last_string = None
+                i += 1
+                continue
+
+            in_container = self._container_depth is not None and not self._container_closed
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+                if in_container and self._container_is_array and self._depth == self._container_depth and self._member_start is None:
+                    self._member_start = i
+            elif char == ":":
+                self._keys[self._depth] = self._last_string
+                if in_container and not self._container_is_array and self._depth == self._container_depth:
+                    self._member_key = self._last_string
+                    self._member_start = i + 1
+            elif char in "{[":
+                if in_container and self._container_is_array and self._depth == self._container_depth and self._member_start is None:
+                    self._member_start = i
+                self._depth += 1
+                if self._container_depth is None and self._depth == 2 and self._keys.get(1) == self.container_key:
+                    self._container_depth = self._depth
+                    self._container_is_array = char == "["
+            elif char in "}]":
+                if in_container and self._depth == self._container_depth:
+                    if self._member_start is not None: # Trailing scalar member
+                        member = self._emit(i)
+                        if member:
+                            completed.append(member)
+                    self._container_closed = True
+                self._depth -= 1
+                if in_container and self._depth == self._container_depth and self._member_start is not None:
+                    member = self._emit(i + 1)
+                    if member:
+                        completed.append(member)
+            elif char == ",":
+                if in_container and self._depth == self._container_depth and self._member_start is not None:
+                    member = self._emit(i)
+                    if member:
+                        completed.append(member)
+            elif in_container and self._container_is_array and self._depth == self._container_depth and self._member_start is None and not char.isspace():
+                self._member_start = i # Scalar array element
+            i += 1
+        self._pos = i
+        return completed
@@ -0,0 +1,232 @@
+"""
+Offline stand-in for the Groq chat completions endpoint.
+
+Replays recorded roadmap JSON from benchmarks/recordings with configurable
+first-token latency, token rate and error injection, so the generation path
+can be measured and exercised without touching the live API. Roadmaps are
+answered minified, as the prompts ask, and the outline / per-segment prompts
+of segmented generation get outlines and segments cut from the recording
+(repeated as needed to fill long timelines). The Groq SDK
+honours the GROQ_BASE_URL environment variable, so pointing the app at the
+fake is just:
+
+    python -m benchmarks.fake_groq --port 8787 --latency-ms 300 --tokens-per-second 400
+    GROQ_BASE_URL=http://127.0.0.1:8787 streamlit run app.py
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from backend.roadmap_format import OUTLINE_CONTAINER_KEY, RESOURCES_TOPIC, duration_label, fallback_outline
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+CHARS_PER_TOKEN = 4 # Rough token size used to pace the replay
+SEGMENT_PROMPT_PATTERN = re.compile(r"Write Month (\d+)(?:-(\d+))? only") # Task line of a segment prompt
+TIMELINE_PROMPT_PATTERN = re.compile(r"in (\d+) months")
+
+
+def load_recordings(recordings_dir=RECORDINGS_DIR):
+    """Loads every recorded completion as {name: completion_text}."""
+    recordings = {}
+    for file_name in sorted(os.listdir(recordings_dir)):
+        if file_name.endswith(".json"):
+            with open(os.path.join(recordings_dir, file_name), encoding="utf-8") as f:
+                recordings[file_name[:-len(".json")]] = f.read()
+    return recordings
+
+
+class FakeGroqServer:
+    """
+    Threaded HTTP server speaking the subset of the Groq API used by backend.ai_agent.
+
+    Args:
+        recordings (dict): {name: completion_text}; defaults to benchmarks/recordings.
+        latency_ms (float): Delay before the first token (or the whole response when not streaming).
+        tokens_per_second (float): Completion pacing; 0 disables pacing.
+        error_rate (float): Probability of answering a request with ``error_status`` instead.
+        error_status (int): HTTP status used for injected errors (429 or 5xx).
+        host (str), port (int): Bind address; port 0 picks a free port.
+        seed (int): Seed for the error-injection RNG.
+    """
+
+    def __init__(self, recordings=None, latency_ms=0.0, tokens_per_second=0.0, error_rate=0.0,
+                 error_status=429, host="127.0.0.1", port=0, seed=None):
+        self.recordings = recordings or load_recordings()
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "injected_errors": 0, "completion_tokens": 0}
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-groq", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _pick_recording(self, prompt):
+        """Prefers the recording whose name shares the most words with the prompt."""
+        prompt_words = set(prompt.lower().replace("-", " ").split())
+        best_name = max(self.recordings, key=lambda name: len(set(name.split("_")) & prompt_words))
+        roadmap_json = json.loads(self.recordings[best_name])
+        durations = list(roadmap_json["timeline"].values())
+        segment_match = SEGMENT_PROMPT_PATTERN.search(prompt)
+        if segment_match: # One segment of a segmented generation
+            start_month = int(segment_match.group(1))
+            end_month = int(segment_match.group(2) or start_month)
+            source = durations[(start_month - 1) // 2 % len(durations)]
+            roadmap_json = {"timeline": {duration_label(start_month, end_month): source}}
+        elif f'{{"{OUTLINE_CONTAINER_KEY}":' in prompt: # Outline of a segmented generation
+            timeline_match = TIMELINE_PROMPT_PATTERN.search(prompt)
+            outline = fallback_outline(int(timeline_match.group(1)) if timeline_match else 12)
+            for index, entry in enumerate(outline): # First topic of a recorded duration as the focus
+                entry[2] = next(topic for topic in durations[index % len(durations)] if topic != RESOURCES_TOPIC)
+            return json.dumps({OUTLINE_CONTAINER_KEY: outline}, separators=(",", ":"))
+        return json.dumps(roadmap_json, separators=(",", ":"), ensure_ascii=False) # Minified, as the prompts ask
+
+    def _should_fail(self):
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.stats["injected_errors"] += 1
+                return True
+        return False
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args): # Keep benchmark output clean
+                pass
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                prompt = " ".join(str(message.get("content", "")) for message in request.get("messages", []))
+
+                if server._should_fail():
+                    headers = {"retry-after": "0"} if server.error_status == 429 else None
+                    self._send_json(server.error_status, {"error": {"message": "Injected failure", "type": "fake_groq"}}, headers)
+                    return
+
+                completion = server._pick_recording(prompt)
+                completion_tokens = max(1, len(completion) // CHARS_PER_TOKEN)
+                with server._lock:
+                    server.stats["completion_tokens"] += completion_tokens
+                usage = {
+                    "prompt_tokens": len(prompt) // CHARS_PER_TOKEN,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": len(prompt) // CHARS_PER_TOKEN + completion_tokens,
+                }
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+                model = request.get("model", "fake-model")
+                time.sleep(server.latency_ms / 1000.0)
+
+                if request.get("stream"):
+                    self._stream(completion_id, model, completion, usage)
+                    return
+
+                if server.tokens_per_second:
+                    time.sleep(completion_tokens / server.tokens_per_second)
+                self._send_json(200, {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": completion}, "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+
+            def _stream(self, completion_id, model, completion, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                chunk_chars = CHARS_PER_TOKEN * 4 # Four tokens per SSE event
+                delay = (chunk_chars / CHARS_PER_TOKEN) / server.tokens_per_second if server.tokens_per_second else 0
+                for start in range(0, len(completion), chunk_chars):
+                    is_last = start + chunk_chars >= len(completion)
+                    event = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": completion[start:start + chunk_chars]},
+                                     "finish_reason": "stop" if is_last else None}],
+                    }
+                    if is_last:
+                        event["x_groq"] = {"usage": usage}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    if delay:
+                        time.sleep(delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded roadmap completions on a fake Groq endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=429)
+    args = parser.parse_args()
+
+    server = FakeGroqServer(latency_ms=args.latency_ms, tokens_per_second=args.tokens_per_second,
+                            error_rate=args.error_rate, error_status=args.error_status,
+                            host=args.host, port=args.port)
+    print(f"Fake Groq endpoint listening on {server.base_url} (set GROQ_BASE_URL to use it)")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Cold-start and per-rerun profile of the Streamlit app.
+
+Reports, as JSON:
+  - import cost of each page module and of the app's startup imports, each measured in a fresh
+    interpreter with ``python -X importtime`` (best of --runs), plus the slowest modules they pull in;
+  - script run times through Streamlit's AppTest: the first run of each page in a fresh process
+    (cold, including lazy page imports) and the reruns after it (warm).
+
+    python -m benchmarks.profile_startup --output startup_profile.json
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.run_benchmarks import git_revision, percentile
+
+DEFAULT_RUNS = 5
+DEFAULT_RERUNS = 20
+TOP_MODULES = 15
+IMPORT_TARGETS = {
+    "startup (app.py imports)": "components.auth, backend.instrumentation",
+    "Generate Plan page": "components.home",
+    "Monitor Goal page": "components.dashboard",
+    "roadmap generation (Groq SDK)": "backend.ai_agent",
+}
+# Pages as the app navigates to them; None is the login page
+APP_PAGES = {"Authentication": None, "Generate Plan": "Generate Plan", "Monitor Goal": "Monitor Goal"}
+IMPORTTIME_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+PROFILE_USER = "startup_profile_user"
+
+# Run in a fresh interpreter per page; prints {"first_ms": ..., "rerun_ms": [...]}
+_APP_RUN_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {repo!r})
+from streamlit.testing.v1 import AppTest
+page, reruns = {page!r}, {reruns}
+app = AppTest.from_file({app_path!r}, default_timeout=60)
+if page is not None:
+    app.session_state["authentication_status"] = True
+    app.session_state["name"] = {user!r}
+started = time.perf_counter()
+app.run()
+if page is not None and page != "Generate Plan": # The first run shows the default page; navigate like a user would
+    app.sidebar.radio[0].set_value(page)
+    started = time.perf_counter()
+    app.run()
+first_ms = (time.perf_counter() - started) * 1000.0
+rerun_ms = []
+for _ in range(reruns):
+    started = time.perf_counter()
+    app.run()
+    rerun_ms.append((time.perf_counter() - started) * 1000.0)
+errors = [str(exception.value) for exception in app.exception]
+print(json.dumps({{"first_ms": first_ms, "rerun_ms": rerun_ms, "errors": errors}}))
+"""
+
+
+def profile_imports(modules, runs, repo):
+    """
+    Best-of-``runs`` import profile of ``modules`` in fresh interpreters.
+
+    Returns:
+        tuple: (report with total and slowest modules in ms, {module: self time in microseconds})
+    """
+    best = None
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modules}"], cwd=repo,
+                                capture_output=True, text=True, check=True)
+        self_us, total_us = {}, 0
+        for line in result.stderr.splitlines():
+            match = IMPORTTIME_PATTERN.match(line)
+            if not match:
+                continue
+            self_time, cumulative, indent, name = int(match.group(1)), int(match.group(2)), match.group(3), match.group(4)
+            self_us[name] = self_time
+            if len(indent) == 1: # Top-level import: its cumulative time covers everything below it
+                total_us += cumulative
+        if best is None or total_us < best[0]:
+            best = (total_us, self_us)
+    total_us, self_us = best
+    return {
+        "total_ms": round(total_us / 1000.0, 1),
+        "modules_imported": len(self_us),
+        "slowest_modules_ms": {name: round(us / 1000.0, 1) for name, us in sorted(self_us.items(), key=lambda item: -item[1])[:TOP_MODULES]},
+    }, self_us
+
+
+def profile_page_runs(page, reruns, repo, workdir):
+    """First run (cold process) and warm rerun times of one page through AppTest."""
+    script = _APP_RUN_SCRIPT.format(repo=repo, page=page, reruns=reruns, app_path=os.path.join(repo, "app.py"), user=PROFILE_USER)
+    result = subprocess.run([sys.executable, "-c", script], cwd=workdir, capture_output=True, text=True,
+                            env=dict(os.environ, TRACE_LEVEL="off"))
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1:]}
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    rerun_ms = sorted(measured["rerun_ms"])
+    return {
+        "first_run_ms": round(measured["first_ms"], 1),
+        "rerun_ms": {"p50": round(percentile(rerun_ms, 50), 2), "p95": round(percentile(rerun_ms, 95), 2)} if rerun_ms else None,
+        "errors": measured["errors"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile cold start and per-rerun overhead of the Streamlit app.")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="Fresh interpreters per import measurement (best is kept)")
+    parser.add_argument("--reruns", type=int, default=DEFAULT_RERUNS, help="Warm reruns timed per page")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    repo = os.getcwd()
+    imports = {}
+    startup_modules = None
+    for target, modules in IMPORT_TARGETS.items():
+        print(f"Profiling imports of {target}...", file=sys.stderr)
+        imports[target], self_us = profile_imports(modules, args.runs, repo)
+        if startup_modules is None: # The first target is the startup set; the others are reported on top of it
+            startup_modules = set(self_us)
+        else:
+            added_us = sum(us for name, us in self_us.items() if name not in startup_modules)
+            imports[target]["added_to_startup_ms"] = round(added_us / 1000.0, 1) # What lazily loading this costs on first use
+
+    page_runs = {}
+    with tempfile.TemporaryDirectory(prefix="career_planner_startup_") as workdir: # Databases are relative paths
+        for name, page in APP_PAGES.items():
+            print(f"Profiling script runs of {name}...", file=sys.stderr)
+            page_runs[name] = profile_page_runs(page, args.reruns, repo, workdir)
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_revision": git_revision(),
+        "python": sys.version.split()[0],
+        "settings": {"runs": args.runs, "reruns": args.reruns},
+        "imports": imports,
+        "page_runs": page_runs,
+    }
+    report_json = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report_json)
+    else:
+        print(report_json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+End-to-end latency benchmarks for the roadmap generation and storage paths.
+
+Runs every scenario against the offline fake Groq endpoint and a throwaway
+database directory under 1, 10 and 100 concurrent simulated users, and
+reports p50/p95/p99 latency and throughput as JSON:
+
+    python -m benchmarks.run_benchmarks --output bench_output.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_groq import FakeGroqServer
+
+DEFAULT_CONCURRENCY_LEVELS = (1, 10, 100)
+DEFAULT_OPS_PER_USER = 5
+SAMPLE_INPUTS = ("Bachelor's Degree", "Data Scientist", "10 hours per week, budget for online courses", 12)
+LONG_TIMELINE_MONTHS = 24 # Timeline used by the segmented generation scenario
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def run_scenario(name, operation, concurrency, ops_per_user, setup=None):
+    """
+    Runs ``operation(user_index, op_index)`` ops_per_user times for each of ``concurrency`` users in parallel.
+
+    An operation counts as an error if it raises or returns a falsy value.
+    """
+    if setup:
+        setup(concurrency, ops_per_user)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(concurrency)
+
+    def simulated_user(user_index):
+        start_barrier.wait() # Release every user at once
+        for op_index in range(ops_per_user):
+            started = time.perf_counter()
+            try:
+                ok = operation(user_index, op_index)
+                error = None if ok else "operation returned a falsy result"
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            with lock:
+                latencies.append(elapsed_ms)
+                if error:
+                    errors.append(error)
+
+    wall_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(simulated_user, range(concurrency)))
+    wall_seconds = time.perf_counter() - wall_started
+
+    latencies.sort()
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "operations": len(latencies),
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "wall_seconds": round(wall_seconds, 4),
+        "throughput_ops_per_second": round(len(latencies) / wall_seconds, 2) if wall_seconds else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3),
+            "mean": round(sum(latencies) / len(latencies), 3),
+        },
+    }
+
+
+def build_scenarios(sample_roadmap):
+    """Returns {scenario_name: (operation, setup)} for the paths under test."""
+    from backend.ai_agent import generate_career_roadmap
+    from backend.database import connect_to_sqlite, store_roadmap_sqlite, fetch_roadmap_sqlite
+    from backend.progress_writer import get_progress_writer
+
+    run_id = {"value": 0} # Keeps career goals unique across concurrency levels
+
+    def goal_for(user_index, op_index):
+        return f"Benchmark Goal {run_id['value']}-{user_index}-{op_index}"
+
+    def next_run(concurrency, ops_per_user):
+        run_id["value"] += 1
+
+    def seed_plans(concurrency, ops_per_user):
+        next_run(concurrency, ops_per_user)
+        for user_index in range(concurrency):
+            conn = connect_to_sqlite(f"bench_user_{user_index}")
+            for op_index in range(ops_per_user):
+                store_roadmap_sqlite(conn, f"bench_user_{user_index}", goal_for(user_index, op_index), sample_roadmap)
+            conn.close()
+
+    def generate(user_index, op_index):
+        education_status, career_goal, resources_available, timeline = SAMPLE_INPUTS
+        return generate_career_roadmap(education_status, career_goal, resources_available, timeline, use_cache=False)
+
+    def generate_segmented(user_index, op_index):
+        education_status, career_goal, resources_available, _ = SAMPLE_INPUTS
+        return generate_career_roadmap(education_status, career_goal, resources_available, LONG_TIMELINE_MONTHS, use_cache=False, segmented=True)
+
+    def generate_burst(user_index, op_index):
+        # Every user submits the same form at once (cache enabled, new goal per round): one completion per round
+        education_status, career_goal, resources_available, timeline = SAMPLE_INPUTS
+        return generate_career_roadmap(education_status, f"{career_goal} {run_id['value']}-{op_index}", resources_available, timeline)
+
+    def store(user_index, op_index):
+        conn = connect_to_sqlite(f"bench_user_{user_index}")
+        try:
+            return store_roadmap_sqlite(conn, f"bench_user_{user_index}", goal_for(user_index, op_index), sample_roadmap)
+        finally:
+            conn.close()
+
+    def fetch(user_index, op_index):
+        conn = connect_to_sqlite(f"bench_user_{user_index}")
+        try:
+            roadmap_json, _ = fetch_roadmap_sqlite(conn, f"bench_user_{user_index}", goal_for(user_index, op_index))
+            return roadmap_json is not None
+        finally:
+            conn.close()
+
+    def progress_update(user_index, op_index):
+        # Mirrors components.roadmap_display.update_progress_db minus the Streamlit session state, plus the
+        # SQLite write: flushed inline so the timing stays comparable with runs from before the progress writer
+        get_progress_writer().enqueue(f"bench_user_{user_index}", goal_for(user_index, 0), op_index, 0, True)
+        get_progress_writer().flush()
+        return True
+
+    def progress_enqueue(user_index, op_index):
+        # What a checkbox click costs the page: the write happens later on the writer thread
+        get_progress_writer().enqueue(f"bench_user_{user_index}", goal_for(user_index, 0), op_index, 0, True)
+        return True
+
+    return {
+        "generate_career_roadmap": (generate, None),
+        "generate_segmented_roadmap": (generate_segmented, None),
+        "generate_identical_burst": (generate_burst, next_run),
+        "store_roadmap_sqlite": (store, next_run),
+        "fetch_roadmap_sqlite": (fetch, seed_plans),
+        "progress_update": (progress_update, seed_plans),
+        "progress_enqueue": (progress_enqueue, seed_plans),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark roadmap generation and storage under concurrent users.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=list(DEFAULT_CONCURRENCY_LEVELS))
+    parser.add_argument("--ops-per-user", type=int, default=DEFAULT_OPS_PER_USER)
+    parser.add_argument("--scenarios", nargs="+", help="Subset of scenarios to run (default: all)")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Fake Groq first-token latency")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Fake Groq token rate (0 = unpaced)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake Groq error injection rate")
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    fake_groq = FakeGroqServer(latency_ms=args.latency_ms, tokens_per_second=args.tokens_per_second,
+                               error_rate=args.error_rate, error_status=args.error_status, seed=0).start()
+    os.environ["GROQ_BASE_URL"] = fake_groq.base_url # Picked up by the Groq SDK when the shared client is created
+    sample_roadmap = json.loads(next(iter(fake_groq.recordings.values())))
+
+    original_cwd = os.getcwd()
+    results = []
+    pool_stats = {}
+    progress_writer_stats = {}
+    instrumentation = {}
+    roadmap_blob_stats = {}
+    coalescing_stats = {}
+    with tempfile.TemporaryDirectory(prefix="career_planner_bench_") as workdir:
+        sys.path.insert(0, original_cwd)
+        os.chdir(workdir) # Database files are relative paths, keep them out of the working tree
+        try:
+            with contextlib.redirect_stdout(sys.stderr): # Stdout carries only the JSON report, whatever the code under test writes
+                scenarios = build_scenarios(sample_roadmap)
+                selected = args.scenarios or list(scenarios)
+                for name in selected:
+                    operation, setup = scenarios[name]
+                    for concurrency in args.concurrency:
+                        print(f"Running {name} with {concurrency} concurrent users...", file=sys.stderr)
+                        results.append(run_scenario(name, operation, concurrency, args.ops_per_user, setup))
+                from backend.connection_manager import get_pool_stats
+                from backend.progress_writer import get_progress_writer
+                get_progress_writer().flush()
+                progress_writer_stats = get_progress_writer().stats()
+                pool_stats = {os.path.basename(path): stats for path, stats in get_pool_stats().items()}
+                from backend.blob_store import roadmap_blob_stats as blob_stats
+                from backend.database import for_each_shard
+                roadmap_blob_stats = for_each_shard(blob_stats) # One entry per shard; bodies are deduplicated within a shard
+                from backend.ai_agent import get_generation_coalescing_stats
+                coalescing_stats = get_generation_coalescing_stats()
+                from backend.instrumentation import export_metrics_json
+                instrumentation = export_metrics_json()
+        finally:
+            os.chdir(original_cwd)
+            fake_groq.stop()
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "ops_per_user": args.ops_per_user,
+            "fake_groq": {
+                "latency_ms": args.latency_ms,
+                "tokens_per_second": args.tokens_per_second,
+                "error_rate": args.error_rate,
+                "error_status": args.error_status,
+            },
+        },
+        "fake_groq_stats": fake_groq.stats,
+        "connection_pool_stats": pool_stats,
+        "progress_writer_stats": progress_writer_stats,
+        "generation_coalescing_stats": coalescing_stats, # Identical concurrent generations served by one completion
+        "roadmap_blob_stats": roadmap_blob_stats, # Distinct stored roadmap bodies vs plans referencing them
+        "instrumentation": instrumentation, # In-process spans (db.query, llm.request, json.parse, ...)
+        "results": results,
+    }
+    report_json = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report_json)
+    else:
+        print(report_json)
+
+
+if __name__ == "__main__":
+    main()
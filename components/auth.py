@@ -1,51 +1,287 @@
 import streamlit as st
 import sqlite3
 import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from backend.connection_manager import get_pool
+from backend.migrations import apply_migrations
 
 DATABASE_NAME = "users.db"  # SQLite database file name
 
-def create_user_table():
-    """Creates the users table if it doesn't exist."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    cursor.execute("""
+# scrypt parameters for new password hashes (~16 MB and tens of ms per verification)
+PASSWORD_SCRYPT_N = 2 ** 14
+PASSWORD_SCRYPT_R = 8
+PASSWORD_SCRYPT_P = 1
+PASSWORD_HASH_WORKERS = 2 # Threads doing password hashing; hashlib.scrypt releases the GIL
+PASSWORD_HASH_MAX_QUEUED = 16 # Hashes waiting or running before new logins are turned away
+PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS = 5.0
+# Verified against for unknown usernames, so a failed login takes as long whether or not the user exists
+DUMMY_PASSWORD_HASH = f"scrypt${PASSWORD_SCRYPT_N}${PASSWORD_SCRYPT_R}${PASSWORD_SCRYPT_P}${'00' * 16}${'00' * 32}"
+
+SESSION_TTL_SECONDS = 7 * 24 * 60 * 60 # Session tokens expire after a week
+SESSION_TOKEN_CACHE_SIZE = 1024 # Verified tokens kept in memory
+SESSION_COOKIE_NAME = "career_planner_session" # Browser cookie carrying the token across refreshes
+LEGACY_SESSION_QUERY_PARAM = "session" # Tokens used to ride in the URL; stripped from old links, never honoured
+# Signing key for session tokens. Set SESSION_SECRET_KEY so tokens survive a server restart.
+SESSION_SECRET_KEY = os.environ.get("SESSION_SECRET_KEY", "").encode("utf-8") or secrets.token_bytes(32)
+
+def connect_to_users_db():
+    """Checks out a pooled connection to the users database. Calling close() on it returns it to the pool."""
+    return get_pool(DATABASE_NAME, initializer=initialize_users_db).acquire()
+
+def _create_user_table(conn):
+    conn.execute("""
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             username TEXT UNIQUE NOT NULL,
             password_hash TEXT NOT NULL
         )
     """)
-    conn.commit()
-    conn.close()
+
+def _create_sessions_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            token_id TEXT PRIMARY KEY,
+            username TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)")
+
+# Append-only: never edit or reorder a released migration, add a new version instead
+USERS_MIGRATIONS = [
+    (1, "create users", _create_user_table),
+    (2, "create sessions", _create_sessions_table),
+]
+
+def initialize_users_db(conn):
+    """One-time setup run on the first pooled connection of the process: applies pending migrations."""
+    apply_migrations(conn, USERS_MIGRATIONS)
+
+def create_user_table():
+    """Ensures the users schema is current. Kept for callers of the old API; the pool already does this once per process."""
+    conn = connect_to_users_db()
+    try:
+        apply_migrations(conn, USERS_MIGRATIONS)
+    finally:
+        conn.close()
 
 def hash_password(password):
-    """Hashes the password using SHA256."""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hashes the password with a random salt using scrypt. Returns "scrypt$n$r$p$salt$hash"."""
+    salt = secrets.token_bytes(16)
+    derived = hashlib.scrypt(password.encode(), salt=salt, n=PASSWORD_SCRYPT_N, r=PASSWORD_SCRYPT_R, p=PASSWORD_SCRYPT_P, dklen=32)
+    return f"scrypt${PASSWORD_SCRYPT_N}${PASSWORD_SCRYPT_R}${PASSWORD_SCRYPT_P}${salt.hex()}${derived.hex()}"
+
+def verify_password(password, password_hash):
+    """
+    Checks a password against a stored hash.
+
+    Returns:
+        tuple: (matches, needs_rehash). needs_rehash is True for legacy unsalted SHA-256 hashes
+               and for scrypt hashes made with weaker parameters than the current ones.
+    """
+    if password_hash.startswith("scrypt$"):
+        _, n, r, p, salt_hex, hash_hex = password_hash.split("$")
+        derived = hashlib.scrypt(password.encode(), salt=bytes.fromhex(salt_hex), n=int(n), r=int(r), p=int(p), dklen=len(hash_hex) // 2)
+        matches = hmac.compare_digest(derived.hex(), hash_hex)
+        return matches, matches and (int(n), int(r), int(p)) != (PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
+    matches = hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), password_hash) # Pre-scrypt accounts
+    return matches, matches
+
+
+_password_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_password_hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_MAX_QUEUED)
+
+def run_password_hash(func, *args):
+    """
+    Runs an expensive hash function on the bounded password-hash pool and waits for the result.
+
+    At most PASSWORD_HASH_WORKERS hashes run at once, so a burst of logins cannot take every
+    CPU away from page rendering. Raises TimeoutError if the queue stays full.
+    """
+    if not _password_hash_slots.acquire(timeout=PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS):
+        raise TimeoutError("Too many logins in progress")
+    try:
+        return _password_hash_executor.submit(func, *args).result()
+    finally:
+        _password_hash_slots.release()
 
 def register_user(username, password):
     """Registers a new user."""
-    create_user_table() # Ensure table exists before registering
-    hashed_password = hash_password(password)
+    hashed_password = run_password_hash(hash_password, password)
+    conn = connect_to_users_db()
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
         cursor = conn.cursor()
         cursor.execute("INSERT INTO users (username, password_hash) VALUES (?, ?)", (username, hashed_password))
         conn.commit()
-        conn.close()
         return True  # Registration successful
     except sqlite3.IntegrityError:
         return False # Username already exists
+    finally:
+        conn.close() # Return the connection to the pool
 
 def login_user(username, password):
-    """Logs in an existing user."""
-    create_user_table() # Ensure table exists before login attempt
-    hashed_password = hash_password(password)
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE username = ? AND password_hash = ?", (username, hashed_password))
-    user = cursor.fetchone()
-    conn.close()
-    return user is not None # Returns True if user exists and password matches
+    """Logs in an existing user. Legacy SHA-256 hashes are upgraded to scrypt on a successful login."""
+    conn = connect_to_users_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT password_hash FROM users WHERE username = ?", (username,))
+        user = cursor.fetchone()
+    finally:
+        conn.close() # Return the connection to the pool
+    if user is None:
+        run_password_hash(verify_password, password, DUMMY_PASSWORD_HASH) # Same scrypt cost as a wrong password
+        return False
+    matches, needs_rehash = run_password_hash(verify_password, password, user[0])
+    if matches and needs_rehash:
+        new_hash = run_password_hash(hash_password, password)
+        conn = connect_to_users_db()
+        try:
+            conn.execute("UPDATE users SET password_hash = ? WHERE username = ? AND password_hash = ?", (new_hash, username, user[0]))
+            conn.commit()
+        finally:
+            conn.close()
+    return matches # Returns True if user exists and password matches
+
+
+def _sign_session_payload(payload):
+    return hmac.new(SESSION_SECRET_KEY, payload.encode("utf-8"), hashlib.sha256).hexdigest()
+
+_verified_tokens = OrderedDict() # token -> (username, expires_at)
+_verified_tokens_lock = threading.Lock()
+
+def create_session_token(username, ttl_seconds=SESSION_TTL_SECONDS):
+    """Issues a signed session token "token_id.expires_at.signature" and records it in the sessions table."""
+    token_id = secrets.token_urlsafe(16)
+    now = time.time()
+    expires_at = int(now + ttl_seconds)
+    payload = f"{token_id}.{expires_at}"
+    token = f"{payload}.{_sign_session_payload(payload)}"
+    conn = connect_to_users_db()
+    try:
+        conn.execute("INSERT INTO sessions (token_id, username, created_at, expires_at) VALUES (?, ?, ?, ?)", (token_id, username, now, expires_at))
+        conn.commit()
+    finally:
+        conn.close()
+    _remember_verified_token(token, username, expires_at)
+    return token
+
+def _remember_verified_token(token, username, expires_at):
+    with _verified_tokens_lock:
+        _verified_tokens[token] = (username, expires_at)
+        _verified_tokens.move_to_end(token)
+        while len(_verified_tokens) > SESSION_TOKEN_CACHE_SIZE:
+            _verified_tokens.popitem(last=False)
+
+def verify_session_token(token):
+    """
+    Returns the username for a valid, unexpired session token, or None.
+
+    Tokens seen before are answered from memory; otherwise the signature and expiry are checked
+    before a single primary-key lookup confirms the session has not been revoked.
+    """
+    if not token:
+        return None
+    now = time.time()
+    with _verified_tokens_lock:
+        cached = _verified_tokens.get(token)
+        if cached is not None:
+            if cached[1] > now:
+                _verified_tokens.move_to_end(token)
+                return cached[0]
+            del _verified_tokens[token]
+            return None
+    try:
+        token_id, expires_at, signature = token.split(".")
+        expires_at = int(expires_at)
+    except ValueError:
+        return None
+    if expires_at <= now or not hmac.compare_digest(_sign_session_payload(f"{token_id}.{expires_at}"), signature):
+        return None # Forged, tampered or expired tokens never reach the database
+    conn = connect_to_users_db()
+    try:
+        row = conn.execute("SELECT username FROM sessions WHERE token_id = ? AND expires_at > ?", (token_id, now)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    _remember_verified_token(token, row[0], expires_at)
+    return row[0]
+
+def revoke_session_token(token):
+    """Ends a session (logout): forgets the token and deletes its row, along with any expired sessions."""
+    with _verified_tokens_lock:
+        _verified_tokens.pop(token, None)
+    conn = connect_to_users_db()
+    try:
+        conn.execute("DELETE FROM sessions WHERE token_id = ? OR expires_at <= ?", (str(token).split(".")[0], time.time()))
+        conn.commit()
+    finally:
+        conn.close()
+
+def _set_session_cookie(token):
+    """
+    Writes (or, for an empty token, deletes) the session cookie in the browser.
+
+    Streamlit has no API for setting cookies, so a small script does it; the cookie is read back
+    through st.context.cookies when the next browser session connects.
+    """
+    max_age = SESSION_TTL_SECONDS if token else 0
+    st.html(f"""<script>
+        document.cookie = {json.dumps(SESSION_COOKIE_NAME)} + "=" + {json.dumps(token)} +
+            "; Path=/; Max-Age={max_age}; SameSite=Strict" + (location.protocol === "https:" ? "; Secure" : "");
+    </script>""", unsafe_allow_javascript=True)
+
+def start_session(username):
+    """Marks username as logged in and issues a session token for the cookie written on the next run."""
+    token = create_session_token(username)
+    st.session_state['authentication_status'] = True
+    st.session_state['name'] = username
+    st.session_state['session_token'] = token
+    st.session_state['session_cookie_update'] = token # Written by restore_session, after the rerun that follows login
+
+def restore_session():
+    """
+    Logs the browser session back in from the session cookie, e.g. after a refresh.
+
+    Also writes any pending cookie change from a login or logout; this runs at the top of every
+    script run, so the update is not lost to the st.rerun() that ends those actions.
+
+    Returns True if the session is authenticated afterwards.
+    """
+    if LEGACY_SESSION_QUERY_PARAM in st.query_params:
+        del st.query_params[LEGACY_SESSION_QUERY_PARAM] # Keep old bookmarked tokens out of browser history
+    cookie_update = st.session_state.pop('session_cookie_update', None)
+    if cookie_update is not None:
+        _set_session_cookie(cookie_update)
+    if st.session_state.get('authentication_status'):
+        return True
+    if cookie_update == "":
+        return False # Just logged out; the cookie this browser session connected with is stale
+    token = st.context.cookies.get(SESSION_COOKIE_NAME)
+    username = verify_session_token(token)
+    if username is None:
+        return False
+    st.session_state['authentication_status'] = True
+    st.session_state['name'] = username
+    st.session_state['session_token'] = token
+    return True
+
+def logout():
+    """Revokes the current session token, deletes the session cookie and clears the login from session state."""
+    token = st.session_state.pop('session_token', None)
+    if token:
+        revoke_session_token(token)
+    st.session_state['session_cookie_update'] = "" # Deleted by restore_session on the next run
+    st.session_state['authentication_status'] = False # Clear auth status
+    st.session_state['name'] = None # Clear username
 
 def auth_page(): # Renamed to auth_page and made it a function
     st.title("User Authentication")
@@ -71,7 +307,12 @@ def authenticator(): # Moved authenticator logic into its own function
         new_username = st.text_input("Username")
         new_password = st.text_input("Password", type="password")
         if st.button("Register"):
-            if register_user(new_username, new_password):
+            try:
+                registered = register_user(new_username, new_password)
+            except TimeoutError:
+                st.error("The server is busy. Please try again in a moment.")
+                return
+            if registered:
                 st.success("Registration successful. Please log in.")
             else:
                 st.error("Username already exists. Please choose another.")
@@ -81,10 +322,14 @@ def authenticator(): # Moved authenticator logic into its own function
         username = st.text_input("Username")
         password = st.text_input("Password", type="password")
         if st.button("Login"):
-            if login_user(username, password):
+            try:
+                logged_in = login_user(username, password)
+            except TimeoutError:
+                st.error("The server is busy. Please try again in a moment.")
+                return
+            if logged_in:
                 st.success(f"Logged in as {username}")
-                st.session_state['authentication_status'] = True # Set session state on successful login
-                st.session_state['name'] = username # Store username in session state
+                start_session(username) # Set session state; the session cookie lets a browser refresh skip the login
                 st.rerun() # Rerun to update UI
             else:
                 st.error("Login failed. Incorrect username or password.")
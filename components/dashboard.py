@@ -1,6 +1,17 @@
 import streamlit as st
-from backend.database import connect_to_sqlite, fetch_roadmap_sqlite, fetch_career_goals_for_user_sqlite, update_checkbox_states_sqlite  # Updated imports
+from backend.database import connect_to_sqlite, fetch_roadmap_json_sqlite, fetch_roadmap_version_sqlite, fetch_progress_sqlite, fetch_career_goals_for_user_sqlite, fetch_progress_summary_sqlite, search_plans_sqlite  # Updated imports
+from backend.roadmap_model import get_compiled_roadmap
 from components.roadmap_display import display_roadmap_with_checkboxes # Import display_roadmap_with_checkboxes
+from backend.progress_writer import get_progress_writer
+from backend.instrumentation import log_debug
+from backend.job_queue import (ACTIVE_JOB_STATUSES, JOB_FAILED, JOB_KIND_EXTEND_TIMELINE, JOB_KIND_REGENERATE_DURATION, JOB_QUEUED, fetch_job,
+                               get_job_worker_pool, submit_plan_edit_job)
+from backend.roadmap_format import parse_duration_label
+from components.home import polling_fragment
+
+MAX_TIMELINE_MONTHS = 36 # Upper bound offered when extending a plan
+CAREER_GOAL_SELECT_KEY = "dashboard-career-goal"
+PLAN_EDIT_JOB_KEY = "plan_edit_job_id" # Session state key of the plan edit this session submitted last
 
 def dashboard_page():
     if 'name' not in st.session_state:
@@ -10,35 +21,52 @@ def dashboard_page():
     st.title("Goal Monitoring Dashboard")
     st.write("Track your progress and stay motivated on your career path!")
 
-    sqlite_conn = connect_to_sqlite()
+    user_id = st.session_state['name']
+    sqlite_conn = connect_to_sqlite(user_id) # The user's shard
     if sqlite_conn:
-        user_id = st.session_state['name']
-        career_goals = fetch_career_goals_for_user_sqlite(sqlite_conn, user_id)
-        selected_career_goal = None
+        plan_to_edit = None
+        try:
+            career_goals = fetch_career_goals_for_user_sqlite(sqlite_conn, user_id)
+            selected_career_goal = None
+
+            if career_goals:
+                if not career_goals:
+                    st.info(f"No career plans generated yet for user: {user_id}.")
+                    return
+
+                display_progress_summary(fetch_progress_summary_sqlite(sqlite_conn, user_id))
 
-        if career_goals:
-            if not career_goals:
-                st.info(f"No career plans generated yet for user: {user_id}.")
-                return
+                render_plan_search(sqlite_conn, user_id)
 
-            selected_career_goal = st.selectbox("Select Career Goal to Monitor:", career_goals)
+                selected_career_goal = st.selectbox("Select Career Goal to Monitor:", career_goals, key=CAREER_GOAL_SELECT_KEY)
 
-            if selected_career_goal:
-                print(f"\n--- Dashboard: Fetching roadmap for user: {user_id}, Career Goal: {selected_career_goal} (SQLite) ---")
-                roadmap_json, checkbox_states = fetch_roadmap_sqlite(sqlite_conn, user_id, selected_career_goal) # Fetch roadmap AND checkbox_states
+                if selected_career_goal:
+                    log_debug("Dashboard: fetching roadmap for user: %s, career goal: %s", user_id, selected_career_goal)
+                    version = fetch_roadmap_version_sqlite(sqlite_conn, user_id, selected_career_goal)
+                    compiled_roadmap = None
+                    if version is not None: # Compiled once per plan version; reruns skip the JSON parse entirely
+                        compiled_roadmap = get_compiled_roadmap(user_id, selected_career_goal, version,
+                                                                lambda: fetch_roadmap_json_sqlite(sqlite_conn, user_id, selected_career_goal))
 
-                if roadmap_json:
-                    st.success(f"Roadmap retrieved for user: {user_id}, Goal: {selected_career_goal}")
-                    st.subheader(f"Your Career Roadmap: {selected_career_goal}")
-                    display_roadmap_with_checkboxes(roadmap_json, checkbox_states, user_id, selected_career_goal) # Call display_roadmap_with_checkboxes with states and db info
+                    if compiled_roadmap is not None:
+                        checkbox_states = fetch_progress_sqlite(sqlite_conn, user_id, selected_career_goal)
+                        checkbox_states.update(get_progress_writer().pending_for(user_id, selected_career_goal, version)) # Toggles not yet flushed to disk
+                        st.success(f"Roadmap retrieved for user: {user_id}, Goal: {selected_career_goal}")
+                        st.subheader(f"Your Career Roadmap: {selected_career_goal}")
+                        display_roadmap_with_checkboxes(None, checkbox_states, user_id, selected_career_goal,
+                                                        compiled_roadmap=compiled_roadmap, version=version) # Call display_roadmap_with_checkboxes with states and db info
+                        plan_to_edit = (selected_career_goal, compiled_roadmap, version)
+                    else:
+                        st.info(f"No roadmap found for user: {user_id} with goal: {selected_career_goal}.")
                 else:
-                    st.info(f"No roadmap found for user: {user_id} with goal: {selected_career_goal}.")
+                    st.info("Please select a career goal to view the roadmap.")
             else:
-                st.info("Please select a career goal to view the roadmap.")
-        else:
-            st.error("Failed to fetch career goals for user. No career plans found in SQLite database.")
-        sqlite_conn.close()
+                st.error("Failed to fetch career goals for user. No career plans found in SQLite database.")
+        finally:
+            sqlite_conn.close() # Return the pooled connection even if rendering is interrupted
 
+        if plan_to_edit is not None: # Rendered after the connection went back to the pool: it polls edit jobs
+            render_plan_editor(user_id, *plan_to_edit)
 
         # Placeholder for roadmap checklist and progress tracking (we'll add this in Phase 4)
         st.subheader("Your Roadmap Progress (Persistent):") # Updated subheader
@@ -49,5 +77,97 @@ def dashboard_page():
         st.error("Check console for SQLite connection errors.")
 
 
+def render_plan_editor(user_id, career_goal, compiled_roadmap, version):
+    """
+    Regenerate one duration or extend the timeline of a plan, keeping progress on unchanged items.
+
+    Edits run as jobs on the background worker pool; this script thread only submits and polls them.
+    """
+    with st.expander("Edit this plan", expanded=PLAN_EDIT_JOB_KEY in st.session_state):
+        job_id = st.session_state.get(PLAN_EDIT_JOB_KEY)
+        job = fetch_job(job_id) if job_id else None
+        if job is not None and job["user_id"] == user_id and job["career_goal"] == career_goal:
+            if job["status"] in ACTIVE_JOB_STATUSES:
+                get_job_worker_pool() # Jobs left queued by a restarted server need this process's workers
+                render_plan_edit_progress(job["job_id"])
+                return # One edit at a time: the next one applies to the version this one saves
+            del st.session_state[PLAN_EDIT_JOB_KEY] # Finished; the page already shows the new version
+            if job["status"] == JOB_FAILED:
+                st.error(job["error"] or "Could not edit this plan. Please try again.")
+
+        duration_months = [parse_duration_label(duration) for duration in compiled_roadmap.durations]
+        if not duration_months or None in duration_months: # Editing prompts carry the plan's outline, which needs every label in months
+            st.info("This plan's durations are not labelled by month, so it cannot be edited here.")
+            return
+        last_duration = duration_months[-1]
+
+        duration = st.selectbox("Duration to regenerate:", compiled_roadmap.durations, key=f"regenerate-duration-{career_goal}")
+        if st.button("Regenerate this duration", key=f"regenerate-{career_goal}-{version}"):
+            st.session_state[PLAN_EDIT_JOB_KEY] = submit_plan_edit_job(user_id, career_goal, JOB_KIND_REGENERATE_DURATION, duration=duration)
+            st.rerun() # Show the edit's progress instead of the form
+
+        current_timeline = last_duration[1]
+        if current_timeline < MAX_TIMELINE_MONTHS:
+            new_timeline = st.number_input("Extend timeline to (months):", min_value=current_timeline + 1, max_value=MAX_TIMELINE_MONTHS,
+                                           value=current_timeline + 1, key=f"extend-timeline-{career_goal}")
+            if st.button("Extend timeline", key=f"extend-{career_goal}-{version}"):
+                st.session_state[PLAN_EDIT_JOB_KEY] = submit_plan_edit_job(user_id, career_goal, JOB_KIND_EXTEND_TIMELINE, new_timeline=int(new_timeline))
+                st.rerun()
+
+
+@polling_fragment
+def render_plan_edit_progress(job_id):
+    """Shows a queued or running plan edit without blocking the page; reruns the page once it has finished."""
+    job = fetch_job(job_id)
+    if job is None or job["status"] not in ACTIVE_JOB_STATUSES:
+        st.rerun() # Finished: show the new version (progress on unchanged items is carried over) or the error
+    if job["status"] == JOB_QUEUED:
+        st.info("Waiting for a free roadmap generator...")
+    elif job["kind"] == JOB_KIND_REGENERATE_DURATION:
+        st.info(f"Regenerating {job['generation_inputs']['duration']}...")
+    else:
+        st.info(f"Extending the timeline to {job['generation_inputs']['new_timeline']} months...")
+    if not getattr(st, "fragment", None):
+        st.button("Refresh", key=f"refresh-plan-edit-{job_id}")
+
+
+def render_plan_search(sqlite_conn, user_id):
+    """Search box over all of the user's plans; each matching plan can be opened below."""
+    query = st.text_input("Search your plans:", placeholder="e.g. Docker, statistics, Coursera", key="plan-search")
+    if not query:
+        return
+    hits = search_plans_sqlite(sqlite_conn, user_id, query)
+    if not hits:
+        st.info(f"No topics, sub-topics or resources match '{query}'.")
+        return
+    hits_by_goal = {}
+    for career_goal, duration, topic, item in hits: # Hits arrive best match first; keep that order per goal
+        hits_by_goal.setdefault(career_goal, []).append((duration, topic, item))
+    for career_goal, goal_hits in hits_by_goal.items():
+        st.markdown(f"**{career_goal}**")
+        st.markdown("\n".join(f"- {duration} · {topic}: {item}" for duration, topic, item in goal_hits))
+        st.button(f"Open {career_goal}", key=f"open-search-hit-{career_goal}", on_click=open_career_goal, args=(career_goal,))
+
+
+def open_career_goal(career_goal):
+    # Runs before the rerun renders the selectbox, so its value can still be set
+    st.session_state[CAREER_GOAL_SELECT_KEY] = career_goal
+
+
+def display_progress_summary(progress_summary):
+    """
+    Shows overall completion for every career goal of the user.
+
+    Rendered from the persisted per-duration counters only (no roadmap JSON is loaded),
+    so it can trail the most recent toggles by up to one progress-writer flush interval.
+    """
+    if not progress_summary:
+        return
+    st.subheader("Progress Across Your Career Goals")
+    for career_goal, completed, total in progress_summary:
+        completed, total = completed or 0, total or 0
+        st.progress(completed / total if total else 0.0, text=f"{career_goal}: {completed}/{total} completed")
+
+
 if __name__ == "__main__":
     dashboard_page()
\ No newline at end of file
@@ -1,6 +1,11 @@
 import streamlit as st
-from backend.ai_agent import generate_career_roadmap
-from backend.database import connect_to_sqlite, store_roadmap_sqlite # Updated imports
+from backend.job_queue import (ACTIVE_JOB_STATUSES, DUPLICATE_PLAN_ERROR, JOB_DONE, JOB_QUEUED, fetch_active_job_for_user, fetch_job,
+                               get_job_worker_pool, plan_exists, submit_generation_job)
+from backend.roadmap_model import compile_roadmap
+from components.roadmap_display import render_duration_topics
+
+GENERATION_JOB_KEY = "generation_job_id" # Session state key of the job this session submitted last
+JOB_POLL_SECONDS = 1.0 # How often the page checks on a running generation
 
 def home_page():
     if 'name' not in st.session_state: # Check if username is in session state
@@ -24,61 +29,70 @@ def home_page():
 
         generate_plan_button = st.form_submit_button("Generate Career Plan")
 
+    user_id = st.session_state['name'] # Use username from session state as user_id
     if generate_plan_button:
-        with st.spinner("Generating your personalized career roadmap..."):
-            roadmap_json = generate_career_roadmap(education_status, career_goal, resources_available, timeline)
-
-        if roadmap_json:
-            st.success("Career roadmap generated successfully!")
-
-            # --- SQLite Database Integration ---
-            sqlite_conn = connect_to_sqlite() # Connect to SQLite
-            if sqlite_conn:
-                user_id = st.session_state['name']  # Use username from session state as user_id
-                if store_roadmap_sqlite(sqlite_conn, user_id, career_goal, roadmap_json): # Store in SQLite
-                    st.success("Roadmap saved to database for tracking!")
-                else:
-                    st.error("Failed to save roadmap to database. Check console for database errors.")
-                sqlite_conn.close() # Close SQLite connection
-            else:
-                st.error("Database connection failed. Roadmap not saved.")
-                st.error("Check console for SQLite connection errors.")
-
-
-            # --- Display Roadmap with Expanders ---
-            st.subheader("Your Career Roadmap:")
-            if "timeline" in roadmap_json and roadmap_json["timeline"]: # Check if timeline data exists
-                timeline_data = roadmap_json["timeline"]
-                for duration, duration_content in timeline_data.items(): # Iterate through months/durations
-                    with st.expander(f"**{duration}**", expanded=False): # Expander for each duration
-                        for topic, sub_topics in duration_content.items(): # Iterate through topics within duration
-                            if topic != "Resources": # Handle Resources separately
-                                st.markdown(f"**{topic}:**") # Topic as bold text
-                                if isinstance(sub_topics, list): # Check if sub_topics is a list
-                                    for sub_topic in sub_topics:
-                                        st.markdown(f"- {sub_topic}") # Sub-topics as bullet points
-                                elif isinstance(sub_topics, dict): # Handle nested topics if structure changes
-                                    for sub_topic_group, sub_topic_list in sub_topics.items():
-                                        st.markdown(f"  - **{sub_topic_group}:**") # Sub-topic group (if needed)
-                                        for sub_item in sub_topic_list:
-                                            st.markdown(f"- {sub_item}") # Sub-items
-                            elif topic == "Resources": # Display Resources
-                                if isinstance(sub_topics, list):
-                                    st.markdown("**Resources:**")
-                                    for resource in sub_topics:
-                                        st.markdown(f"- {resource}")
-                                elif isinstance(sub_topics, dict): # Handle resources as dict if needed
-                                    st.markdown("**Resources:**")
-                                    for resource_type, resource_list in sub_topics.items():
-                                        st.markdown(f"  - **{resource_type}:**")
-                                        for resource_item in resource_list:
-                                            st.markdown(f"- {resource_item}")
-            else:
-                st.warning("No roadmap timeline data found in the generated plan.") # Message if timeline is missing
-
+        if not career_goal.strip():
+            st.error("Please enter a career goal.")
+        elif plan_exists(user_id, career_goal):
+            st.error(DUPLICATE_PLAN_ERROR) # Checked before submitting: the job could not store the plan anyway
+        else:
+            # Generation runs on a background worker; this script thread only submits and polls
+            st.session_state[GENERATION_JOB_KEY] = submit_generation_job(user_id, career_goal, education_status, resources_available, timeline)
 
+    job_id = st.session_state.get(GENERATION_JOB_KEY)
+    job = fetch_job(job_id) if job_id else fetch_active_job_for_user(user_id) # Pick a running job back up after navigating away
+    if job is not None and job["user_id"] == user_id:
+        st.subheader("Your Career Roadmap:")
+        if job["status"] in ACTIVE_JOB_STATUSES:
+            get_job_worker_pool() # Jobs left queued by a restarted server need this process's workers
+            render_job_progress(job["job_id"])
         else:
-            st.error("Failed to generate career roadmap. Please check the console for errors.")
+            render_job_result(job)
+
+
+def polling_fragment(func):
+    """Reruns just the decorated function every JOB_POLL_SECONDS (plain function on Streamlit without fragments)."""
+    fragment = getattr(st, "fragment", None)
+    return fragment(run_every=JOB_POLL_SECONDS)(func) if fragment else func
+
+
+@polling_fragment
+def render_job_progress(job_id):
+    """Shows a queued or running generation and the durations streamed so far, without blocking the page."""
+    job = fetch_job(job_id)
+    if job is None or job["status"] not in ACTIVE_JOB_STATUSES:
+        st.rerun() # Finished: render the final result once, outside the polling fragment
+    if job["status"] == JOB_QUEUED:
+        st.info("Waiting for a free roadmap generator...")
+    else:
+        st.info(f"Generating your personalized career roadmap... ({len(job['timeline'])} durations so far)")
+    for duration, duration_content in job["timeline"].items():
+        render_duration(duration, duration_content) # Render each duration as soon as it has streamed in
+    if not getattr(st, "fragment", None):
+        st.button("Refresh", key=f"refresh-job-{job_id}")
+
+
+def render_job_result(job):
+    """Shows a finished generation: the roadmap and whether it was saved, or why it failed."""
+    for duration, duration_content in job["timeline"].items():
+        render_duration(duration, duration_content)
+    if job["status"] == JOB_DONE:
+        st.success("Career roadmap generated successfully!")
+        st.success("Roadmap saved to database for tracking!")
+    elif job["error"]:
+        st.error(job["error"])
+    else:
+        st.error("Failed to generate career roadmap. Please check the console for errors.")
+
+
+def render_duration(duration, duration_content):
+    """Renders one timeline duration (topics, sub-topics and resources) inside an expander."""
+    compiled = compile_roadmap({"timeline": {duration: duration_content}}) # Flat view of just this duration
+    with st.expander(f"**{duration}**", expanded=False): # Expander for each duration
+        if not compiled.durations:
+            st.markdown(f"- {duration_content}") # Unexpected shape, show it as-is
+            return
+        render_duration_topics(compiled, 0, lambda item_id, text: st.markdown(f"- {text}")) # Sub-topics as bullet points
 
 if __name__ == "__main__":
     home_page()
\ No newline at end of file
@@ -1,91 +1,135 @@
 import streamlit as st
-from backend.database import update_checkbox_states_sqlite, connect_to_sqlite  # Import connect_to_sqlite
+from backend.progress_writer import get_progress_writer
+from backend.roadmap_model import compile_roadmap, plan_key_prefix
+from backend.instrumentation import log_debug
 
-def display_roadmap_with_checkboxes(roadmap_json, checkbox_states, user_id, career_goal):
+DURATIONS_PER_PAGE = 6 # Durations listed per page in windowed mode
+
+# Fragments rerun only their own section on a widget interaction (st.fragment since Streamlit 1.37)
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+def display_roadmap_with_checkboxes(roadmap_json, checkbox_states, user_id, career_goal, compiled_roadmap=None, version=1, windowed=True):
     """
-    Parses and displays the career roadmap JSON with checkboxes for progress tracking, persisting state in SQLite.
+    Displays the career roadmap with checkboxes for progress tracking, persisting state in SQLite.
+
+    Rendering is a single pass over the compiled (flat) roadmap; progress totals come from the
+    stored checkbox states and the precomputed per-duration totals.
+
+    In windowed mode (the default) the timeline is paginated and a duration's checkboxes are only
+    created once the user opens it. Each opened duration is rendered in its own fragment, so a
+    toggle reruns that section instead of the whole page; the overall progress bar catches up on
+    the next full rerun.
 
     Args:
-        roadmap_json (dict): The JSON-like dictionary representing the career roadmap.
-        checkbox_states (dict): Dictionary of checkbox states loaded from database.
+        roadmap_json (dict): The JSON-like dictionary representing the career roadmap. Ignored if compiled_roadmap is given.
+        checkbox_states (dict): {item_id: checked} loaded from the database.
         user_id (str): User identifier.
         career_goal (str): Career goal for the roadmap.
+        compiled_roadmap (CompiledRoadmap): Pre-compiled roadmap, e.g. from get_compiled_roadmap.
+        version (int): Plan version, used to keep widget keys unique per plan.
+        windowed (bool): Lazy, paginated rendering. False renders every duration in an expander.
     """
     st.subheader("Your Career Roadmap:")
-    if "timeline" in roadmap_json and roadmap_json["timeline"]:
-        timeline_data = roadmap_json["timeline"]
-        total_sub_topics = 0
-        completed_sub_topics = 0
+    compiled = compiled_roadmap if compiled_roadmap is not None else compile_roadmap(roadmap_json)
+    if not compiled.durations:
+        st.warning("No roadmap timeline data found in the generated plan.")
+        return
 
-        # Initialize checkbox states from fetched checkbox_states dictionary
-        # st.session_state['checkbox_states'] = checkbox_states # No longer needed to initialize here, passed directly
+    key_prefix = plan_key_prefix(user_id, career_goal, version)
+    completed_by_duration = compiled.completed_by_duration(checkbox_states)
 
-        for duration, duration_content in timeline_data.items():
+    if windowed:
+        for duration_index in duration_window(compiled, key_prefix):
+            duration = compiled.durations[duration_index]
+            duration_total = compiled.duration_totals[duration_index]
+            # Fixed label: Streamlit derives the widget id from it, so a live count would reset (close) the toggle
+            opened = st.toggle(f"**{duration}**", key=f"{key_prefix}-open-{duration_index}")
+            if duration_total:
+                st.caption(f"{completed_by_duration[duration_index]}/{duration_total} completed")
+            if opened:
+                render_duration_section(compiled, duration_index, checkbox_states, user_id, career_goal, key_prefix, version)
+    else:
+        for duration_index, duration in enumerate(compiled.durations):
             with st.expander(f"**{duration}**", expanded=False):
-                for topic, sub_topics in duration_content.items():
-                    if isinstance(sub_topics, list):
-                        st.markdown(f"**{topic}:**")
-                        for sub_topic in sub_topics:
-                            total_sub_topics += 1
-                            checkbox_id = f"{duration}-{topic}-{sub_topic}-checkbox" # More specific checkbox_id
-                            # Use fetched checkbox_states to initialize checkbox value
-                            checked = st.checkbox(sub_topic, key=checkbox_id, value=checkbox_states.get(checkbox_id, False), on_change=update_progress_db, args=(user_id, career_goal, checkbox_id)) # Pass update function and args
-                            # No longer updating session state directly here - update happens in update_progress_db callback
-                            if checked:
-                                completed_sub_topics += 1
-                    elif isinstance(sub_topics, dict):
-                        st.markdown(f"**{topic}:**")
-                        for sub_topic_group, sub_topic_list in sub_topics.items():
-                            st.markdown(f"  - **{sub_topic_group}:**")
-                            for sub_item in sub_topic_list:
-                                total_sub_topics += 1
-                                checkbox_id = f"{duration}-{topic}-{sub_topic_group}-{sub_item}-checkbox" # More specific checkbox_id
-                                checked = st.checkbox(sub_item, key=checkbox_id, value=checkbox_states.get(checkbox_id, False), on_change=update_progress_db,  args=(user_id, career_goal, checkbox_id)) # Pass update function and args
-                                if checked:
-                                    completed_sub_topics += 1
-                    elif topic == "Resources":
-                        if isinstance(sub_topics, list):
-                            st.markdown("**Resources:**")
-                            for resource in sub_topics:
-                                st.markdown(f"- {resource}")
-                        elif isinstance(sub_topics, dict):
-                            st.markdown("**Resources:**")
-                            for resource_type, resource_list in sub_topics.items():
-                                st.markdown(f"  - **{resource_type}:**")
-                                for resource_item in resource_list:
-                                    st.markdown(f"    - {resource_item}")
-
-        if total_sub_topics > 0:
-            progress_percentage = (completed_sub_topics / total_sub_topics)
-            st.subheader(f"Progress: {completed_sub_topics}/{total_sub_topics} Sub-topics Completed ({progress_percentage*100:.2f}%)")
-            st.progress(progress_percentage)
-        else:
-            st.info("No trackable sub-topics found in the roadmap.")
+                render_duration_checkboxes(compiled, duration_index, checkbox_states, user_id, career_goal, key_prefix, version)
+
+    total_sub_topics = compiled.total_items
+    if total_sub_topics > 0:
+        completed_sub_topics = sum(completed_by_duration)
+        progress_percentage = (completed_sub_topics / total_sub_topics)
+        st.subheader(f"Progress: {completed_sub_topics}/{total_sub_topics} Sub-topics Completed ({progress_percentage*100:.2f}%)")
+        st.progress(progress_percentage)
     else:
-        st.warning("No roadmap timeline data found in the generated plan.")
+        st.info("No trackable sub-topics found in the roadmap.")
 
 
-def update_progress_db(user_id, career_goal, checkbox_id):
-    """Callback function to update checkbox state in SQLite database. Establishes its own DB connection."""
-    checkbox_state = st.session_state.get(checkbox_id, False)
-    print(f"--- update_progress_db: Checkbox '{checkbox_id}' state changed to: {checkbox_state} ---")
+def duration_window(compiled, key_prefix, page_size=DURATIONS_PER_PAGE):
+    """Shows a page picker for long timelines and returns the range of duration indexes on the selected page."""
+    duration_count = len(compiled.durations)
+    if duration_count <= page_size:
+        return range(duration_count)
+    page_starts = range(0, duration_count, page_size)
+    page_start = st.selectbox("Timeline page:", page_starts, key=f"{key_prefix}-page",
+                              format_func=lambda start: f"{compiled.durations[start]} – {compiled.durations[min(start + page_size, duration_count) - 1]}")
+    return range(page_start, min(page_start + page_size, duration_count))
 
-    sqlite_conn = connect_to_sqlite() # Establish NEW SQLite connection WITHIN the callback function
-    if sqlite_conn:
-        current_checkbox_states = fetch_checkbox_states_from_session_state() # Get all checkbox states from session state
-        update_checkbox_states_sqlite(sqlite_conn, user_id, career_goal, current_checkbox_states) # Update DB with all states
-        print(f"--- update_progress_db: Checkbox state updated in database for: {checkbox_id} ---")
-        sqlite_conn.close() # Close DB connection after update
-    else:
-        print("--- update_progress_db: Warning - Database connection failed. Checkbox state not saved. ---")
-
-def fetch_checkbox_states_from_session_state():
-    """Helper function to fetch all checkbox states from session state."""
-    checkbox_states = {}
-    for key, value in st.session_state.items():
-        if key.endswith("-checkbox"): # Identify checkbox keys (more robust by checking for suffix)
-            checkbox_states[key] = value
-    return checkbox_states
+
+@_fragment
+def render_duration_section(compiled, duration_index, checkbox_states, user_id, career_goal, key_prefix, version):
+    """One opened duration in windowed mode; a toggle in here reruns only this fragment."""
+    with st.container(border=True):
+        render_duration_checkboxes(compiled, duration_index, checkbox_states, user_id, career_goal, key_prefix, version)
+
+
+def render_duration_checkboxes(compiled, duration_index, checkbox_states, user_id, career_goal, key_prefix, version):
+    """Renders the checkboxes of one duration plus its "mark all as done" button; toggles are queued for this plan version."""
+    def render_checkbox(item_id, text):
+        checkbox_key = f"{key_prefix}-{item_id}" # Short, stable key: plan prefix + compact item id
+        initial_value = {} if checkbox_key in st.session_state else {"value": checkbox_states.get(item_id, False)}
+        st.checkbox(text, key=checkbox_key, on_change=update_progress_db,
+                    args=(user_id, career_goal, checkbox_key, item_id, duration_index, version), **initial_value)
+
+    render_duration_topics(compiled, duration_index, render_checkbox)
+    if compiled.duration_totals[duration_index]:
+        duration = compiled.durations[duration_index]
+        st.button(f"Mark all of {duration} as done", key=f"{key_prefix}-mark-done-{duration_index}", on_click=mark_items_done,
+                  args=(user_id, career_goal, key_prefix, duration_index, list(compiled.duration_item_range(duration_index)), version))
+
+
+def render_duration_topics(compiled, duration_index, render_item):
+    """
+    Renders the topics of one duration of a compiled roadmap.
+
+    Args:
+        compiled (CompiledRoadmap): The compiled roadmap.
+        duration_index (int): Index into compiled.durations.
+        render_item (callable): render_item(item_id, text) draws a single sub-topic (checkbox, bullet, ...).
+    """
+    for topic_index in compiled.topic_range(duration_index):
+        items = compiled.item_range(topic_index)
+        if not items:
+            continue
+        st.markdown(f"**{compiled.topics[topic_index]}:**")
+        current_group = None
+        for item_id in items:
+            group = compiled.item_groups[item_id]
+            if group is not None and group != current_group:
+                st.markdown(f"  - **{group}:**") # Sub-topic group of a dict-shaped topic
+                current_group = group
+            render_item(item_id, compiled.item_texts[item_id])
+
+
+def update_progress_db(user_id, career_goal, checkbox_key, item_id, duration_index, version=None):
+    """Callback function to queue a checkbox toggle on the write-behind progress writer (no disk I/O on the rerun)."""
+    checkbox_state = st.session_state.get(checkbox_key, False)
+    log_debug("update_progress_db: item %s of '%s' changed to: %s", item_id, career_goal, checkbox_state)
+    get_progress_writer().enqueue(user_id, career_goal, item_id, duration_index, checkbox_state, version) # Flushed in batches by a background thread
+
+def mark_items_done(user_id, career_goal, key_prefix, duration_index, item_ids, version=None):
+    """Callback for "mark whole month done": ticks every checkbox of a duration and queues them as one batch."""
+    for item_id in item_ids:
+        st.session_state[f"{key_prefix}-{item_id}"] = True # Set before the widgets are re-created on the rerun
+    get_progress_writer().enqueue_many(user_id, career_goal, duration_index, {item_id: True for item_id in item_ids}, version)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,12 @@
+import pytest
+
+from backend.connection_manager import close_all_pools
+
+
+@pytest.fixture
+def database_dir(tmp_path, monkeypatch):
+    """Runs a test against fresh database files in a temporary directory (the database names are relative)."""
+    close_all_pools()
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    close_all_pools()
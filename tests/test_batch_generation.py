@@ -0,0 +1,39 @@
+import asyncio
+import types
+
+import groq
+import httpx
+
+import backend.ai_agent as ai_agent
+import backend.instrumentation as instrumentation
+
+COMPLETION = '{"timeline":{"Month 1-2":{"SQL":["Joins"]}}}'
+
+
+def test_an_item_backing_off_does_not_hold_a_concurrency_slot(monkeypatch):
+    calls = []
+
+    async def create(messages, **kwargs):
+        career_goal = "Data Analyst" if "Data Analyst" in messages[0]["content"] else "BI Analyst"
+        calls.append(career_goal)
+        if calls == ["Data Analyst"]: # The first request fails once with a retryable error
+            raise groq.APIConnectionError(request=httpx.Request("POST", "https://api.groq.com"))
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=COMPLETION))], usage=None)
+
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+    monkeypatch.setattr(ai_agent, "get_async_groq_client", lambda: client)
+    monkeypatch.setattr(ai_agent, "_retry_delay", lambda error, attempt: 0.05)
+    registry = instrumentation.get_metrics_registry()
+    registry.reset()
+    monkeypatch.setattr(instrumentation, "TRACE_LEVEL", instrumentation.TRACE_LEVEL or instrumentation.TRACE_LEVELS["metrics"])
+    batch_inputs = [{"education_status": "Bachelor's Degree", "career_goal": career_goal, "resources_available": "", "timeline": 2}
+                    for career_goal in ("Data Analyst", "BI Analyst")]
+
+    results = asyncio.run(ai_agent.generate_career_roadmaps_batch(batch_inputs, max_concurrency=1, requests_per_minute=1000,
+                                                                      tokens_per_minute=1000000, use_cache=False))
+
+    assert calls == ["Data Analyst", "BI Analyst", "Data Analyst"] # The other item ran during the backoff
+    assert [result["attempts"] for result in results] == [2, 1]
+    assert all(result["roadmap"] == {"timeline": {"Month 1-2": {"SQL": ["Joins"]}}} for result in results)
+    queue_waits = [histogram for histogram in registry.to_dict()["histograms"] if histogram["name"] == "llm.queue_wait"]
+    assert [histogram["count"] for histogram in queue_waits] == [2] # Once per item, not per attempt
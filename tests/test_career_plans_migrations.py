@@ -0,0 +1,92 @@
+import json
+import sqlite3
+
+from backend.database import CAREER_PLANS_MIGRATIONS, fetch_duration_progress_sqlite, fetch_progress_sqlite, fetch_roadmap_json_sqlite
+from backend.migrations import apply_migrations, get_schema_version
+
+SHARED_ROADMAP = {"timeline": {
+    "Month 1-2": {"SQL": ["Joins", "Window functions"], "Resources": {"Books": ["SQL Cookbook"]}},
+    "Month 3-4": {"BI": ["Dashboards", "Storytelling"]},
+}}
+OWN_ROADMAP = {"timeline": {"Month 1": {"Python": ["Pandas", "NumPy"]}}}
+
+
+def _baseline_database(path):
+    """A career_plans database as the first release created it: global UNIQUE goal, progress in checkbox_states JSON."""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE career_plans_sqlite (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            career_goal TEXT NOT NULL UNIQUE,
+            roadmap_json TEXT NOT NULL,
+            checkbox_states TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, career_goal)
+        )
+    """)
+    conn.executemany("INSERT INTO career_plans_sqlite (user_id, career_goal, roadmap_json, checkbox_states) VALUES (?, ?, ?, ?)", [
+        ("ada", "Data Analyst", json.dumps(SHARED_ROADMAP), json.dumps({
+            "Month 1-2-SQL-Joins-checkbox": True,
+            "Month 1-2-SQL-Window functions-checkbox": False,
+            "Month 1-2-Resources-Books-SQL Cookbook-checkbox": True,
+            "Month 3-4-BI-Dashboards-checkbox": True,
+            "Month 9-BI-Removed topic-checkbox": True, # No longer in the roadmap: dropped
+        })),
+        ("bob", "BI Analyst", json.dumps(SHARED_ROADMAP), json.dumps({})),
+        ("bob", "Data Engineer", json.dumps(OWN_ROADMAP), None),
+    ])
+    conn.commit()
+    return conn
+
+
+def test_baseline_database_upgrades_to_the_current_schema(tmp_path):
+    conn = _baseline_database(tmp_path / "career_plans.db")
+    try:
+        assert apply_migrations(conn, CAREER_PLANS_MIGRATIONS) == [version for version, _, _ in CAREER_PLANS_MIGRATIONS]
+        assert get_schema_version(conn) == CAREER_PLANS_MIGRATIONS[-1][0]
+
+        # Migrations 3 and 5: legacy checkbox keys become per-item rows keyed by compact item id
+        assert fetch_progress_sqlite(conn, "ada", "Data Analyst") == {0: True, 1: False, 2: True, 3: True}
+        assert fetch_progress_sqlite(conn, "bob", "BI Analyst") == {}
+        assert conn.execute("SELECT COUNT(*) FROM career_plans_sqlite WHERE checkbox_states NOT IN ('', '{}')").fetchone()[0] == 0
+
+        # Migration 6: counters are backfilled and then kept current by the triggers
+        assert fetch_duration_progress_sqlite(conn, "ada", "Data Analyst") == [("Month 1-2", 2, 3), ("Month 3-4", 1, 2)]
+        assert fetch_duration_progress_sqlite(conn, "bob", "Data Engineer") == [("Month 1", 0, 2)]
+        with conn:
+            conn.execute("UPDATE plan_item_progress SET checked = 1 WHERE user_id = 'ada' AND career_goal = 'Data Analyst' AND item_id = 1")
+        assert fetch_duration_progress_sqlite(conn, "ada", "Data Analyst")[0] == ("Month 1-2", 3, 3)
+
+        # Migration 8: bodies live in shared blobs with exact refcounts, and the old column is gone
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(career_plans_sqlite)")]
+        assert "roadmap_json" not in columns
+        assert sorted(refcount for (refcount,) in conn.execute("SELECT refcount FROM roadmap_blobs")) == [1, 2]
+        assert fetch_roadmap_json_sqlite(conn, "bob", "BI Analyst") == SHARED_ROADMAP
+        assert fetch_roadmap_json_sqlite(conn, "bob", "Data Engineer") == OWN_ROADMAP
+        with conn:
+            conn.execute("DELETE FROM career_plans_sqlite WHERE user_id = 'bob' AND career_goal = 'BI Analyst'")
+        assert sorted(refcount for (refcount,) in conn.execute("SELECT refcount FROM roadmap_blobs")) == [1, 1]
+
+        statements = []
+        conn.set_trace_callback(statements.append)
+        assert apply_migrations(conn, CAREER_PLANS_MIGRATIONS) == [] # Already current
+        assert not any("BEGIN" in statement for statement in statements) # ...so no write lock is taken
+        conn.set_trace_callback(None)
+    finally:
+        conn.close()
+
+
+def test_plan_search_gets_its_user_id_index_from_migration_10_only(tmp_path):
+    conn = _baseline_database(tmp_path / "career_plans.db")
+    try:
+        def plan_search_sql():
+            return conn.execute("SELECT sql FROM sqlite_master WHERE name = 'plan_search'").fetchone()[0]
+
+        apply_migrations(conn, [migration for migration in CAREER_PLANS_MIGRATIONS if migration[0] <= 9])
+        assert "user_id UNINDEXED" in plan_search_sql()
+        assert apply_migrations(conn, CAREER_PLANS_MIGRATIONS) == [10]
+        assert "user_id UNINDEXED" not in plan_search_sql()
+        assert conn.execute("SELECT COUNT(*) FROM plan_search WHERE plan_search MATCH 'user_id : ada'").fetchone()[0] == 5
+    finally:
+        conn.close()
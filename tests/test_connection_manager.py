@@ -0,0 +1,67 @@
+import sqlite3
+import threading
+
+import pytest
+
+from backend.connection_manager import ConnectionPool
+
+
+def test_a_failing_initializer_closes_its_connection_and_runs_again_next_time(tmp_path):
+    attempts = []
+
+    def initializer(conn):
+        attempts.append(conn)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("database is locked")
+
+    pool = ConnectionPool(str(tmp_path / "plans.db"), max_connections=1, initializer=initializer)
+    with pytest.raises(sqlite3.OperationalError):
+        pool.acquire()
+    with pytest.raises(sqlite3.ProgrammingError): # Closed, not leaked
+        attempts[0].execute("SELECT 1")
+
+    conn = pool.acquire(timeout=1) # The failed connection's slot was given back
+    assert len(attempts) == 2
+    assert pool.stats()["open"] == 1
+    conn.close()
+    pool.close_all()
+
+
+def test_the_initializer_runs_outside_the_pool_lock(tmp_path):
+    initializing, finish = threading.Event(), threading.Event()
+
+    def initializer(conn):
+        initializing.set()
+        finish.wait(5)
+
+    pool = ConnectionPool(str(tmp_path / "plans.db"), initializer=initializer)
+    first = []
+    thread = threading.Thread(target=lambda: first.append(pool.acquire()))
+    thread.start()
+    assert initializing.wait(5)
+
+    stats = []
+    reader = threading.Thread(target=lambda: stats.append(pool.stats()))
+    reader.start()
+    reader.join(1)
+    assert stats and stats[0]["open"] == 0 # Not blocked behind the initializer
+    finish.set()
+    thread.join()
+    first[0].close()
+    pool.close_all()
+
+
+def test_connections_checked_out_during_close_all_are_closed_when_returned(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "plans.db"))
+    idle, in_use = pool.acquire(), pool.acquire()
+    idle.close()
+    pool.close_all()
+
+    in_use.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        in_use.execute("SELECT 1")
+    assert pool.stats()["idle"] == 0
+    conn = pool.acquire() # The pool still opens fresh connections afterwards
+    assert conn is not in_use
+    conn.close()
+    pool.close_all()
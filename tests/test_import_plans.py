@@ -0,0 +1,32 @@
+from backend.database import (connect_to_sqlite, fetch_progress_sqlite, fetch_roadmap_json_sqlite, fetch_roadmap_version_sqlite,
+                              import_plans_sqlite, store_roadmap_sqlite)
+from backend.progress_writer import ProgressWriter
+from backend.roadmap_model import get_compiled_roadmap
+
+OLD_ROADMAP = {"timeline": {"Month 1": {"SQL": ["Joins", "Window functions"]}}}
+NEW_ROADMAP = {"timeline": {"Month 1": {"Python": ["Pandas", "NumPy", "Matplotlib"]}}}
+
+
+def test_replace_import_bumps_the_version_past_the_overwritten_plan(database_dir):
+    conn = connect_to_sqlite()
+    try:
+        assert store_roadmap_sqlite(conn, "ada", "Data Analyst", OLD_ROADMAP)
+        old_compiled = get_compiled_roadmap("ada", "Data Analyst", 1, lambda: fetch_roadmap_json_sqlite(conn, "ada", "Data Analyst"))
+        writer = ProgressWriter(flush_interval=3600) # Only the explicit flush below writes
+        writer.enqueue("ada", "Data Analyst", 1, 0, True, version=1) # Pending toggle on "Window functions"
+
+        counts = import_plans_sqlite(conn, [{"user_id": "ada", "career_goal": "Data Analyst", "version": 1,
+                                             "progress": [[2, True]], "roadmap": NEW_ROADMAP}], on_conflict="replace")
+        assert counts == {"imported": 1, "skipped": 0, "replaced": 1}
+        version = fetch_roadmap_version_sqlite(conn, "ada", "Data Analyst")
+        assert version == 2
+
+        assert writer.flush() == 0 # The toggle belongs to the overwritten body
+        assert writer.stats()["stale_dropped"] == 1
+        assert fetch_progress_sqlite(conn, "ada", "Data Analyst") == {2: True}
+
+        compiled = get_compiled_roadmap("ada", "Data Analyst", version, lambda: fetch_roadmap_json_sqlite(conn, "ada", "Data Analyst"))
+        assert compiled is not old_compiled
+        assert compiled.item_texts == ["Pandas", "NumPy", "Matplotlib"]
+    finally:
+        conn.close()
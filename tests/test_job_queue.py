@@ -0,0 +1,107 @@
+import threading
+import types
+
+import pytest
+
+import backend.ai_agent as ai_agent
+import backend.job_queue as job_queue
+from backend.database import connect_to_sqlite, fetch_roadmap_json_sqlite, store_roadmap_sqlite
+
+ROADMAP = {"timeline": {"Month 1-2": {"SQL": ["Joins"]}, "Month 3-4": {"BI": ["Dashboards"]}}}
+
+
+@pytest.fixture
+def jobs(database_dir, monkeypatch):
+    """Jobs are only run by the test itself: submitting does not start the worker pool."""
+    monkeypatch.setattr(job_queue, "get_job_worker_pool", lambda: types.SimpleNamespace(notify=lambda: None))
+    return job_queue
+
+
+def _submit(jobs, career_goal="Data Analyst"):
+    return jobs.submit_generation_job("ada", career_goal, "Bachelor's Degree", "10 hours per week", 4)
+
+
+def _stored_roadmap(career_goal="Data Analyst"):
+    conn = connect_to_sqlite("ada")
+    try:
+        return fetch_roadmap_json_sqlite(conn, "ada", career_goal)
+    finally:
+        conn.close()
+
+
+def test_concurrent_workers_never_claim_the_same_job(jobs):
+    job_ids = {_submit(jobs, "Data Analyst"), _submit(jobs, "BI Analyst")}
+    start = threading.Barrier(4)
+    claimed = []
+
+    def worker(name):
+        start.wait()
+        claimed.append(jobs.claim_next_job(name))
+
+    threads = [threading.Thread(target=worker, args=(f"worker-{index}",)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    claimed_ids = [job["job_id"] for job in claimed if job is not None]
+    assert sorted(claimed_ids) == sorted(job_ids)
+    assert all(jobs.fetch_job(job_id)["status"] == jobs.JOB_RUNNING for job_id in job_ids)
+
+
+def test_a_truncated_stream_is_requeued_and_never_stored(jobs, monkeypatch):
+    def truncated_stream(*args, **kwargs):
+        yield "Month 1-2", ROADMAP["timeline"]["Month 1-2"]
+        raise RuntimeError("The generated roadmap is incomplete")
+
+    monkeypatch.setattr(ai_agent, "stream_career_roadmap", truncated_stream)
+    job_id = _submit(jobs)
+
+    assert jobs.run_generation_job(jobs.claim_next_job("worker-0")) == jobs.JOB_QUEUED
+    job = jobs.fetch_job(job_id)
+    assert (job["status"], job["timeline"]) == (jobs.JOB_QUEUED, {})
+    assert _stored_roadmap() is None
+
+    assert jobs.run_generation_job(jobs.claim_next_job("worker-0")) == jobs.JOB_FAILED # Out of attempts
+    assert _stored_roadmap() is None
+
+
+def test_a_job_for_a_goal_the_user_already_has_is_rejected(jobs, monkeypatch):
+    conn = connect_to_sqlite("ada")
+    try:
+        assert store_roadmap_sqlite(conn, "ada", "Data Analyst", ROADMAP)
+    finally:
+        conn.close()
+
+    def unexpected_stream(*args, **kwargs):
+        raise AssertionError("a duplicate goal must not be generated")
+
+    monkeypatch.setattr(ai_agent, "stream_career_roadmap", unexpected_stream)
+    job_id = _submit(jobs)
+
+    assert jobs.run_generation_job(jobs.claim_next_job("worker-0")) == jobs.JOB_FAILED
+    assert jobs.fetch_job(job_id)["error"] == jobs.DUPLICATE_PLAN_ERROR
+    assert _stored_roadmap() == ROADMAP
+
+
+def test_a_plan_edit_job_saves_a_new_version_on_the_worker(jobs, monkeypatch):
+    conn = connect_to_sqlite("ada")
+    try:
+        assert store_roadmap_sqlite(conn, "ada", "Data Analyst", ROADMAP)
+    finally:
+        conn.close()
+    monkeypatch.setattr(ai_agent, "regenerate_roadmap_duration",
+                        lambda education_status, career_goal, resources_available, roadmap_json, duration: (duration, {"SQL": ["Window functions"]}))
+    job_id = jobs.submit_plan_edit_job("ada", "Data Analyst", jobs.JOB_KIND_REGENERATE_DURATION, duration="Month 1-2")
+    assert jobs.fetch_active_job_for_user("ada") is None # Edits are not picked up as generations by the home page
+
+    assert jobs.run_job(jobs.claim_next_job("worker-0")) == jobs.JOB_DONE
+    assert jobs.fetch_job(job_id)["status"] == jobs.JOB_DONE
+    assert _stored_roadmap()["timeline"] == {"Month 1-2": {"SQL": ["Window functions"]}, "Month 3-4": {"BI": ["Dashboards"]}}
+
+
+def test_a_plan_edit_job_for_a_missing_plan_fails_with_a_message(jobs):
+    job_id = jobs.submit_plan_edit_job("ada", "Data Analyst", jobs.JOB_KIND_EXTEND_TIMELINE, new_timeline=6)
+
+    assert jobs.run_job(jobs.claim_next_job("worker-0")) == jobs.JOB_FAILED
+    assert jobs.fetch_job(job_id)["error"] == "Could not extend the timeline. Please try again."
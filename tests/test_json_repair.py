@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from backend.ai_agent import parse_roadmap_completion
+from backend.json_repair import loads_with_repair, normalize_duration, normalize_roadmap, repair_json_text
+
+
+@pytest.mark.parametrize("text, expected, kinds", [
+    ('Here is your roadmap:\n```json\n{"a": [1, 2]}\n```', {"a": [1, 2]}, {"extracted"}),
+    ('{"a": 1, // the first\n "b": /* inline */ 2}', {"a": 1, "b": 2}, {"comments"}),
+    ('{"a": [1, 2,], "b": {"c": 3,},}', {"a": [1, 2], "b": {"c": 3}}, {"trailing_commas"}),
+    ('{"a": [1, 2}]}', {"a": [1, 2]}, {"mismatched_brackets"}),
+    ('{"a": "x // not a comment", "b": "say \\"hi\\""}', {"a": "x // not a comment", "b": 'say "hi"'}, set()),
+])
+def test_repairs(text, expected, kinds):
+    repaired_text, applied, _ = repair_json_text(text)
+    assert json.loads(repaired_text) == expected
+    assert applied == kinds
+
+
+@pytest.mark.parametrize("text, expected, truncated_depth", [
+    ('{"a": [1, 2], "b": ["x", "y"', {"a": [1, 2], "b": ["x", "y"]}, 2), # Cut after a complete value: kept
+    ('{"a": [1, 2], "b": [3, 4', {"a": [1, 2], "b": [3]}, 2), # A trailing number may itself be cut short
+    ('{"a": ["one", "tw', {"a": ["one"]}, 2), # Inside a string: the partial string is dropped
+    ('{"a": ["one"], "b', {"a": ["one"]}, 1), # Inside a key: the key is dropped
+    ('{"a": ["one"], "b": ', {"a": ["one"]}, 1), # A key without its value is not kept
+    ('{"t": {"m1": {"x": ["y"]}, "m2": {"x": ["y"], "z', {"t": {"m1": {"x": ["y"]}, "m2": {"x": ["y"]}}}, 3),
+])
+def test_truncation_is_cut_back_to_the_last_complete_value(text, expected, truncated_depth):
+    repaired_text, kinds, depth = repair_json_text(text)
+    assert "truncation" in kinds
+    assert json.loads(repaired_text) == expected
+    assert depth == truncated_depth
+
+
+def test_valid_json_is_parsed_without_repairs():
+    assert loads_with_repair('{"a": [1]}') == ({"a": [1]}, frozenset(), 0)
+
+
+@pytest.mark.parametrize("text", ["no JSON here", '{"a": tru', '{"a": [1 2]}', '{"a" 1}'])
+def test_unrepairable_text_raises_value_error(text):
+    with pytest.raises(ValueError):
+        loads_with_repair(text)
+
+
+def test_normalize_duration_coerces_scalars_and_drops_unrenderable_topics():
+    assert normalize_duration({
+        "SQL": "Joins",
+        "Python": ["Pandas", 3, None, {"name": "NumPy", "url": "https://numpy.org"}],
+        "Empty": [],
+        "Resources": {"Books": "SQL Cookbook", "Courses": []},
+        "Flag": True,
+    }) == {
+        "SQL": ["Joins"],
+        "Python": ["Pandas", "3", "NumPy - https://numpy.org"],
+        "Resources": {"Books": ["SQL Cookbook"]},
+    }
+    assert normalize_duration({"Empty": [], "Flag": True}) is None
+    assert normalize_duration(["not", "a", "duration"]) is None
+
+
+def test_normalize_roadmap_keeps_valid_roadmaps_and_reshapes_others():
+    valid = {"timeline": {"Month 1": {"SQL": ["Joins"]}}}
+    assert normalize_roadmap(valid) is valid
+    assert normalize_roadmap({"Month 1": {"SQL": "Joins"}, "Month 2": {"Flag": True}}) == {"timeline": {"Month 1": {"SQL": ["Joins"]}}}
+
+
+@pytest.mark.parametrize("roadmap_json", [[], {"plan": "none"}, {"timeline": {"Month 1": {"SQL": []}}}])
+def test_normalize_roadmap_raises_when_nothing_is_renderable(roadmap_json):
+    with pytest.raises(ValueError):
+        normalize_roadmap(roadmap_json)
+
+
+def test_truncated_completion_whose_complete_durations_cover_the_timeline_is_accepted():
+    completion = '{"timeline": {"Month 1-2": {"SQL": ["Joins"]}, "Month 3-4": {"BI": ["Dashboards"]}, "Month 5-6": {"ML": ["Regression"], "Reso'
+    assert parse_roadmap_completion(completion, 4, "test") == {"timeline": {"Month 1-2": {"SQL": ["Joins"]}, "Month 3-4": {"BI": ["Dashboards"]}}}
+
+
+def test_truncated_completion_cut_inside_the_duration_reaching_the_timeline_is_rejected():
+    completion = '{"timeline": {"Month 1-2": {"SQL": ["Joins"]}, "Month 3-4": {"BI": ["Dashboards"], "Resources": ["Tableau"'
+    with pytest.raises(ValueError, match="cut off"):
+        parse_roadmap_completion(completion, 4, "test")
+
+
+def test_truncated_completion_cut_between_durations_keeps_the_last_one():
+    completion = '{"timeline": {"Month 1-2": {"SQL": ["Joins"]}, "Month 3-4": {"BI": ["Dashboards"]},'
+    assert list(parse_roadmap_completion(completion, 4, "test")["timeline"]) == ["Month 1-2", "Month 3-4"]
@@ -0,0 +1,78 @@
+import sqlite3
+
+import backend.progress_writer as progress_writer
+from backend.database import connect_to_sqlite, fetch_duration_progress_sqlite, fetch_progress_sqlite, store_roadmap_sqlite, update_roadmap_sqlite
+from backend.progress_writer import ProgressWriter
+
+ROADMAP = {"timeline": {"Month 1": {"SQL": ["Joins", "Window functions"]}, "Month 2": {"BI": ["Dashboards"]}}}
+
+
+def _writer():
+    return ProgressWriter(flush_interval=3600) # Only explicit flushes write
+
+
+def _stored_plan():
+    conn = connect_to_sqlite()
+    try:
+        assert store_roadmap_sqlite(conn, "ada", "Data Analyst", ROADMAP)
+    finally:
+        conn.close()
+
+
+def _progress():
+    conn = connect_to_sqlite()
+    try:
+        return fetch_progress_sqlite(conn, "ada", "Data Analyst"), fetch_duration_progress_sqlite(conn, "ada", "Data Analyst")
+    finally:
+        conn.close()
+
+
+def test_repeated_toggles_of_an_item_coalesce_into_one_write(database_dir):
+    _stored_plan()
+    writer = _writer()
+    for checked in (True, False, True):
+        writer.enqueue("ada", "Data Analyst", 0, 0, checked, version=1)
+    writer.enqueue("ada", "Data Analyst", 2, 1, True, version=1)
+    assert writer.pending_for("ada", "Data Analyst", 1) == {0: True, 2: True}
+
+    assert writer.flush() == 2
+    assert writer.stats()["coalesced"] == 2
+    assert _progress() == ({0: True, 2: True}, [("Month 1", 1, 2), ("Month 2", 1, 1)])
+
+
+def test_toggles_made_on_an_older_plan_version_are_dropped(database_dir):
+    _stored_plan()
+    writer = _writer()
+    writer.enqueue("ada", "Data Analyst", 1, 0, True, version=1)
+    conn = connect_to_sqlite()
+    try:
+        edited = {"timeline": {"Month 1": {"SQL": ["Indexes", "Joins", "Window functions"]}, "Month 2": {"BI": ["Dashboards"]}}}
+        assert update_roadmap_sqlite(conn, "ada", "Data Analyst", edited, expected_version=1) == 2
+    finally:
+        conn.close()
+    writer.enqueue("ada", "Data Analyst", 0, 0, True, version=2)
+
+    assert writer.flush() == 1 # Item 1 of version 2 is "Joins", not the "Window functions" ticked on version 1
+    assert writer.stats()["stale_dropped"] == 1
+    assert _progress()[0] == {0: True}
+
+
+def test_a_batch_is_requeued_when_connecting_to_its_shard_fails(database_dir, monkeypatch):
+    _stored_plan()
+    writer = _writer()
+    writer.enqueue("ada", "Data Analyst", 0, 0, True, version=1)
+    connect_to_shard = progress_writer.connect_to_shard
+
+    def unavailable(shard_index):
+        raise sqlite3.OperationalError("Timed out waiting for a connection")
+
+    monkeypatch.setattr(progress_writer, "connect_to_shard", unavailable)
+    assert writer.flush() == 0
+    assert writer.stats()["flush_errors"] == 1
+    writer.enqueue("ada", "Data Analyst", 1, 0, True, version=1) # Queued before the retry
+    assert writer.pending_for("ada", "Data Analyst", 1) == {0: True, 1: True}
+
+    monkeypatch.setattr(progress_writer, "connect_to_shard", connect_to_shard)
+    assert writer.flush() == 2
+    assert writer.stats()["pending"] == 0
+    assert _progress()[0] == {0: True, 1: True}
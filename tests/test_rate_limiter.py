@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+import backend.rate_limiter as rate_limiter
+from backend.rate_limiter import AsyncTokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake monotonic clock that asyncio.sleep in the rate limiter advances instead of waiting."""
+    now = [0.0]
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+        now[0] += delay
+
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", sleep)
+    return now, sleeps
+
+
+def test_refill_is_capped_at_capacity(clock):
+    now, sleeps = clock
+    bucket = AsyncTokenBucket(60) # 1 token per second
+    now[0] += 3600 # An idle hour refills to capacity, not beyond
+    assert asyncio.run(bucket.acquire(60)) == 0.0
+    assert asyncio.run(bucket.acquire(1)) == pytest.approx(1.0)
+    assert sleeps == [pytest.approx(1.0)]
+
+
+def test_wait_is_computed_from_the_missing_tokens(clock):
+    now, sleeps = clock
+    bucket = AsyncTokenBucket(120) # 2 tokens per second
+    assert asyncio.run(bucket.acquire(100)) == 0.0
+    assert asyncio.run(bucket.acquire(50)) == pytest.approx(15.0) # 30 missing tokens at 2 per second
+    assert bucket.total_wait_seconds == pytest.approx(15.0)
+    assert asyncio.run(bucket.acquire(500)) == pytest.approx(60.0) # Oversized requests wait for a full bucket only
+
+
+def test_adjust_settles_an_estimate(clock):
+    now, sleeps = clock
+    bucket = AsyncTokenBucket(60)
+    asyncio.run(bucket.acquire(30))
+    bucket.adjust(40) # Used 40 more than estimated: the balance goes below zero and delays the next caller
+    assert asyncio.run(bucket.acquire(10)) == pytest.approx(20.0)
+    bucket.adjust(-100) # Returned tokens never exceed capacity
+    assert asyncio.run(bucket.acquire(60)) == 0.0
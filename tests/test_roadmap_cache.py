@@ -0,0 +1,15 @@
+import pytest
+
+from backend.roadmap_cache import normalize_career_goal
+
+
+@pytest.mark.parametrize("career_goal, normalized", [
+    ("  Web   Dev ", "web developer"), # Abbreviation only
+    ("Software Dev", "software engineer"), # "dev" -> "developer", then the synonym
+    ("Full Stack Dev!", "fullstack developer"),
+    ("ML", "machine learning engineer"), # "ml" -> "machine learning", then the synonym
+    ("ML Engineer", "machine learning engineer"),
+    ("C++ Dev", "c++ developer"),
+])
+def test_abbreviations_are_expanded_before_synonyms_are_looked_up(career_goal, normalized):
+    assert normalize_career_goal(career_goal) == normalized
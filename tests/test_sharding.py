@@ -0,0 +1,74 @@
+from backend.database import (connect_to_shard, fetch_duration_progress_sqlite, fetch_progress_sqlite, fetch_roadmap_json_sqlite,
+                              search_plans_sqlite, store_roadmap_sqlite, update_checkbox_states_sqlite)
+from backend.sharding import existing_shard_indexes, rebalance_shards, shard_for_user
+
+SHARED_ROADMAP = {"timeline": {"Month 1": {"SQL": ["Joins", "Window functions"]}, "Month 2": {"BI": ["Dashboards"]}}}
+USERS = [f"user-{index}" for index in range(12)]
+
+
+def _own_roadmap(user_id):
+    return {"timeline": {"Month 1": {"Python": [f"Project for {user_id}"]}}}
+
+
+def _plans_by_shard():
+    plans = {}
+    for shard_index in existing_shard_indexes():
+        conn = connect_to_shard(shard_index)
+        try:
+            plans[shard_index] = set(conn.execute("SELECT user_id, career_goal FROM career_plans_sqlite").fetchall())
+        finally:
+            conn.close()
+    return plans
+
+
+def _assert_blob_refcounts_match_plans(conn):
+    assert conn.execute("""
+        SELECT COUNT(*) FROM roadmap_blobs b
+        WHERE b.refcount != (SELECT COUNT(*) FROM career_plans_sqlite p WHERE p.roadmap_hash = b.blob_hash) OR b.refcount <= 0
+    """).fetchone()[0] == 0
+
+
+def _assert_users_live_on(shard_count):
+    plans_by_shard = _plans_by_shard()
+    for user_id in USERS:
+        target_index = shard_for_user(user_id, shard_count)
+        for shard_index, plans in plans_by_shard.items():
+            user_goals = {career_goal for plan_user, career_goal in plans if plan_user == user_id}
+            assert user_goals == ({"Data Analyst", "Python Developer"} if shard_index == target_index else set())
+        conn = connect_to_shard(target_index)
+        try:
+            assert fetch_roadmap_json_sqlite(conn, user_id, "Data Analyst") == SHARED_ROADMAP
+            assert fetch_roadmap_json_sqlite(conn, user_id, "Python Developer") == _own_roadmap(user_id)
+            assert fetch_progress_sqlite(conn, user_id, "Data Analyst") == {0: True, 1: False, 2: True}
+            assert fetch_duration_progress_sqlite(conn, user_id, "Data Analyst") == [("Month 1", 1, 2), ("Month 2", 1, 1)]
+            assert search_plans_sqlite(conn, user_id, "dashboards") == [("Data Analyst", "Month 2", "BI", "Dashboards")]
+        finally:
+            conn.close()
+    for shard_index in plans_by_shard:
+        conn = connect_to_shard(shard_index)
+        try:
+            _assert_blob_refcounts_match_plans(conn)
+        finally:
+            conn.close()
+
+
+def test_rebalancing_moves_every_user_to_their_shard_and_back(database_dir):
+    conn = connect_to_shard(0)
+    try:
+        for user_id in USERS:
+            assert store_roadmap_sqlite(conn, user_id, "Data Analyst", SHARED_ROADMAP)
+            assert store_roadmap_sqlite(conn, user_id, "Python Developer", _own_roadmap(user_id))
+            assert update_checkbox_states_sqlite(conn, user_id, "Data Analyst", {0: True, 1: False, 2: True})
+    finally:
+        conn.close()
+    assert len({shard_for_user(user_id, 3) for user_id in USERS}) == 3 # Every shard gets users
+
+    moved = rebalance_shards(3)
+    assert moved["users_moved"] == sum(shard_for_user(user_id, 3) != 0 for user_id in USERS)
+    assert moved["plans_moved"] == 2 * moved["users_moved"]
+    assert existing_shard_indexes() == [0, 1, 2]
+    _assert_users_live_on(3)
+    assert rebalance_shards(3) == {"users_moved": 0, "plans_moved": 0} # Already balanced
+
+    rebalance_shards(1) # Drains the shards beyond the new count
+    _assert_users_live_on(1)
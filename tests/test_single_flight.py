@@ -0,0 +1,53 @@
+import threading
+
+from backend.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call_but_not_its_result_object():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def generate():
+        calls.append(1)
+        release.wait()
+        return {"timeline": {"Month 1": {"SQL": ["Joins"]}}}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", generate))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["calls"] < 3:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert flight.stats()["coalesced"] == 2
+    results[0]["timeline"]["Month 1"]["SQL"].append("Mutated")
+    assert results[1]["timeline"]["Month 1"]["SQL"] == ["Joins"]
+    assert results[2]["timeline"]["Month 1"]["SQL"] == ["Joins"]
+
+
+def test_stream_callers_get_their_own_items():
+    flight = SingleFlight("test")
+    release = threading.Event()
+
+    def durations():
+        release.wait()
+        yield "Month 1", {"SQL": ["Joins"]}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(list(flight.stream("key", durations)))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["calls"] < 2:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert flight.stats()["coalesced"] == 1
+    results[0][0][1]["SQL"].append("Mutated")
+    assert results[1] == [("Month 1", {"SQL": ["Joins"]})]
@@ -0,0 +1,50 @@
+import types
+
+import pytest
+
+import backend.ai_agent as ai_agent
+
+
+def _fake_groq_client(completion_text, chunk_size=7):
+    """A stand-in for the Groq client whose chat completion streams completion_text in small chunks."""
+    def create(**kwargs):
+        for start in range(0, len(completion_text), chunk_size):
+            delta = types.SimpleNamespace(content=completion_text[start:start + chunk_size])
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)], x_groq=None)
+    return types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+
+
+def _stream(monkeypatch, completion_text, timeline):
+    monkeypatch.setattr(ai_agent, "get_groq_client", lambda: _fake_groq_client(completion_text))
+    return list(ai_agent.stream_career_roadmap("Bachelor's Degree", "Data Analyst", "10 hours per week", timeline,
+                                               use_cache=False, segmented=False))
+
+
+def test_complete_stream_with_non_month_labels_is_accepted(monkeypatch):
+    completion = '{"timeline": {"Week 1-4": {"SQL": ["Joins", "Window functions"]}, "Week 5-8": {"BI": ["Dashboards"]}}}'
+    assert _stream(monkeypatch, completion, 2) == [
+        ("Week 1-4", {"SQL": ["Joins", "Window functions"]}),
+        ("Week 5-8", {"BI": ["Dashboards"]}),
+    ]
+
+
+def test_complete_stream_ending_before_the_timeline_is_accepted(monkeypatch):
+    completion = '{"timeline": {"Month 1-2": {"SQL": ["Joins"]}, "Month 3-4": {"BI": ["Dashboards"]}}}'
+    assert [duration for duration, _ in _stream(monkeypatch, completion, 6)] == ["Month 1-2", "Month 3-4"]
+
+
+def test_stream_cut_off_before_the_timeline_raises(monkeypatch):
+    completion = '{"timeline": {"Month 1-2": {"SQL": ["Joins"]}, "Month 3-4": {"BI": ["Dash'
+    with pytest.raises(RuntimeError, match="incomplete"):
+        _stream(monkeypatch, completion, 6)
+
+
+def test_stream_cut_off_inside_the_duration_reaching_the_timeline_raises(monkeypatch):
+    completion = '{"timeline": {"Month 1-2": {"SQL": ["Joins"]}, "Month 3-4": {"BI": ["Dashboards"], "Resour'
+    with pytest.raises(RuntimeError, match="incomplete"):
+        _stream(monkeypatch, completion, 4)
+
+
+def test_stream_cut_off_after_the_timeline_is_covered_keeps_complete_durations(monkeypatch):
+    completion = '{"timeline": {"Month 1-2": {"SQL": ["Joins"]}, "Month 3-4": {"BI": ["Dashboards"]}, "Month 5": {"ML": ["Regre'
+    assert _stream(monkeypatch, completion, 4) == [("Month 1-2", {"SQL": ["Joins"]}), ("Month 3-4", {"BI": ["Dashboards"]})]